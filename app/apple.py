@@ -8,11 +8,14 @@
 import pygame
 from app.fruits.fruitBase import BaseFruit
 from app.config import *
+from app.engine import APPLE
 from app.game import singleton_instance as gm
 
 class Apple(BaseFruit):
-    def __init__(self, snake=None):
-        super().__init__(APPLE_COLOR, snake)
+    kind = APPLE
+
+    def __init__(self, cell):
+        super().__init__(APPLE_COLOR, cell)
 
     def update(self):
         super().update()
@@ -0,0 +1,442 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Games of many snakes.
+#
+# An Arena is a board shared by one player and any number of bot snakes (or
+# bots alone, for stress tests). Like GameState, it knows what is in each
+# cell, and it also knows whose snake is there (owner), so every collision
+# is a lookup at the cell a head moves to, whatever the number of snakes:
+#
+#   - All tails move first, so a head may take the cell a tip just left.
+#   - Each moving head then claims the cell it moves to. A head reaching a
+#     snake (its own or another's), an obstacle or the border dies; the
+#     second head to claim a cell in a tick dies along with the first.
+#   - The heads left standing take their cells and eat what was there.
+#
+# A tick costs time in proportion to the number of snakes. Dead bots are
+# taken off the board and respawn at once; a dead player stays, as in a
+# single player game, until reset().
+
+import random
+import sys
+import time
+from array import array
+
+from app.config import *
+from app.engine import (
+    ATE_APPLE,
+    ATE_ORANGE,
+    DIED,
+    DIRECTIONS,
+    EMPTY,
+    FRUITS,
+    OBSTACLE,
+    SNAKE,
+    APPLE,
+    ORANGE,
+    FreeCells,
+    GameState,
+    Tail,
+)
+
+
+##
+## Snakes of an arena
+##
+class ArenaSnake:
+    """One snake of an arena, with the attributes a GameState has for its snake."""
+
+    def __init__(self, arena, id, bot):
+        """
+        :param id: the snake's index in arena.snakes.
+        :param bot: whether the arena steers it.
+        """
+        self.arena = arena
+        self.id = id
+        self.bot = bot
+        self.seed = f"{arena.seed}/{id}"  # Seeds the renderer's tongue flicks
+
+        self.head = None  # None while off the board
+        self.tail = Tail(arena.cols)
+        self.xmov = self.ymov = 0
+        self.move_queue = []
+        self.last_tip = None
+        self.alive = False
+        self.got_apple = False
+        self.energy = MAX_ENERGY
+        self.speed = 1.0
+
+        self.events = 0  # What happened to it in the last tick
+        self.reached = EMPTY  # What its head moved onto in the last tick
+        self.target = None  # The fruit a bot is heading for (grid index)
+
+    set_direction = GameState.set_direction
+
+    @property
+    def score(self):
+        return len(self.tail)
+
+    def is_in_position(self, x, y):
+        """Determine whether any part of this snake is in cell (x, y)."""
+        arena = self.arena
+        if not (0 <= x < arena.cols and 0 <= y < arena.rows):
+            return False
+        return arena.owner[y * arena.cols + x] == self.id
+
+
+##
+## Arena
+##
+class Arena:
+    def __init__(
+        self,
+        cols,
+        rows,
+        bots=0,
+        player=True,
+        border_wrap=False,
+        obstacle_count=OBSTACLE_COUNT,
+        seed=None,
+        apples=1,
+        oranges=1,
+    ):
+        """
+        Create a new game of many snakes on a board of cols x rows cells.
+        :param bots: number of bot snakes.
+        :param player: whether the first snake is played (bots only otherwise).
+        :param border_wrap: whether the snakes wrap around the borders.
+        :param obstacle_count: number of static obstacles on the board.
+        :param seed: seed of the game's random number generators (random if None).
+        :param apples: number of apples on the board at a time.
+        :param oranges: number of oranges on the board at a time.
+        """
+        self.cols = cols
+        self.rows = rows
+        self.border_wrap = border_wrap
+
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.random = random.Random(f"{seed}/spawn")
+        self.fruit_random = random.Random(f"{seed}/fruit")
+        self.energy_random = random.Random(f"{seed}/energy")
+        self.bot_random = random.Random(f"{seed}/bots")
+
+        # The spatial index: what is in each cell, and the index of the snake
+        # there (-1 for none). In a tick, the heads claim the cells they move
+        # to, and claimed tells in which tick a cell was last claimed.
+        size = cols * rows
+        self.grid = bytearray(size)
+        self.owner = array("i", [-1]) * size
+        self.claimed = array("i", [-1]) * size
+        self.claimant = array("i", bytes(4 * size))
+        self.ticks = 0
+
+        self.free = FreeCells(size)
+        self.obstacles = []
+
+        # As in GameState, plus the fruit cells as a set to pick bot targets from.
+        self.fruits = {}
+        self.fruit_cells = FreeCells(size, full=False)
+        self.fruit_counts = {APPLE: apples, ORANGE: oranges}
+        self.missing = {APPLE: 0, ORANGE: 0}
+        self.fruit_version = 0
+        self.fruit_changes = []
+        self.cleared = []  # Cells of the bots that died in the last tick
+
+        self.snakes = [
+            ArenaSnake(self, id, bot=not (player and id == 0))
+            for id in range(bots + bool(player))
+        ]
+        self.player = self.snakes[0] if player else None
+
+        # The player is born, the obstacles are set around it, then come the
+        # bots and the fruits.
+        if self.player:
+            self.spawn(self.player)
+        self.place_obstacles(obstacle_count)
+        for snake in self.snakes:
+            if snake.bot:
+                self.spawn(snake)
+        for kind in FRUITS:
+            for _ in range(self.fruit_counts[kind]):
+                self.drop_fruit(kind)
+
+    ## The player's game, for the main loop and the HUD
+
+    @property
+    def score(self):
+        if self.player:
+            return self.player.score
+        return max((snake.score for snake in self.snakes), default=0)
+
+    @property
+    def energy(self):
+        return self.player.energy if self.player else MAX_ENERGY
+
+    @property
+    def alive(self):
+        return self.player.alive if self.player else True
+
+    @property
+    def speed(self):
+        return self.player.speed if self.player else 1.0
+
+    def set_direction(self, xmov, ymov):
+        if self.player:
+            self.player.set_direction(xmov, ymov)
+
+    def reset(self):
+        """Respawn the player, keeping everything else where it is."""
+        if self.player:
+            self.clear(self.player)
+            self.spawn(self.player)
+
+    ## Cells
+
+    spawn_direction = GameState.spawn_direction
+    random_free_cell = GameState.random_free_cell
+    place_obstacles = GameState.place_obstacles
+
+    @property
+    def head(self):
+        # Where obstacles keep away from (see GameState.place_obstacles).
+        return self.player.head if self.player else (-1, -1)
+
+    def snake_at(self, x, y):
+        """Return the index in snakes of the snake in cell (x, y), or None."""
+        if not (0 <= x < self.cols and 0 <= y < self.rows):
+            return None
+        id = self.owner[y * self.cols + x]
+        return id if id >= 0 else None
+
+    def drop_fruit(self, kind):
+        cell = GameState.drop_fruit(self, kind)
+        if cell is not None:
+            self.fruit_cells.add(cell[1] * self.cols + cell[0])
+        return cell
+
+    def spawn(self, snake):
+        """Put a snake on a random free cell; it stays off the board if there is none."""
+        index = self.free.sample(self.random)
+        if index is None:
+            snake.head = None
+            snake.alive = False
+            return
+        self.free.remove(index)
+        self.grid[index] = SNAKE
+        self.owner[index] = snake.id
+
+        snake.head = x, y = index % self.cols, index // self.cols
+        snake.xmov, snake.ymov = self.spawn_direction(x, y)
+        snake.tail.clear()
+        snake.move_queue = []
+        snake.last_tip = None
+        snake.alive = True
+        snake.got_apple = False
+        snake.energy = MAX_ENERGY
+        snake.speed = 1.0
+        snake.target = None
+
+    def clear(self, snake):
+        """Take a snake off the board."""
+        if snake.head is None:
+            return
+        cols = self.cols
+        for x, y in [snake.head, *snake.tail]:
+            if snake.is_in_position(x, y):
+                index = y * cols + x
+                self.owner[index] = -1
+                self.cleared.append((x, y))
+                if (x, y) in self.fruits:
+                    # It starved as it reached the fruit, which stays.
+                    self.grid[index] = self.fruits[x, y]
+                else:
+                    self.grid[index] = EMPTY
+                    self.free.add(index)
+        snake.head = None
+        snake.tail.clear()
+
+    ## Moving
+
+    def steer(self, bot):
+        """Turn a bot towards its fruit, never into a snake, an obstacle or the border."""
+        grid, cols, rows = self.grid, self.cols, self.rows
+        target = bot.target
+        if target is None or grid[target] not in FRUITS:
+            target = bot.target = self.fruit_cells.sample(self.bot_random)
+
+        x, y = bot.head
+        best = None
+        for xmov, ymov in DIRECTIONS:
+            if xmov == -bot.xmov and ymov == -bot.ymov:
+                continue
+            nx, ny = x + xmov, y + ymov
+            if self.border_wrap:
+                nx %= cols
+                ny %= rows
+            elif not (0 <= nx < cols and 0 <= ny < rows):
+                continue
+            reached = grid[ny * cols + nx]
+            if reached == SNAKE or reached == OBSTACLE:
+                continue
+            # Closest to the target first, then straight ahead.
+            distance = 0
+            if target is not None:
+                distance = abs(target % cols - nx) + abs(target // cols - ny)
+            key = (distance, xmov != bot.xmov or ymov != bot.ymov)
+            if best is None or key < best[0]:
+                best = key, xmov, ymov
+        if best is not None:
+            _, bot.xmov, bot.ymov = best
+
+    def step(self):
+        """
+        Advance the game by one tick.
+        :return: bit mask of the player's events (ATE_APPLE, ATE_ORANGE, DIED)
+            of this tick; each snake's are in its events.
+        """
+        grid, owner, free = self.grid, self.owner, self.free
+        cols, rows = self.cols, self.rows
+        self.ticks += 1
+        tick = self.ticks
+        self.fruit_changes.clear()
+        self.cleared.clear()
+
+        # Tails first.
+        moving = []
+        for snake in self.snakes:
+            snake.events = 0
+            if not snake.alive:
+                snake.events = DIED
+                continue
+            if snake.bot:
+                self.steer(snake)
+            elif snake.move_queue:
+                snake.xmov, snake.ymov = snake.move_queue.pop(0)
+            if not (snake.xmov or snake.ymov):
+                continue
+            moving.append(snake)
+
+            head = snake.head
+            snake.tail.push(head[1] * cols + head[0])
+            snake.last_tip = None
+            if snake.got_apple:
+                snake.got_apple = False
+                snake.energy = min(
+                    MAX_ENERGY,
+                    snake.energy
+                    + self.energy_random.randint(APPLE_ENERGY - 25, APPLE_ENERGY),
+                )
+            else:
+                index = snake.tail.pop()
+                grid[index] = EMPTY
+                owner[index] = -1
+                free.add(index)
+                snake.last_tip = index % cols, index // cols
+
+        # Then each head claims the cell it moves to.
+        claimed, claimant, snakes = self.claimed, self.claimant, self.snakes
+        for snake in moving:
+            x = snake.head[0] + snake.xmov
+            y = snake.head[1] + snake.ymov
+            if self.border_wrap:
+                x %= cols
+                y %= rows
+            snake.head = (x, y)
+            if not (0 <= x < cols and 0 <= y < rows):
+                snake.alive = False
+                continue
+            index = y * cols + x
+            reached = grid[index]
+            if reached == SNAKE or reached == OBSTACLE:
+                snake.alive = False
+            elif claimed[index] == tick:
+                # Head to head.
+                snake.alive = False
+                snakes[claimant[index]].alive = False
+            else:
+                claimed[index] = tick
+                claimant[index] = snake.id
+                snake.reached = reached
+
+        # The heads left take their cells and eat.
+        dead = []
+        for snake in moving:
+            if snake.alive:
+                x, y = snake.head
+                index = y * cols + x
+                grid[index] = SNAKE
+                owner[index] = snake.id
+                free.remove(index)
+
+        for snake in self.snakes:
+            if snake.events:
+                continue
+            snake.energy = max(0, snake.energy - ENERGY_CONSUMPTION)
+            if snake.energy <= 0:
+                snake.alive = False
+            if not snake.alive:
+                snake.events = DIED
+                if snake.bot:
+                    dead.append(snake)
+
+        for snake in moving:
+            if not snake.alive:
+                continue
+            reached = snake.reached
+            if reached == APPLE:
+                snake.got_apple = True
+                snake.events = ATE_APPLE
+            elif reached == ORANGE:
+                snake.speed += 0.05
+                snake.events = ATE_ORANGE
+            else:
+                continue
+            x, y = snake.head
+            del self.fruits[snake.head]
+            self.fruit_cells.remove(y * cols + x)
+            self.fruit_version += 1
+            self.fruit_changes.append(snake.head)
+            self.drop_fruit(reached)
+
+        # Dead bots make room, then come back.
+        for snake in dead:
+            self.clear(snake)
+        for snake in self.snakes:
+            if snake.bot and snake.head is None:
+                self.spawn(snake)
+
+        for kind in FRUITS:
+            while self.missing[kind] and len(free):
+                self.missing[kind] -= 1
+                self.drop_fruit(kind)
+
+        return self.player.events if self.player else 0
+
+
+if __name__ == "__main__":
+    # Time bots playing on their own: python -m app.arena [bots [ticks [cols rows]]]
+    bots = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    cols, rows = (int(n) for n in sys.argv[3:5]) if len(sys.argv) > 4 else (100, 100)
+    arena = Arena(cols, rows, bots, player=False, seed=0, apples=max(1, bots // 2))
+
+    deaths = eaten = 0
+    started = time.perf_counter()
+    for _ in range(ticks):
+        arena.step()
+        for snake in arena.snakes:
+            deaths += snake.events == DIED
+            eaten += bool(snake.events & (ATE_APPLE | ATE_ORANGE))
+    elapsed = time.perf_counter() - started
+
+    print(f"{bots} bots on {cols}x{rows} cells, {ticks} ticks in {elapsed:.3f} s")
+    print(
+        f"{ticks / elapsed:.0f} ticks/s, {elapsed / ticks / max(1, bots) * 1e6:.2f} us per snake and tick"
+    )
+    print(f"{eaten} fruits eaten, {deaths} deaths, longest snake {arena.score}")
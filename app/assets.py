@@ -0,0 +1,184 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Background asset loading.
+#
+# Fonts, sounds and music are read and decoded on a worker thread, in the
+# order they were asked for, while the main thread keeps drawing. Each asset
+# is used through a handle: fonts are fetched once they're ready, and sounds
+# and music just don't play until they are loaded, so nothing that draws or
+# plays ever blocks on the disk. The mixer is only started when the first
+# sound or music is loaded, and not at all by a loader without audio.
+
+import threading
+
+import pygame
+
+from app.fonts import get_font
+
+
+def init_audio():
+    """Initialise the mixer if it isn't yet (on the loader's thread)."""
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+
+
+def load_sound(file):
+    init_audio()
+    return pygame.mixer.Sound(file)
+
+
+def load_music(file):
+    init_audio()
+    pygame.mixer.music.load(file)
+
+
+class Asset:
+    def __init__(self, name, load):
+        """
+        :param name: what the asset is (e.g. its file), for error messages.
+        :param load: function that loads the asset and returns it.
+        """
+        self.name = name
+        self.load = load
+        self.value = None
+        self.error = None
+        self.lock = threading.RLock()
+        self.loaded = threading.Event()
+
+    @property
+    def ready(self):
+        return self.loaded.is_set()
+
+    def finish(self, value, error=None):
+        """Hand the loaded asset (or the error loading it) over; called by the loader."""
+        with self.lock:
+            self.value = value
+            self.error = error
+            self.loaded.set()
+
+    def get(self):
+        """Return the asset, waiting for it to load if it hasn't yet."""
+        self.loaded.wait()
+        if self.error is not None:
+            raise RuntimeError(f"Could not load {self.name}") from self.error
+        return self.value
+
+
+class Sound(Asset):
+    """A sound effect, silent until it's loaded."""
+
+    def __init__(self, file, volume=1.0):
+        super().__init__(file, lambda: load_sound(file))
+        self.volume = volume
+
+    def finish(self, value, error=None):
+        with self.lock:
+            if value is not None:
+                value.set_volume(self.volume)
+            super().finish(value, error)
+
+    def set_volume(self, volume):
+        with self.lock:
+            self.volume = volume
+            if self.value is not None:
+                self.value.set_volume(volume)
+
+    def play(self):
+        # Silent if it couldn't be loaded either (e.g. no audio device).
+        if self.value is not None:
+            self.value.play()
+
+    def stop(self):
+        if self.value is not None:
+            self.value.stop()
+
+
+class Music(Asset):
+    """The background music stream; asked to play before it's loaded, it starts once it is."""
+
+    def __init__(self, file, volume=1.0):
+        super().__init__(file, lambda: load_music(file))
+        self.volume = volume
+        self.loops = None  # How to play it once loaded (None: don't).
+
+    @property
+    def playable(self):
+        return self.ready and self.error is None
+
+    def finish(self, value, error=None):
+        with self.lock:
+            if error is None:
+                pygame.mixer.music.set_volume(self.volume)
+                if self.loops is not None:
+                    pygame.mixer.music.play(self.loops)
+            super().finish(value, error)
+
+    def set_volume(self, volume):
+        with self.lock:
+            self.volume = volume
+            if self.playable:
+                pygame.mixer.music.set_volume(volume)
+
+    def play(self, loops=0):
+        with self.lock:
+            self.loops = loops
+            if self.playable:
+                pygame.mixer.music.play(loops)
+
+    def stop(self):
+        with self.lock:
+            self.loops = None
+            if self.playable:
+                pygame.mixer.music.stop()
+
+
+class AssetLoader:
+    def __init__(self, audio=True):
+        """
+        :param audio: whether to load sounds and music; without it, they are
+            handles that never load (and never play).
+        """
+        self.audio = audio
+        self.assets = []
+        self.done = 0  # How many assets have been loaded so far.
+        self.thread = None
+
+    def add(self, asset):
+        """Queue an asset to be loaded and return its handle."""
+        if self.thread is not None:
+            raise RuntimeError("Assets can only be added before the loader starts")
+        self.assets.append(asset)
+        return asset
+
+    def font(self, size):
+        return self.add(Asset(f"font of size {size}", lambda: get_font(size)))
+
+    def sound(self, file, volume=1.0):
+        sound = Sound(file, volume)
+        return self.add(sound) if self.audio else sound
+
+    def music(self, file, volume=1.0):
+        music = Music(file, volume)
+        return self.add(music) if self.audio else music
+
+    @property
+    def progress(self):
+        """Fraction of the assets loaded so far (0 to 1)."""
+        return self.done / len(self.assets) if self.assets else 1.0
+
+    def start(self):
+        """Start loading the queued assets on a worker thread."""
+        self.thread = threading.Thread(target=self.run, name="assets", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        for asset in self.assets:
+            try:
+                asset.finish(asset.load())
+            except Exception as error:
+                asset.finish(None, error)
+            self.done += 1
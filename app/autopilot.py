@@ -0,0 +1,371 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Autopilot.
+#
+# Plays a GameState by itself, for demos (python coral.py --autopilot) and
+# to drive soak and benchmark runs. It keeps a distance field: for every
+# cell, the length of the shortest path to the nearest apple around the
+# snake and the obstacles (oranges give no energy, so they aren't worth a
+# detour). Each tick changes few cells (the head takes one, the tail tip
+# leaves one, an apple is eaten and another dropped), so the field is
+# repaired around them instead of being searched again:
+#
+#   - A cell that becomes free, or a new apple, can only shorten paths; the
+#     shorter distances spread from it (lower()).
+#   - A cell that becomes blocked, or an apple that is gone, can only lengthen
+#     them. The cells whose every shortest path went through it are found
+#     first, in order of distance, then filled in again from the cells
+#     around them (raise_()).
+#
+# The snake heads down the field to the nearest apple. When that gets tight
+# (no apple within reach, fewer cells around the apples than the snake is
+# long, or a snake covering most of the board), it follows a Hamiltonian
+# cycle of the board instead, which is computed once per board size and
+# never crosses itself.
+
+import functools
+import sys
+import time
+from array import array
+
+from app.config import *
+from app.engine import (
+    APPLE,
+    DIED,
+    DIRECTIONS,
+    OBSTACLE,
+    SNAKE,
+    GameState,
+    board_size,
+)
+
+INF = 1 << 30  # Distance of the cells that can't reach an apple (or are blocked).
+CYCLE_FILL = 0.5  # Share of the board the snake covers when it takes to the cycle.
+REBUILD_SHARE = (
+    0.25  # Share of the field lost in a tick beyond which it's searched again.
+)
+
+
+##
+## Hamiltonian cycle
+##
+def hamiltonian_cycle(cols, rows):
+    """
+    Return the cells of a closed path visiting every cell of the board once:
+    along the rows in a zigzag, leaving out column 0, and back up column 0
+    (or the same along the columns, if rows is odd). None if both are odd,
+    as such boards have no such path.
+    """
+    if rows % 2 == 0:
+        cells = []
+        for y in range(rows):
+            xs = range(1, cols) if y % 2 == 0 else range(cols - 1, 0, -1)
+            cells.extend((x, y) for x in xs)
+        cells.extend((0, y) for y in range(rows - 1, -1, -1))
+        return cells
+    if cols % 2 == 0:
+        return [(x, y) for y, x in hamiltonian_cycle(rows, cols)]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def cycle_positions(cols, rows):
+    """
+    Return the position of each cell (by grid index) along the Hamiltonian
+    cycle of the board, or None if it has none. Computed once per board
+    size, that is once per entry of size for the game's boards.
+    """
+    cells = hamiltonian_cycle(cols, rows)
+    if cells is None:
+        return None
+    position = array("i", bytes(4 * cols * rows))
+    for i, (x, y) in enumerate(cells):
+        position[y * cols + x] = i
+    return position
+
+
+@functools.lru_cache(maxsize=None)
+def adjacency(cols, rows, border_wrap):
+    """Return the neighbours of each cell of a board, by grid index."""
+    adjacent = []
+    for y in range(rows):
+        for x in range(cols):
+            cells = []
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if border_wrap:
+                    nx %= cols
+                    ny %= rows
+                elif not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                cells.append(ny * cols + nx)
+            adjacent.append(tuple(cells))
+    return adjacent
+
+
+##
+## Autopilot
+##
+class Autopilot:
+    def __init__(self, state):
+        """
+        Play a game. Call move() before each tick and queue the direction it
+        returns; the autopilot catches up with the tick on the next call.
+        :param state: the app.engine.GameState to play.
+        """
+        self.state = state
+        self.cycle = cycle_positions(state.cols, state.rows)
+        self.dist = array("i", [INF]) * (state.cols * state.rows)
+        self.head = None  # Where the head was on the last move, None to start over
+        self.rebuilds = 0  # How many times the field was searched from scratch
+
+    ## Distance field
+
+    def rebuild(self):
+        """Search the whole field again, from every apple."""
+        state = self.state
+        grid, cols = state.grid, state.cols
+        self.adjacent = adjacency(cols, state.rows, state.border_wrap)
+        self.border_wrap = state.border_wrap
+        dist = self.dist = array("i", [INF]) * (cols * state.rows)
+
+        frontier = [
+            y * cols + x for (x, y), kind in state.fruits.items() if kind == APPLE
+        ]
+        for cell in frontier:
+            dist[cell] = 0
+        d = 0
+        while frontier:
+            d += 1
+            next_frontier = []
+            for cell in frontier:
+                for near in self.adjacent[cell]:
+                    if (
+                        dist[near] == INF
+                        and grid[near] != SNAKE
+                        and grid[near] != OBSTACLE
+                    ):
+                        dist[near] = d
+                        next_frontier.append(near)
+            frontier = next_frontier
+        self.reachable = sum(1 for d in dist if d != INF)
+        self.rebuilds += 1
+
+    def raise_(self, seeds):
+        """Repair the field after the cells seeds lost their distance (blocked, or no longer apples)."""
+        grid, dist, adjacent = self.state.grid, self.dist, self.adjacent
+
+        # The cells that lose their shortest paths: those next to a lost cell,
+        # one further away, and with no other neighbour to lead them on. By
+        # order of distance, so that whether a neighbour still leads on is
+        # known by the time it's asked.
+        lost = set(seeds)
+        levels = {}
+        for cell in seeds:
+            levels.setdefault(dist[cell], []).append(cell)
+        d = min(levels, default=0)
+        limit = REBUILD_SHARE * self.reachable
+        while levels:
+            for cell in levels.pop(d, ()):
+                for near in adjacent[cell]:
+                    if dist[near] != d + 1 or near in lost:
+                        continue
+                    for other in adjacent[near]:
+                        if dist[other] == d and other not in lost:
+                            break
+                    else:
+                        lost.add(near)
+                        levels.setdefault(d + 1, []).append(near)
+            d += 1
+            if len(lost) > limit:
+                # Most of the field goes (the only apple was eaten, say), so
+                # it's quicker to search it all again.
+                self.rebuild()
+                return
+
+        for cell in lost:
+            dist[cell] = INF
+        self.reachable -= len(lost)
+
+        # Fill them in again from the cells around them.
+        seeds = []
+        for cell in lost:
+            if grid[cell] == SNAKE or grid[cell] == OBSTACLE:
+                continue
+            d = min([dist[near] for near in adjacent[cell]]) + 1
+            if d < INF:
+                seeds.append((d, cell))
+        self.spread(seeds)
+
+    def lower(self, seeds):
+        """Repair the field after the cells seeds became free or apples."""
+        grid, dist, adjacent = self.state.grid, self.dist, self.adjacent
+        lowered = []
+        for cell in seeds:
+            if grid[cell] == SNAKE or grid[cell] == OBSTACLE:
+                continue
+            if grid[cell] == APPLE:
+                d = 0
+            else:
+                d = min([dist[near] for near in adjacent[cell]]) + 1
+            if d < dist[cell]:
+                lowered.append((d, cell))
+        self.spread(lowered)
+
+    def spread(self, seeds):
+        # Lower the distances of the (distance, cell) seeds and of the cells
+        # they lead to, one distance at a time.
+        grid, dist, adjacent = self.state.grid, self.dist, self.adjacent
+        levels = {}
+        for d, cell in seeds:
+            levels.setdefault(d, []).append(cell)
+        d = min(levels, default=0)
+        while levels:
+            cells = levels.pop(d, None)
+            d += 1
+            if not cells:
+                continue
+            further = []
+            for cell in cells:
+                if dist[cell] < d:
+                    continue
+                if dist[cell] == INF:
+                    self.reachable += 1
+                dist[cell] = d - 1
+                for near in adjacent[cell]:
+                    if (
+                        dist[near] > d
+                        and grid[near] != SNAKE
+                        and grid[near] != OBSTACLE
+                    ):
+                        further.append(near)
+            if further:
+                levels.setdefault(d, []).extend(further)
+
+    def catch_up(self):
+        """Repair the field after the last tick, or search it again if more happened."""
+        state = self.state
+        cols = state.cols
+        head = state.head[1] * cols + state.head[0]
+        if (
+            head == self.head
+            and len(state.tail) == self.length
+            and state.fruit_version == self.fruit_version
+            and state.resets == self.resets
+        ):
+            return  # No tick since the last move
+        if (
+            self.head is None
+            or state.resets != self.resets
+            or head not in self.adjacent[self.head]
+            or state.border_wrap != self.border_wrap
+            or not (0 <= len(state.tail) - self.length <= 1)
+            or self.fruit_version + len(state.fruit_changes) != state.fruit_version
+        ):
+            self.rebuild()
+            return
+
+        # The head's cell and the apples eaten lose their distance, the tail
+        # tip's cell and the apples dropped may give shorter ones.
+        fruits = {y * cols + x for x, y in state.fruit_changes}
+        lost = {head} | {cell for cell in fruits if state.grid[cell] != APPLE}
+        self.raise_([cell for cell in lost if self.dist[cell] != INF])
+        freed = [cell for cell in fruits if state.grid[cell] == APPLE]
+        if state.last_tip is not None:
+            freed.append(state.last_tip[1] * cols + state.last_tip[0])
+        self.lower(freed)
+
+    ## Moves
+
+    def move(self):
+        """Return the direction (xmov, ymov) to take on the next tick."""
+        state = self.state
+        if not state.alive:
+            return state.xmov, state.ymov
+        self.catch_up()
+
+        grid, cols, dist = state.grid, state.cols, self.dist
+        head = state.head[1] * cols + state.head[0]
+        self.head = head
+        self.length = len(state.tail)
+        self.fruit_version = state.fruit_version
+        self.resets = state.resets
+
+        # The cell the tail tip leaves on the next tick is safe to move to.
+        tail = state.tail
+        if tail and not state.got_apple:
+            x, y = tail[-1]
+            tip = y * cols + x
+        else:
+            tip = None
+
+        moves = []
+        for dx, dy in DIRECTIONS:
+            if dx == -state.xmov and dy == -state.ymov:
+                continue
+            x, y = state.head[0] + dx, state.head[1] + dy
+            if state.border_wrap:
+                x %= cols
+                y %= state.rows
+            elif not (0 <= x < cols and 0 <= y < state.rows):
+                continue
+            cell = y * cols + x
+            if grid[cell] == OBSTACLE or (grid[cell] == SNAKE and cell != tip):
+                continue
+            moves.append((cell, (dx, dy)))
+        if not moves:
+            return state.xmov, state.ymov
+
+        # Down the field, straight ahead if it's all the same.
+        straight = (state.xmov, state.ymov)
+        cell, direction = min(
+            moves, key=lambda move: (dist[move[0]], move[1] != straight)
+        )
+        free = cols * state.rows - len(state.obstacles)
+        tight = (
+            dist[cell] == INF
+            or self.reachable <= len(tail) + 1
+            or len(tail) + 1 >= CYCLE_FILL * free
+        )
+        if not tight or self.cycle is None:
+            return direction
+
+        # Along the cycle: the next cell on it, or the nearest one ahead of the
+        # head if that one is taken.
+        cycle, total = self.cycle, len(self.cycle)
+        cell, direction = min(
+            moves, key=lambda move: (cycle[move[0]] - cycle[head]) % total
+        )
+        return direction
+
+
+if __name__ == "__main__":
+    # Soak run: python -m app.autopilot [games [grid_size]]
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    grid_size = int(sys.argv[2]) if len(sys.argv) > 2 else size[2]
+    cols, rows = board_size(grid_size)
+
+    ticks = 0
+    scores = []
+    thinking = 0.0
+    started = time.perf_counter()
+    for seed in range(games):
+        state = GameState(cols, rows, seed=seed)
+        autopilot = Autopilot(state)
+        while True:
+            before = time.perf_counter()
+            direction = autopilot.move()
+            thinking += time.perf_counter() - before
+            ticks += 1
+            if state.step(direction) & DIED:
+                break
+        scores.append(state.score)
+    elapsed = time.perf_counter() - started
+
+    print(f"{games} games on {cols}x{rows} cells, {ticks} ticks in {elapsed:.2f} s")
+    print(f"{ticks / elapsed:.0f} ticks/s, {thinking / ticks * 1e6:.1f} us per move")
+    print(f"Scores: mean {sum(scores) / games:.1f}, best {max(scores)}")
@@ -0,0 +1,250 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Batch simulation engine.
+#
+# Steps many independent boards at once with NumPy, following the same rules
+# as app.engine.GameState. Each board's snake body is kept in an occupancy
+# tensor where every tail cell holds the number of moves left before the tail
+# retracts from it, so that moving, growing and self-bite checks are whole
+# array operations instead of per-game loops.
+
+import numpy as np
+
+from app.config import *
+from app.engine import ATE_APPLE, ATE_ORANGE, DIED, DIRECTIONS
+
+# Actions are indices in DIRECTIONS; NO_ACTION keeps the current direction.
+NO_ACTION = -1
+_DIRECTIONS = np.array(DIRECTIONS, dtype=np.int32)
+
+
+class BatchGame:
+    def __init__(
+        self, n, cols, rows, border_wrap=False, obstacle_count=OBSTACLE_COUNT, seed=None
+    ):
+        """
+        Create n games on boards of cols x rows cells.
+        :param border_wrap: whether the snakes wrap around the borders.
+        :param obstacle_count: number of static obstacles on each board.
+        :param seed: seed of the batch's random number generator.
+        """
+        self.n = n
+        self.cols = cols
+        self.rows = rows
+        self.border_wrap = border_wrap
+        self.random = np.random.default_rng(seed)
+        self.index = np.arange(n)
+
+        # Cells are (x, y); a fruit at (-1, -1) means the board is full.
+        self.head = np.zeros((n, 2), dtype=np.int32)
+        self.direction = np.zeros((n, 2), dtype=np.int32)
+        self.apple = np.full((n, 2), -1, dtype=np.int32)
+        self.orange = np.full((n, 2), -1, dtype=np.int32)
+
+        # Occupancy tensors, indexed [game, y, x].
+        self.body = np.zeros((n, rows, cols), dtype=np.int32)
+        self.obstacles = np.zeros((n, rows, cols), dtype=bool)
+
+        self.length = np.zeros(n, dtype=np.int32)
+        self.energy = np.zeros(n, dtype=np.int32)
+        self.got_apple = np.zeros(n, dtype=bool)
+        self.alive = np.zeros(n, dtype=bool)
+        self.speed = np.ones(n)
+
+        # The snakes are born,
+        self.reset()
+
+        # and the boards are set around them.
+        head_x = np.arange(cols) == self.head[:, 0, None]
+        head_y = np.arange(rows) == self.head[:, 1, None]
+        in_line = head_x[:, None, :] | head_y[:, :, None]
+        for _ in range(obstacle_count):
+            cells = self.random_free_cells(self.index, exclude=in_line)
+            placed = cells[:, 0] >= 0
+            self.obstacles[self.index[placed], cells[placed, 1], cells[placed, 0]] = True
+        self.apple = self.random_free_cells(self.index)
+        self.orange = self.random_free_cells(self.index)
+
+    @property
+    def score(self):
+        return self.length
+
+    def reset(self, mask=None):
+        """Respawn the snakes of the games in mask (all of them by default)."""
+        idx = self.index if mask is None else self.index[mask]
+        if len(idx) == 0:
+            return
+
+        # Not too close to the border (minimum of 2 border squares), nor on an
+        # obstacle: a few random tries, then a pick among the free cells, those
+        # away from the border if there are any.
+        self.body[idx] = 0
+        self.head[idx] = -1
+        pending = idx
+        if self.cols > 3 and self.rows > 3:
+            for _ in range(3):
+                x = self.random.integers(2, self.cols - 1, len(pending))
+                y = self.random.integers(2, self.rows - 1, len(pending))
+                taken = self.obstacles[pending, y, x]
+                self.head[pending[~taken], 0] = x[~taken]
+                self.head[pending[~taken], 1] = y[~taken]
+                pending = pending[taken]
+                if len(pending) == 0:
+                    break
+        if len(pending):
+            inner = np.zeros((self.rows, self.cols), dtype=bool)
+            inner[2 : self.rows - 1, 2 : self.cols - 1] = True
+            border = np.broadcast_to(~inner, self.obstacles.shape)
+            cells = self.random_free_cells(pending, exclude=border)
+            anywhere = cells[:, 0] < 0
+            cells[anywhere] = self.random_free_cells(pending[anywhere])
+            self.head[pending] = cells
+
+        # Head away from the nearest border.
+        x, y = self.head[idx, 0], self.head[idx, 1]
+        horizontal = np.minimum(x, self.cols - x) < np.minimum(y, self.rows - y)
+        self.direction[idx, 0] = np.where(
+            horizontal, np.where(x < self.cols - x, 1, -1), 0
+        )
+        self.direction[idx, 1] = np.where(
+            horizontal, 0, np.where(y < self.rows - y, 1, -1)
+        )
+
+        self.length[idx] = 0
+        self.energy[idx] = MAX_ENERGY
+        self.got_apple[idx] = False
+        self.speed[idx] = 1.0
+
+        # On a board with no free cell left, the snake stays dead.
+        self.alive[idx] = self.head[idx, 0] >= 0
+        idx = idx[self.alive[idx]]
+
+        # Don't respawn on top of a fruit.
+        for fruit in (self.apple, self.orange):
+            under = idx[(fruit[idx] == self.head[idx]).all(axis=1)]
+            if len(under):
+                fruit[under] = self.random_free_cells(under)
+
+    ## Spawning
+
+    def free_cells(self, idx):
+        """Return the mask of the cells of games idx that hold nothing."""
+        free = (self.body[idx] == 0) & ~self.obstacles[idx]
+        games = np.arange(len(idx))
+        for cells in (self.head[idx], self.apple[idx], self.orange[idx]):
+            on_board = (
+                (cells[:, 0] >= 0)
+                & (cells[:, 0] < self.cols)
+                & (cells[:, 1] >= 0)
+                & (cells[:, 1] < self.rows)
+            )
+            free[games[on_board], cells[on_board, 1], cells[on_board, 0]] = False
+        return free
+
+    def random_free_cells(self, idx, exclude=None):
+        """
+        Draw one free cell, uniformly, for each of the games idx.
+        :param exclude: optional mask of further cells to avoid, indexed [game, y, x].
+        :return: array of (x, y) cells, (-1, -1) where no cell is free.
+        """
+        free = self.free_cells(idx)
+        if exclude is not None:
+            free &= ~exclude[idx]
+        free = free.reshape(len(idx), -1)
+
+        # The free cell with the highest random key is a uniform pick.
+        keys = self.random.random(free.shape)
+        keys[~free] = -1.0
+        flat = keys.argmax(axis=1)
+
+        cells = np.stack((flat % self.cols, flat // self.cols), axis=1).astype(np.int32)
+        cells[~free.any(axis=1)] = -1
+        return cells
+
+    ## Moving
+
+    def step(self, actions=None):
+        """
+        Advance all live games by one tick.
+        :param actions: optional array of indices in DIRECTIONS (or NO_ACTION), one per game.
+        :return: array with the bit mask of events (ATE_APPLE, ATE_ORANGE, DIED) of each game.
+        """
+        live = self.alive.copy()
+
+        # Only turns are accepted, never a reversal or the current direction.
+        if actions is not None:
+            actions = np.asarray(actions)
+            wanted = _DIRECTIONS[np.maximum(actions, 0)]
+            turn = (actions >= 0) & live & (
+                ((wanted[:, 0] != 0) & (self.direction[:, 0] == 0))
+                | ((wanted[:, 1] != 0) & (self.direction[:, 1] == 0))
+            )
+            self.direction[turn] = wanted[turn]
+
+        # Growing snakes keep their tail tip, the others retract it by one cell.
+        grow = live & self.got_apple
+        shrink = live & ~grow
+        self.body -= (self.body > 0) & shrink[:, None, None]
+
+        self.length += grow
+        self.got_apple[grow] = False
+        self.energy[grow] = np.minimum(
+            MAX_ENERGY,
+            self.energy[grow]
+            + self.random.integers(APPLE_ENERGY - 25, APPLE_ENERGY + 1, grow.sum()),
+        )
+
+        # The cell left by the head becomes the first tail segment.
+        moving = live & self.direction.any(axis=1)
+        idx = self.index[moving]
+        self.body[idx, self.head[idx, 1], self.head[idx, 0]] = self.length[idx]
+
+        # Move the heads along current direction.
+        self.head[moving] += self.direction[moving]
+        if self.border_wrap:
+            self.head[:, 0] %= self.cols
+            self.head[:, 1] %= self.rows
+
+        # Check for border crash, self-bite and obstacles.
+        x, y = self.head[:, 0], self.head[:, 1]
+        inside = (x >= 0) & (x < self.cols) & (y >= 0) & (y < self.rows)
+        cx, cy = np.clip(x, 0, self.cols - 1), np.clip(y, 0, self.rows - 1)
+        crash = (
+            ~inside
+            | (self.body[self.index, cy, cx] > 0)
+            | self.obstacles[self.index, cy, cx]
+        )
+
+        # Moving consumes energy.
+        self.energy[live] = np.maximum(0, self.energy[live] - ENERGY_CONSUMPTION)
+
+        died = live & (crash | (self.energy <= 0))
+        self.alive[died] = False
+        live &= ~died
+
+        # Pick up fruits and drop new ones.
+        ate_apple = live & (self.head == self.apple).all(axis=1)
+        self.got_apple[ate_apple] = True
+        if ate_apple.any():
+            self.apple[ate_apple] = self.random_free_cells(self.index[ate_apple])
+
+        ate_orange = live & (self.head == self.orange).all(axis=1)
+        self.speed[ate_orange] += 0.05
+        if ate_orange.any():
+            self.orange[ate_orange] = self.random_free_cells(self.index[ate_orange])
+
+        # Fruits left out while the board was full come back once there is room.
+        for fruit in (self.apple, self.orange):
+            missing = live & (fruit[:, 0] < 0)
+            if missing.any():
+                fruit[missing] = self.random_free_cells(self.index[missing])
+
+        return (
+            ate_apple * np.uint8(ATE_APPLE)
+            | ate_orange * np.uint8(ATE_ORANGE)
+            | died * np.uint8(DIED)
+        )
@@ -0,0 +1,404 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Benchmarks of the game's hot paths.
+#
+# Runs under SDL's dummy video and audio drivers, so it needs no window and
+# gives the same numbers on a desktop and on a build machine. Each benchmark
+# is timed like timeit does: the call count grows until a run takes at least
+# MIN_RUN_TIME, then the best and median of REPEAT runs are kept.
+#
+#   python -m app.bench [-o results.json] [--compare baseline.json] [--quick]
+#
+# The results are JSON, with the commit and versions they were taken on, so
+# that two commits can be compared with --compare.
+
+import os
+import tempfile
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+# The game the benchmarks build keeps its leaderboard in a directory of its
+# own, away from the player's data. Set before app.leaderboard is imported.
+import app.config
+
+DATA_DIR = tempfile.TemporaryDirectory(prefix="coral-bench-")
+app.config.LEADERBOARD_FILENAME = os.path.join(DATA_DIR.name, "leaderboard.sqlite3")
+app.config.HIGHSCORE_FILENAME = os.path.join(DATA_DIR.name, "highscore.bin")
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import pygame
+
+from app.autopilot import Autopilot, hamiltonian_cycle
+from app.batch import NO_ACTION
+from app.config import *
+from app.engine import APPLE, DIED, EMPTY, SNAKE, GameState, board_size
+
+MIN_RUN_TIME = 0.2  # Shortest timed run, in seconds.
+REPEAT = 5  # Timed runs per benchmark.
+SNAKE_LENGTHS = (10, 100, 1000)
+FREE_CELLS = (1, 16, 256)  # Free cells left on the nearly full boards.
+BOT_COUNTS = (10, 100, 1000)
+ARENA_SIZE = (200, 200)  # Cells of the arena the bots play in.
+
+
+##
+## Boards for the benchmarks
+##
+def snake_on_cycle(grid_size, length):
+    """
+    Return a game whose snake of the given length lies on a cycle of the
+    board, and the direction to take in each cell to keep following it.
+    """
+    cols, rows = board_size(grid_size)
+    path = hamiltonian_cycle(cols, rows)
+    length = min(length, len(path) - 8)
+    turns = {
+        cell: (
+            (path[(i + 1) % len(path)][0] - cell[0]),
+            (path[(i + 1) % len(path)][1] - cell[1]),
+        )
+        for i, cell in enumerate(path)
+    }
+
+    state = GameState(cols, rows, obstacle_count=0, seed=0)
+
+    # Take the snake and the fruits off the board, lay the snake along the
+    # path instead, and drop the fruits again.
+    for x, y in [state.head, *state.tail, *state.fruits]:
+        state.grid[y * cols + x] = EMPTY
+        state.free.add(y * cols + x)
+    state.tail.clear()
+    kinds = list(state.fruits.values())
+    state.fruits.clear()
+
+    *tail, head = path[:length]
+    for x, y in path[:length]:
+        state.grid[y * cols + x] = SNAKE
+        state.free.remove(y * cols + x)
+    for x, y in tail:
+        state.tail.push(y * cols + x)
+    state.head = head
+    state.xmov, state.ymov = turns[head]
+    state.move_queue = []
+
+    for kind in kinds:
+        state.drop_fruit(kind)
+    return state, turns
+
+
+def follow(state, turns):
+    """
+    Advance the game one tick along its cycle. The snake neither grows nor
+    runs out of energy, so it keeps its length and never dies.
+    """
+    state.set_direction(*turns[state.head])
+    state.energy = MAX_ENERGY
+    state.got_apple = False
+    events = state.step()
+    assert state.alive
+    return events
+
+
+##
+## Benchmarks
+##
+def bench_step(length):
+    state, turns = snake_on_cycle(size[2], length)
+
+    def run(calls):
+        for _ in range(calls):
+            follow(state, turns)
+
+    return run
+
+
+def bench_is_in_position(length):
+    state, _ = snake_on_cycle(size[2], length)
+    cells = [
+        (x, y) for y in range(-1, state.rows + 1) for x in range(-1, state.cols + 1)
+    ]
+
+    def run(calls):
+        is_in_position = state.is_in_position
+        for i in range(calls):
+            is_in_position(*cells[i % len(cells)])
+
+    return run
+
+
+def bench_draw_grid(grid_size, cached):
+    from app.game import singleton_instance as gm
+
+    configs[1] = size.index(grid_size)
+
+    def run(calls):
+        for _ in range(calls):
+            if not cached:
+                gm.grid_surface = None
+            gm.draw_grid()
+
+    return run
+
+
+def bench_snake_draw(length):
+    from app.snake import Snake
+
+    configs[1] = 2
+    state, _ = snake_on_cycle(size[2], length)
+    snake = Snake(state)
+
+    def run(calls):
+        for i in range(calls):
+            snake.prepare(i % 8 / 8)
+            snake.draw()
+
+    return run
+
+
+def bench_drop_fruit(free):
+    cols, rows = board_size(size[2])
+    state = GameState(cols, rows, obstacle_count=0, seed=0)
+    cells = [cell for cell in state.free.cells[: len(state.free)]]
+    for cell in cells[free:]:
+        state.free.remove(cell)
+
+    def run(calls):
+        for _ in range(calls):
+            x, y = state.drop_fruit(APPLE)
+            del state.fruits[x, y]
+            state.fruit_changes.clear()
+            state.grid[y * cols + x] = EMPTY
+            state.free.add(y * cols + x)
+
+    return run
+
+
+def bench_arena_step(bots):
+    from app.arena import Arena
+
+    arena = Arena(*ARENA_SIZE, bots, player=False, seed=0, apples=bots // 2)
+
+    def run(calls):
+        for _ in range(calls):
+            arena.step()
+
+    return run
+
+
+def bench_autopilot(grid_size):
+    state = GameState(*board_size(grid_size), seed=0)
+    autopilot = Autopilot(state)
+
+    # A tick of a game played by the autopilot, starting over on death.
+    def run(calls):
+        for _ in range(calls):
+            if state.step(autopilot.move()) & DIED:
+                state.reset()
+
+    return run
+
+
+def bench_env_step():
+    from app.env import CoralEnv
+
+    env = CoralEnv(*board_size(size[2]), seed=0)
+    env.reset()
+
+    # Straight ahead, starting over on death.
+    def run(calls):
+        for _ in range(calls):
+            _, _, terminated, _, _ = env.step(NO_ACTION)
+            if terminated:
+                env.reset()
+
+    return run
+
+
+def bench_energy_bar():
+    from app.energybar import EnergyBar
+
+    energy_bar = EnergyBar()
+    surface = pygame.Surface(energy_bar.rect().size, pygame.SRCALPHA)
+
+    def run(calls):
+        for i in range(calls):
+            energy_bar.update(i % (MAX_ENERGY + 1), surface)
+
+    return run
+
+
+def bench_frame(dirty_rects):
+    import app.renderer
+    from app.game import singleton_instance as gm
+
+    configs[1] = 1
+    app.renderer.DIRTY_RECTS = dirty_rects
+    state, turns = snake_on_cycle(size[1], 50)
+    renderer = app.renderer.Renderer(state)
+    frames_per_tick = round(FRAME_RATE / velocity[configs[0]])
+
+    # A frame of the main loop, without waiting for its turn: run the tick
+    # that is due, if any, draw and present.
+    def run(calls):
+        for i in range(calls):
+            frame = i % frames_per_tick
+            if frame == 0:
+                follow(state, turns)
+                renderer.tick()
+            changed = renderer.draw(frame / frames_per_tick)
+            gm.present(changed)
+
+    return run
+
+
+def benchmarks():
+    """Return the benchmarks by name, as functions that build the runner of each."""
+    table = {}
+    for length in SNAKE_LENGTHS:
+        table[f"engine.step[length={length}]"] = lambda n=length: bench_step(n)
+    for length in SNAKE_LENGTHS:
+        table[f"engine.is_in_position[length={length}]"] = (
+            lambda n=length: bench_is_in_position(n)
+        )
+    for free in FREE_CELLS:
+        table[f"engine.drop_fruit[free={free}]"] = lambda n=free: bench_drop_fruit(n)
+    for grid_size in size:
+        table[f"autopilot.move[size={grid_size}]"] = (
+            lambda g=grid_size: bench_autopilot(g)
+        )
+    table["env.step"] = bench_env_step
+    for bots in BOT_COUNTS:
+        table[f"arena.step[bots={bots}]"] = lambda n=bots: bench_arena_step(n)
+    for grid_size in size:
+        for cached in (False, True):
+            name = f"game.draw_grid[size={grid_size},cached={cached}]"
+            table[name] = lambda g=grid_size, c=cached: bench_draw_grid(g, c)
+    for length in SNAKE_LENGTHS:
+        table[f"snake.draw[length={length}]"] = lambda n=length: bench_snake_draw(n)
+    table["energybar.update"] = bench_energy_bar
+    for dirty_rects in (False, True):
+        table[f"main.frame[dirty_rects={dirty_rects}]"] = (
+            lambda d=dirty_rects: bench_frame(d)
+        )
+    return table
+
+
+##
+## Timing
+##
+def measure(run, min_time=MIN_RUN_TIME, repeat=REPEAT):
+    """
+    Time a benchmark runner.
+    :return: the call count of each run and the seconds per call of each run.
+    """
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        run(calls)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        calls *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    times = [elapsed / calls]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        run(calls)
+        times.append((time.perf_counter() - started) / calls)
+    return calls, times
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(map(str, pygame.get_sdl_version())),
+        "platform": platform.platform(),
+        "video_driver": os.environ["SDL_VIDEODRIVER"],
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline):
+    """Print how each benchmark changed against a baseline run."""
+    print(
+        f"{'benchmark':<48} {'baseline':>12} {'now':>12} {'change':>8}", file=sys.stderr
+    )
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["min"]
+        now = result["min"]
+        print(
+            f"{name:<48} {before * 1e6:>10.2f}us {now * 1e6:>10.2f}us"
+            f" {(now / before - 1) * 100:>+7.1f}%",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the game's hot paths.")
+    parser.add_argument(
+        "-o", "--output", help="file to write the JSON results to (default: stdout)"
+    )
+    parser.add_argument(
+        "--compare", help="JSON results of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="shorter runs, rougher numbers"
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="",
+        help="only run benchmarks whose name contains this",
+    )
+    args = parser.parse_args()
+
+    min_time, repeat = (MIN_RUN_TIME / 10, 3) if args.quick else (MIN_RUN_TIME, REPEAT)
+    results = {"environment": environment(), "benchmarks": {}}
+    for name, setup in benchmarks().items():
+        if args.filter not in name:
+            continue
+        calls, times = measure(setup(), min_time, repeat)
+        results["benchmarks"][name] = {
+            "min": min(times),
+            "median": statistics.median(times),
+            "calls": calls,
+            "repeat": repeat,
+        }
+        print(f"{name:<48} {min(times) * 1e6:>10.2f}us", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ WIDTH, HEIGHT = 800, 800     # Default game screen dimensions.
 
 SNAKE_COLOR      = "#00aa00"  # Color of the snake's head.
 DEAD_SNAKE_COLOR = "#4b0082"  # Color of the dead snake's head.
+BOT_SNAKE_COLOR  = "#1e90ff"  # Color of the bot snakes.
 APPLE_COLOR     = "#aa0000"  # Color of the apple.
 ORANGE_COLOR    = "#ffa500"  # Color of the orange.
 ARENA_COLOR     = "#202020"  # Color of the ground.
@@ -28,6 +29,10 @@ STEM_COLOR      = "#228B22"
 SELECTED_CONFIG_COLOR = "#DE6604"  # Color of the selected config.
 
 WINDOW_TITLE    = "Coral"  # Window title.
+DIRTY_RECTS     = True     # Redraw only the parts of the arena that changed.
+SCALE_TILE      = 80       # Pixels of the arena scaled at a time to a smaller window (about).
+FRAME_RATE      = 60       # Frames drawn per second (the game speed sets the moves per second).
+STARTUP_BUDGET  = 1.0      # Seconds the game may take to open its window before it's reported.
 MAX_QUEUE_SIZE = 3 # Movement queue max size
 
 OBSTACLE_COUNT = 5
@@ -55,6 +60,10 @@ border_wrap = False
 is_muted = False #Definied is muted as false 
 instructions_shown = False
 
-HIGHSCORE_FILENAME = "data/highscore.bin"
+HIGHSCORE_FILENAME = "data/highscore.bin"  # High score of older versions, imported once.
+LEADERBOARD_FILENAME = "data/leaderboard.sqlite3"  # Every game played.
+LEADERBOARD_SIZE = 10  # Best games kept ranked per combination of settings.
+REPLAY_FILENAME = "data/last_game.crpl"  # Recording of the last game played.
+PROFILE_FILENAME = "data/profile.json"  # Frame phase histograms, written on exit when profiling.
 
 language = "english"
@@ -8,35 +8,39 @@
 import pygame
 
 from app.config import *
+from app.fonts import GlyphAtlas
 from app.game import singleton_instance as gm
 
 class EnergyBar:
 
-    def __init__(self, initalEnergy = MAX_ENERGY):
+    def __init__(self):
         self.x = 0
         self.y = 0
         self.width = ENERGY_BAR_WIDTH
         self.height = ENERGY_BAR_HEIGHT
-        self.energy = initalEnergy
+        self.energy = MAX_ENERGY
 
-    def update(self):
-        pygame.draw.rect(gm.arena, RED_COLOR, (self.x, self.y, self.width, self.height))
-        self.decrease_energy(ENERGY_CONSUMPTION)
+        # The label is composed from pre-rendered pieces.
+        self.label_glyphs = GlyphAtlas(
+            gm.IN_GAME_FONT, WHITE_COLOR, [*"0123456789", "Energy: ", f" / {MAX_ENERGY}"]
+        )
+
+    def label(self, energy):
+        return ["Energy: ", *str(energy), f" / {MAX_ENERGY}"]
+
+    def rect(self):
+        """Return the area the bar and its widest label may cover."""
+        rect = pygame.Rect(self.x, self.y, self.width, self.height)
+        for energy in range(MAX_ENERGY + 1):
+            label_size = self.label_glyphs.size(self.label(energy))
+            rect.union_ip(pygame.Rect((self.x, self.y + 3), label_size))
+        return rect
+
+    def update(self, energy, surface):
+        # The energy itself is consumed by the game state, here it is only shown.
+        self.energy = energy
+        pygame.draw.rect(surface, RED_COLOR, (self.x, self.y, self.width, self.height))
         current_width = (self.energy / MAX_ENERGY) * ENERGY_BAR_WIDTH
-        pygame.draw.rect(gm.arena, GREEN_COLOR, (self.x, self.y, current_width, self.height))
-
-        label = pygame.font.Font("assets/font/MidnightLetters.ttf", int(WIDTH/48)).render(f'Energy: {self.energy} / {MAX_ENERGY}', True, WHITE_COLOR)
-
-        gm.arena.blit(label, (self.x, self.y + 3))
+        pygame.draw.rect(surface, GREEN_COLOR, (self.x, self.y, current_width, self.height))
 
-    def increase_energy(self, amount):
-        self.energy = min(MAX_ENERGY, self.energy + amount)
-
-    def decrease_energy(self, amount):
-        self.energy = max(0, self.energy - amount)
-
-    def get_energy(self):
-        return self.energy
-    
-    def set_max_energy(self):
-        self.energy = MAX_ENERGY
+        self.label_glyphs.draw(surface, self.label(self.energy), (self.x, self.y + 3))
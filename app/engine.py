@@ -0,0 +1,579 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Headless simulation core.
+#
+# Everything here works on board cells rather than pixels and does not depend
+# on pygame, so that games can be simulated without a display (e.g. for bots
+# and analysis). The pygame front end only draws what this module computes.
+
+import math
+import random
+import zlib
+from array import array
+
+from app.config import *
+
+# Movement directions, as (xmov, ymov).
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+
+# Contents of the cells of GameState.grid.
+EMPTY = 0
+SNAKE = 1
+OBSTACLE = 2
+APPLE = 3
+ORANGE = 4
+FRUITS = (APPLE, ORANGE)
+
+# Events reported by GameState.step() (bit mask).
+ATE_APPLE = 1
+ATE_ORANGE = 2
+DIED = 4
+
+
+def board_size(grid_size, width=WIDTH, height=HEIGHT):
+    """Return the (columns, rows) of an arena divided in cells of grid_size."""
+    # A partial cell at the right or bottom edge is still part of the arena.
+    return -(-width // grid_size), -(-height // grid_size)
+
+
+##
+## Snake tail
+##
+class Tail:
+    """Ring buffer of the snake's tail cells, the first one next to the head."""
+
+    __slots__ = ("cols", "cells", "start", "length")
+
+    def __init__(self, cols, capacity=16):
+        """
+        :param cols: number of columns of the board.
+        :param capacity: number of cells to make room for; the buffer doubles
+            whenever the tail outgrows it.
+        """
+        self.cols = cols
+        # Cells are stored as grid indices (y * cols + x).
+        self.cells = array("i", bytes(4 * max(1, capacity)))
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("tail index out of range")
+        cell = self.cells[(self.start + i) % len(self.cells)]
+        return cell % self.cols, cell // self.cols
+
+    def __iter__(self):
+        cells, cols = self.cells, self.cols
+        capacity = len(cells)
+        for i in range(self.start, self.start + self.length):
+            cell = cells[i % capacity]
+            yield cell % cols, cell // cols
+
+    def push(self, cell):
+        """Prepend the grid index of a cell, next to the head."""
+        if self.length == len(self.cells):
+            # Full: unroll it into twice the room, the first cell first.
+            cells = self.cells[self.start :] + self.cells[: self.start]
+            cells.frombytes(bytes(4 * len(cells)))
+            self.cells = cells
+            self.start = 0
+        self.start = (self.start - 1) % len(self.cells)
+        self.cells[self.start] = cell
+        self.length += 1
+
+    def pop(self):
+        """Remove the tail tip and return its grid index."""
+        if not self.length:
+            raise IndexError("pop from empty tail")
+        self.length -= 1
+        return self.cells[(self.start + self.length) % len(self.cells)]
+
+    def clear(self):
+        self.start = 0
+        self.length = 0
+
+
+##
+## Free cells
+##
+class FreeCells:
+    """Set of the free cells of a board, with O(1) add, remove and random pick."""
+
+    __slots__ = ("cells", "position", "length")
+
+    def __init__(self, size, full=True):
+        """
+        :param size: number of cells of the board.
+        :param full: whether all cells start in the set (otherwise none do).
+        """
+        # The first length entries of cells are the free grid indices, and
+        # position maps each grid index to its entry (-1 if not free).
+        self.cells = array("i", range(size))
+        if full:
+            self.position = array("i", range(size))
+            self.length = size
+        else:
+            self.position = array("i", [-1]) * size
+            self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, cell):
+        return self.position[cell] >= 0
+
+    def add(self, cell):
+        if self.position[cell] >= 0:
+            return
+        self.cells[self.length] = cell
+        self.position[cell] = self.length
+        self.length += 1
+
+    def remove(self, cell):
+        i = self.position[cell]
+        if i < 0:
+            return
+        # Swap the last free cell into the vacated entry.
+        self.length -= 1
+        last = self.cells[self.length]
+        self.cells[i] = last
+        self.position[last] = i
+        self.position[cell] = -1
+
+    def sample(self, random):
+        """Return a random free grid index, or None if there is none."""
+        if not self.length:
+            return None
+        return self.cells[random.randrange(self.length)]
+
+
+##
+## Game state
+##
+class GameState:
+    # A single player's game is the snake itself; see app.arena for games of
+    # many snakes, which the renderer draws through the same attributes.
+    bot = False
+    cleared = ()  # Snake cells emptied other than by the snakes moving
+
+    def __init__(
+        self,
+        cols,
+        rows,
+        border_wrap=False,
+        obstacle_count=OBSTACLE_COUNT,
+        seed=None,
+        apples=1,
+        oranges=1,
+    ):
+        """
+        Create a new game on a board of cols x rows cells.
+        :param border_wrap: whether the snake wraps around the borders.
+        :param obstacle_count: number of static obstacles on the board.
+        :param seed: seed of the game's random number generators (random if None).
+        :param apples: number of apples on the board at a time (see n_apple).
+        :param oranges: number of oranges on the board at a time.
+        """
+        self.cols = cols
+        self.rows = rows
+        self.border_wrap = border_wrap
+
+        # One random stream per subsystem, all derived from the seed, so that
+        # a change in how one of them draws numbers leaves the others alone
+        # and a game can be replayed from its seed.
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.random = random.Random(f"{seed}/spawn")  # Snake and obstacle cells
+        self.fruit_random = random.Random(f"{seed}/fruit")
+        self.energy_random = random.Random(f"{seed}/energy")
+
+        # What is in each cell (EMPTY, SNAKE, OBSTACLE, APPLE or ORANGE),
+        # indexed y * cols + x, so that a single lookup at the head tells
+        # what it runs into, whatever the length of the snake or the number
+        # of fruits.
+        self.grid = bytearray(cols * rows)
+
+        # Cells holding neither the snake, an obstacle nor a fruit.
+        self.free = FreeCells(cols * rows)
+
+        self.head = None
+        self.tail = Tail(cols)
+
+        self.obstacles = []
+
+        # The fruits on the board, by cell, and how many of each kind there
+        # should be. Fruits that didn't fit on a full board are missing, and
+        # dropped once there is room.
+        self.fruits = {}
+        self.fruit_counts = {APPLE: apples, ORANGE: oranges}
+        self.missing = {APPLE: 0, ORANGE: 0}
+        self.fruit_version = 0  # Counts the fruits eaten and dropped.
+        self.fruit_changes = []  # The cells where they were, in the last tick.
+
+        # The snake is born,
+        self.resets = 0  # Counts the times it was (re)spawned.
+        self.reset()
+
+        # and the board is set around it.
+        self.place_obstacles(obstacle_count)
+        for kind in FRUITS:
+            for _ in range(self.fruit_counts[kind]):
+                self.drop_fruit(kind)
+
+    def reset(self):
+        """Respawn the snake, keeping obstacles and fruits where they are."""
+        self.resets += 1
+        # Clear the old snake from the grid. A snake that starved as it
+        # reached a fruit leaves the fruit where it was.
+        if self.head is not None:
+            for x, y in [self.head, *self.tail]:
+                if self.is_in_position(x, y):
+                    if (x, y) in self.fruits:
+                        self.grid[y * self.cols + x] = self.fruits[x, y]
+                    else:
+                        self.grid[y * self.cols + x] = EMPTY
+                        self.free.add(y * self.cols + x)
+        self.tail.clear()
+
+        # Don't respawn on top of an obstacle or a fruit. On a board with no
+        # free cell left, the snake stays dead.
+        index = self.random_spawn_cell()
+        if index is None:
+            self.alive = False
+            return
+        self.head = index % self.cols, index // self.cols
+        self.grid[index] = SNAKE
+        self.free.remove(index)
+
+        # Initial direction
+        # xmov :  -1 left,    0 still,   1 right
+        # ymov :  -1 up       0 still,   1 down
+        self.xmov, self.ymov = self.spawn_direction(*self.head)
+
+        self.last_tip = None
+        self.alive = True
+        self.got_apple = False
+        self.energy = MAX_ENERGY
+        self.move_queue = []
+
+        # Multiplier based on number of collected oranges.
+        self.speed = 1.0
+
+    @property
+    def score(self):
+        return len(self.tail)
+
+    @property
+    def snakes(self):
+        return (self,)
+
+    ## Spawning
+
+    def random_position(self):
+        # Not too close to the border (minimum of 2 border squares).
+        x = self.random.randint(2, self.cols - 2)
+        y = self.random.randint(2, self.rows - 2)
+        return x, y
+
+    def random_spawn_cell(self):
+        """
+        Return the grid index of a random free cell for the snake to spawn
+        in, or None if the board is full.
+        """
+        x, y = self.random_position()
+        index = y * self.cols + x
+        if index in self.free:
+            return index
+
+        # That one is taken: pick among the free cells, those away from the
+        # border if there are any.
+        cols, rows = self.cols, self.rows
+        free = self.free.cells[: len(self.free)]
+        inner = [
+            index
+            for index in free
+            if 2 <= index % cols <= cols - 2 and 2 <= index // cols <= rows - 2
+        ]
+        cells = inner or free
+        if not cells:
+            return None
+        return cells[self.random.randrange(len(cells))]
+
+    def spawn_direction(self, x, y):
+        # Head away from the nearest border.
+        left_dist, right_dist = x, self.cols - x
+        top_dist, bottom_dist = y, self.rows - y
+
+        if min(left_dist, right_dist) < min(top_dist, bottom_dist):
+            return (1 if left_dist < right_dist else -1), 0
+        return 0, (1 if top_dist < bottom_dist else -1)
+
+    def is_in_position(self, x, y):
+        """Determine whether any part of the snake is in cell (x, y)."""
+        if not (0 <= x < self.cols and 0 <= y < self.rows):
+            return False
+        return self.grid[y * self.cols + x] == SNAKE
+
+    def snake_at(self, x, y):
+        """Return the index in snakes of the snake in cell (x, y), or None."""
+        return 0 if self.is_in_position(x, y) else None
+
+    def random_free_cell(self, random=None):
+        """Return a random free cell, or None if the board is full."""
+        cell = self.free.sample(random or self.random)
+        if cell is None:
+            return None
+        return cell % self.cols, cell // self.cols
+
+    def drop_fruit(self, kind):
+        """
+        Drop a fruit of the given kind on a random free cell.
+        :return: the cell, or None if the board is full (the fruit is missing then).
+        """
+        cell = self.random_free_cell(self.fruit_random)
+        if cell is None:
+            self.missing[kind] += 1
+            return None
+        index = cell[1] * self.cols + cell[0]
+        self.free.remove(index)
+        self.grid[index] = kind
+        self.fruits[cell] = kind
+        self.fruit_version += 1
+        self.fruit_changes.append(cell)
+        return cell
+
+    def place_obstacles(self, count):
+        """
+        Put count obstacles on random free cells, off the row and column the
+        snake starts in, and fewer if they run out of such cells.
+        :return: the number of obstacles placed.
+        """
+        cols = self.cols
+        head_x, head_y = self.head
+        # The cells they may go in, as a set of their own to draw from.
+        cells = FreeCells(cols * self.rows, full=False)
+        for index in self.free.cells[: len(self.free)]:
+            if index % cols != head_x and index // cols != head_y:
+                cells.add(index)
+
+        for placed in range(count):
+            index = cells.sample(self.random)
+            if index is None:
+                return placed
+            cells.remove(index)
+            self.obstacles.append((index % cols, index // cols))
+            self.grid[index] = OBSTACLE
+            self.free.remove(index)
+        return count
+
+    ## Moving
+
+    def set_direction(self, xmov, ymov):
+        """Add a movement to the movement queue."""
+        # Only turns are accepted, never a reversal or the current direction.
+        if not ((xmov != 0 and self.xmov == 0) or (ymov != 0 and self.ymov == 0)):
+            return
+        if (
+            not (xmov == -self.xmov and ymov == -self.ymov)
+            and len(self.move_queue) <= MAX_QUEUE_SIZE
+        ):
+            self.move_queue.append((xmov, ymov))
+
+    def step(self, action=None):
+        """
+        Advance the game by one tick.
+        :param action: optional direction (xmov, ymov) to queue before moving.
+        :return: bit mask of the events (ATE_APPLE, ATE_ORANGE, DIED) of this tick.
+        """
+        if not self.alive:
+            return DIED
+        if action is not None:
+            self.set_direction(*action)
+        reached = EMPTY
+        self.fruit_changes.clear()
+
+        # Read and pop movement from queue.
+        if self.move_queue:
+            self.xmov, self.ymov = self.move_queue.pop(0)
+
+        # If head hasn't moved, tail shouldn't either (otherwise, self-bite).
+        if self.xmov or self.ymov:
+            # Prepend a new segment to tail.
+            self.tail.push(self.head[1] * self.cols + self.head[0])
+
+            # The cell the tail tip leaves (None while growing), for renderers
+            # that animate the move.
+            self.last_tip = None
+
+            if self.got_apple:
+                self.got_apple = False
+                self.energy = min(
+                    MAX_ENERGY,
+                    self.energy + self.energy_random.randint(APPLE_ENERGY - 25, APPLE_ENERGY),
+                )
+            else:
+                cell = self.tail.pop()
+                self.grid[cell] = EMPTY
+                self.free.add(cell)
+                self.last_tip = cell % self.cols, cell // self.cols
+
+            # Move the head along current direction.
+            x = self.head[0] + self.xmov
+            y = self.head[1] + self.ymov
+            if self.border_wrap:
+                x %= self.cols
+                y %= self.rows
+            self.head = (x, y)
+
+            # Check for border crash, self-bite and obstacles, and see what
+            # fruit the head reached, all from the cell it moved to.
+            if not (0 <= x < self.cols and 0 <= y < self.rows):
+                self.alive = False
+            else:
+                reached = self.grid[y * self.cols + x]
+                if reached == SNAKE or reached == OBSTACLE:
+                    self.alive = False
+                else:
+                    self.grid[y * self.cols + x] = SNAKE
+                    self.free.remove(y * self.cols + x)
+
+        # Moving consumes energy.
+        self.energy = max(0, self.energy - ENERGY_CONSUMPTION)
+        if self.energy <= 0:
+            self.alive = False
+
+        if not self.alive:
+            return DIED
+
+        events = 0
+
+        # If the head passes over an apple, lengthen the snake and drop another apple.
+        if reached == APPLE:
+            self.got_apple = True
+            events |= ATE_APPLE
+
+        # If the head passes over an orange, speed up and drop another orange.
+        elif reached == ORANGE:
+            self.speed += 0.05
+            events |= ATE_ORANGE
+
+        if events:
+            del self.fruits[self.head]
+            self.fruit_version += 1
+            self.fruit_changes.append(self.head)
+            self.drop_fruit(reached)
+
+        # Fruits left out while the board was full come back once there is room.
+        for kind in FRUITS:
+            while self.missing[kind] and len(self.free):
+                self.missing[kind] -= 1
+                self.drop_fruit(kind)
+
+        return events
+
+    ## Snapshots
+
+    def snapshot(self):
+        """
+        Return the whole state of the game as bytes, random streams included,
+        so that GameState.restore() can resume it exactly.
+        """
+        ints = [
+            self.cols, self.rows, self.border_wrap, *self.head, self.xmov, self.ymov,
+            self.alive, self.got_apple, self.energy, self.seed,
+            *(self.last_tip or (-1, -1)),
+            *(self.fruit_counts[kind] for kind in FRUITS),
+            *(self.missing[kind] for kind in FRUITS),
+            len(self.fruits),
+            *(n for (x, y), kind in self.fruits.items() for n in (y * self.cols + x, kind)),
+            len(self.move_queue), *(coord for move in self.move_queue for coord in move),
+            len(self.obstacles), *(coord for cell in self.obstacles for coord in cell),
+            len(self.tail), *(y * self.cols + x for x, y in self.tail),
+            len(self.free), *self.free.cells[: len(self.free)],
+        ]
+        floats = [self.speed]
+        for stream in (self.random, self.fruit_random, self.energy_random):
+            version, internal, gauss_next = stream.getstate()
+            ints += [version, *internal]
+            floats.append(math.nan if gauss_next is None else gauss_next)
+
+        data = array("q", [len(ints)]) + array("q", ints)
+        return zlib.compress(data.tobytes() + array("d", floats).tobytes() + self.grid)
+
+    @classmethod
+    def restore(cls, snapshot):
+        """Return a new game in the state saved by snapshot()."""
+        data = zlib.decompress(snapshot)
+        count = array("q", data[:8])[0]
+        ints = iter(array("q", data[8 : 8 + 8 * count]))
+        floats = iter(array("d", data[8 + 8 * count : 40 + 8 * count]))
+
+        def take(n):
+            return [next(ints) for _ in range(n)]
+
+        def cell():
+            x, y = take(2)
+            return None if x < 0 else (x, y)
+
+        state = cls.__new__(cls)
+        state.cols, state.rows = take(2)
+        state.border_wrap = bool(next(ints))
+        state.head = tuple(take(2))
+        state.xmov, state.ymov = take(2)
+        state.alive, state.got_apple = (bool(flag) for flag in take(2))
+        state.energy, state.seed = take(2)
+        state.last_tip = cell()
+        state.fruit_counts = dict(zip(FRUITS, take(len(FRUITS))))
+        state.missing = dict(zip(FRUITS, take(len(FRUITS))))
+        fruits = [tuple(take(2)) for _ in range(next(ints))]
+        state.move_queue = [tuple(take(2)) for _ in range(next(ints))]
+        state.obstacles = [tuple(take(2)) for _ in range(next(ints))]
+
+        size = state.cols * state.rows
+        state.tail = Tail(state.cols)
+        for index in reversed(take(next(ints))):
+            state.tail.push(index)
+
+        # The free cells must keep their order, as it decides random picks.
+        free = take(next(ints))
+        state.free = FreeCells(size)
+        state.free.position = array("i", [-1]) * size
+        state.free.length = len(free)
+        for i, index in enumerate(free):
+            state.free.cells[i] = index
+            state.free.position[index] = i
+
+        state.grid = bytearray(data[40 + 8 * count :])
+        # Not read from the grid, where a snake that starved on a fruit hides it.
+        state.fruits = {
+            (index % state.cols, index // state.cols): kind for index, kind in fruits
+        }
+        state.fruit_version = 0
+        state.fruit_changes = []
+        state.resets = 0
+
+        state.speed = next(floats)
+        streams = []
+        for _ in range(3):
+            version = next(ints)
+            internal = tuple(take(625))
+            gauss_next = next(floats)
+            stream = random.Random()
+            stream.setstate((version, internal, None if math.isnan(gauss_next) else gauss_next))
+            streams.append(stream)
+        state.random, state.fruit_random, state.energy_random = streams
+        return state
@@ -0,0 +1,176 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Environment for training policies.
+#
+# CoralEnv wraps a GameState in the reset()/step(action) interface of Gym
+# (Gymnasium's signatures, without depending on it), with no pygame and no
+# window. The observation is a dict of NumPy arrays:
+#
+#   grid       (rows, cols) uint8, the contents of each cell (EMPTY, SNAKE,
+#              OBSTACLE, APPLE or ORANGE, see app.engine)
+#   head       (2,) int32, the head's cell (x, y)
+#   direction  (2,) int32, the direction it moves in (xmov, ymov)
+#   energy     () int32, what is left of the energy bar (0 to MAX_ENERGY)
+#
+# The grid array is the game's own cell grid: the game writes its moves in
+# it, and nothing is copied or rebuilt on a step. The other arrays are
+# updated in place. Every step returns the same arrays, so copy them to keep
+# an observation. They can also be given to the environment (out), e.g. as
+# views of shared memory.
+#
+# Actions are indices in DIRECTIONS, or NO_ACTION to keep going. Like the
+# score, the reward is one per apple eaten. The game ends as it does on
+# screen: a crash into the border (without border wrap), the snake itself or
+# an obstacle, or an empty energy bar.
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.batch import NO_ACTION
+from app.config import *
+from app.engine import ATE_APPLE, DIED, DIRECTIONS, GameState, board_size
+
+
+def observation_spec(cols, rows):
+    """Return the (shape, dtype) of each array of the observations on a board of cols x rows cells."""
+    return {
+        "grid": ((rows, cols), np.uint8),
+        "head": ((2,), np.int32),
+        "direction": ((2,), np.int32),
+        "energy": ((), np.int32),
+    }
+
+
+class CoralEnv:
+    def __init__(
+        self,
+        cols=None,
+        rows=None,
+        border_wrap=False,
+        obstacle_count=OBSTACLE_COUNT,
+        apples=1,
+        oranges=1,
+        max_steps=None,
+        seed=None,
+        out=None,
+    ):
+        """
+        :param cols, rows: the board (by default, the game's at the current cell size).
+        :param border_wrap: whether the snake wraps around the borders.
+        :param obstacle_count: number of static obstacles on the board.
+        :param apples: number of apples on the board at a time.
+        :param oranges: number of oranges on the board at a time.
+        :param max_steps: steps after which an episode is truncated (None for no limit).
+        :param seed: seed of the episodes' seeds (random if None).
+        :param out: optional dict of the arrays to hold the observations, as
+            described by observation_spec() (C-contiguous).
+        """
+        if cols is None or rows is None:
+            cols, rows = board_size(size[configs[1]])
+        self.cols = cols
+        self.rows = rows
+        self.border_wrap = border_wrap
+        self.obstacle_count = obstacle_count
+        self.apples = apples
+        self.oranges = oranges
+        self.max_steps = max_steps
+        self.random = random.Random(seed)
+
+        spec = observation_spec(cols, rows)
+        if out is None:
+            out = {
+                name: np.zeros(shape, dtype) for name, (shape, dtype) in spec.items()
+            }
+        for name, (shape, dtype) in spec.items():
+            array = out[name]
+            if array.shape != shape or array.dtype != dtype:
+                raise ValueError(
+                    f"out['{name}'] must be {np.dtype(dtype)} of shape {shape}"
+                )
+        self.observation = out
+
+        # The bytes of the grid array, which the game's cell grid becomes.
+        self.grid = memoryview(out["grid"]).cast("B")
+
+        self.state = None
+        self.steps = 0
+        self.action_count = len(DIRECTIONS)
+
+    def reset(self, seed=None):
+        """
+        Start a new episode.
+        :param seed: seed of the game (by default, the next of the environment's seeds).
+        :return: the observation and an info dict.
+        """
+        if seed is None:
+            seed = self.random.getrandbits(63)
+        state = GameState(
+            self.cols,
+            self.rows,
+            border_wrap=self.border_wrap,
+            obstacle_count=self.obstacle_count,
+            seed=seed,
+            apples=self.apples,
+            oranges=self.oranges,
+        )
+        # From now on the game plays in the observation's grid.
+        self.grid[:] = state.grid
+        state.grid = self.grid
+        self.state = state
+        self.steps = 0
+        self.observe()
+        return self.observation, {"score": 0, "seed": seed}
+
+    def observe(self):
+        state, observation = self.state, self.observation
+        observation["head"][:] = state.head
+        observation["direction"][:] = state.xmov, state.ymov
+        observation["energy"][()] = state.energy
+
+    def step(self, action):
+        """
+        Advance the game by one tick.
+        :param action: index in DIRECTIONS of the way to turn, or NO_ACTION.
+        :return: observation, reward, terminated, truncated, info.
+        """
+        state = self.state
+        events = state.step(None if action == NO_ACTION else DIRECTIONS[action])
+        self.steps += 1
+        self.observe()
+
+        reward = 1.0 if events & ATE_APPLE else 0.0
+        terminated = bool(events & DIED)
+        truncated = (
+            not terminated
+            and self.max_steps is not None
+            and self.steps >= self.max_steps
+        )
+        info = {"score": state.score, "events": events}
+        return self.observation, reward, terminated, truncated, info
+
+
+if __name__ == "__main__":
+    # Time random play: python -m app.env [steps]
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    env = CoralEnv(seed=0)
+    env.reset()
+    actions = np.random.default_rng(0).integers(NO_ACTION, len(DIRECTIONS), steps)
+
+    episodes = 0
+    started = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+            episodes += 1
+    elapsed = time.perf_counter() - started
+    print(
+        f"{steps} steps, {episodes} episodes in {elapsed:.2f} s: {steps / elapsed:.0f} steps/s"
+    )
@@ -0,0 +1,68 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+import functools
+
+import pygame
+
+FONT_FILE = "assets/font/MidnightLetters.ttf"
+TEXT_CACHE_SIZE = 256  # How many rendered texts to keep around.
+
+# Fonts already loaded, by (file, size).
+_fonts = {}
+
+
+def display_format(surface):
+    """Return surface in the display's pixel format, so that blitting it is cheap."""
+    if not pygame.display.get_surface():
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+def get_font(size, file=FONT_FILE):
+    """Return the font of the given file and size, loading it only once."""
+    key = (file, size)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.Font(file, size)
+    return _fonts[key]
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font, text, antialias, color):
+    """
+    Render text as font.render() would, reusing recently rendered surfaces.
+    The returned surface is shared, so it must be blitted, never drawn on.
+    """
+    return display_format(font.render(text, antialias, color))
+
+
+class GlyphAtlas:
+    """Pre-rendered pieces of text (e.g. digits) to compose texts by blitting."""
+
+    def __init__(self, font, color, glyphs="0123456789"):
+        """
+        :param font: font to render the glyphs with.
+        :param color: color of the glyphs.
+        :param glyphs: the pieces of text to pre-render (single characters or labels).
+        """
+        self.glyphs = {glyph: render_text(font, glyph, True, color) for glyph in glyphs}
+        self.height = font.get_height()
+
+    def size(self, parts):
+        return sum(self.glyphs[part].get_width() for part in parts), self.height
+
+    def draw(self, surface, parts, dest):
+        """Blit the given sequence of glyphs side by side and return the area covered."""
+        x, y = dest
+        blits = []
+        for part in parts:
+            glyph = self.glyphs[part]
+            blits.append((glyph, (x, y)))
+            x += glyph.get_width()
+        surface.blits(blits, doreturn=False)
+        return pygame.Rect(dest, (x - dest[0], self.height))
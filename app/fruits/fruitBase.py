@@ -6,28 +6,24 @@
 #  This file is part of Coral, a derivative work of KobraPy.
 
 import pygame
-import random
 from app.config import *
 from app.game import singleton_instance as gm
 
 class BaseFruit:
-    def __init__(self, color, snake=None):
+    def __init__(self, color, cell):
         self.color = color
-        self.x = int(random.randint(0, WIDTH) / size[configs[1]]) * size[configs[1]]
-        self.y = int(random.randint(0, HEIGHT) / size[configs[1]]) * size[configs[1]]
+        self.recalc(cell)
 
-        if snake:
-            while snake.is_in_position(self.x, self.y):
-                # Prevent fruits from spawning on top of the snake
-                self.x = int(random.randint(0, WIDTH) / size[configs[1]]) * size[configs[1]]
-                self.y = int(random.randint(0, HEIGHT) / size[configs[1]]) * size[configs[1]]
+    def recalc(self, cell):
+        # Move the fruit to the given board cell (None while the board is full)
+        self.cell = cell
+        if cell is None:
+            return
+        self.x = cell[0] * size[configs[1]]
+        self.y = cell[1] * size[configs[1]]
 
         self.rect = pygame.Rect(self.x, self.y, size[configs[1]], size[configs[1]])
         self.radius = size[configs[1]] // 2
 
-    def recalc(self, snake=None):
-        # Reconstruct fruit object to recalculate position in case of conflict
-        self.__init__(snake)
-
     def update(self):
         pygame.draw.circle(gm.arena, self.color, (self.rect.centerx, self.rect.centery), self.radius)
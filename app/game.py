@@ -8,17 +8,25 @@
 #  This file is part of Coral, a derivative work of KobraPy.
 
 import pygame
+import atexit
 import sys
 import os
+import math
 
+from app.assets import AssetLoader
 from app.config import *
+from app.fonts import render_text
+from app.leaderboard import Leaderboard
 from app.translation import Translator
 
 
 # singleton_module.py
 class Game:
     def __init__(self):
-        pygame.init()
+        # Only the subsystems the game uses (not joysticks, cameras...); the
+        # mixer starts when the audio loads.
+        pygame.display.init()
+        pygame.font.init()
 
         self.clock = pygame.time.Clock()
 
@@ -41,63 +49,158 @@ class Game:
 
         self.win = pygame.display.set_mode((self.win_res, self.win_res))
 
-        # arena = pygame.Surface((WIDTH, HEIGHT))
-        self.arena = pygame.display.set_mode((WIDTH, HEIGHT))
-
-        # Play background sound and change volume
-        pygame.mixer.music.set_volume(base_volume_levels[0])
-        self.background_music = pygame.mixer.music.load(
-            "musics/CPU Talk - FMA - CC BY BoxCat Games.mp3"
+        # The game is drawn at its logical resolution (WIDTH x HEIGHT) on the
+        # arena, which is the window itself unless the window is smaller.
+        if self.win.get_size() == (WIDTH, HEIGHT):
+            self.arena = self.win
+        else:
+            self.arena = pygame.Surface((WIDTH, HEIGHT), 0, self.win)
+
+        # Blocks of arena pixels that scale to a whole number of window
+        # pixels, and the tiles of whole blocks the arena is scaled in.
+        gcd = math.gcd(WIDTH, self.win_res), math.gcd(HEIGHT, self.win_res)
+        self.scale_block = WIDTH // gcd[0], HEIGHT // gcd[1]
+        self.scaled_block = self.win_res // gcd[0], self.win_res // gcd[1]
+        self.scale_tile = tuple(
+            block * max(1, SCALE_TILE // block) for block in self.scale_block
         )
-        pygame.mixer.music.play(-1)
 
-        # Set game's sounds effects
-        self.got_apple_sound = pygame.mixer.Sound("musics/got_apple.ogg")
-        self.got_apple_sound.set_volume(base_volume_levels[1])
+        pygame.display.set_caption(WINDOW_TITLE)
 
-        self.game_over_sound = pygame.mixer.Sound("musics/game_over.wav")
-        self.game_over_sound.set_volume(base_volume_levels[2])
+        # Load fonts first, as every screen needs them, then the audio.
+        # Nothing can be heard through SDL's dummy audio driver (headless and
+        # benchmark runs), so the audio isn't loaded then.
+        self.assets = AssetLoader(audio=os.environ.get("SDL_AUDIODRIVER") != "dummy")
+        fonts = [
+            self.assets.font(int(WIDTH / 10)),
+            self.assets.font(int(WIDTH / 20)),
+            self.assets.font(int(WIDTH / 48)),
+        ]
 
-        self.BIG_FONT = pygame.font.Font(
-            "assets/font/MidnightLetters.ttf", int(WIDTH / 10)
+        # Play background sound and change volume
+        self.background_music = self.assets.music(
+            "musics/CPU Talk - FMA - CC BY BoxCat Games.mp3", base_volume_levels[0]
         )
-        self.SMALL_FONT = pygame.font.Font(
-            "assets/font/MidnightLetters.ttf", int(WIDTH / 20)
+        self.background_music.play(-1)
+
+        # Set game's sounds effects
+        self.got_apple_sound = self.assets.sound(
+            "musics/got_apple.ogg", base_volume_levels[1]
         )
-        self.IN_GAME_FONT = pygame.font.Font(
-            "assets/font/MidnightLetters.ttf", int(WIDTH / 48)
+        self.game_over_sound = self.assets.sound(
+            "musics/game_over.wav", base_volume_levels[2]
         )
 
-        pygame.display.set_caption(WINDOW_TITLE)
+        self.assets.start()
+        self.loading_screen(fonts)
+        self.BIG_FONT, self.SMALL_FONT, self.IN_GAME_FONT = (
+            font.get() for font in fonts
+        )
 
         self.game_on = 1
 
-        self.score = self.BIG_FONT.render("1", True, MESSAGE_COLOR)
+        # Easy mode (snake wraps around the borders), chosen at the prompt.
+        self.border_wrap = border_wrap
+
+        self.score = render_text(self.BIG_FONT, "1", True, MESSAGE_COLOR)
         self.score_rect = self.score.get_rect(
             center=(WIDTH / 2, HEIGHT / 20 + HEIGHT / 30)
         )
 
-        self.highscore = self.get_high_score()
+        # Games played, loaded and saved in the background.
+        self.leaderboard = Leaderboard()
+        self.leaderboard.start()
+        atexit.register(self.leaderboard.close)
+
+        # Pre-rendered arena background (ground and grid lines) and the
+        # cell size it was drawn for.
+        self.grid_surface = None
+        self.grid_surface_size = None
 
         self.translator = Translator()
 
+    def loading_screen(self, assets):
+        """Show the progress of the asset loader until the given assets are ready."""
+        bar = pygame.Rect(0, 0, WIDTH / 2, HEIGHT / 40)
+        bar.center = (WIDTH / 2, HEIGHT / 2)
+
+        while not all(asset.ready for asset in assets):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+
+            self.arena.fill(ARENA_COLOR)
+            pygame.draw.rect(self.arena, GRID_COLOR, bar)
+            done = bar.copy()
+            done.width = bar.width * self.assets.progress
+            pygame.draw.rect(self.arena, MESSAGE_COLOR, done)
+            self.present()
+            self.clock.tick(FRAME_RATE)
+
+    def present(self, rects=None):
+        """
+        Show the arena in the window, scaled down if needed.
+        :param rects: the areas of the arena that changed (all of it by default).
+        """
+        if self.arena is self.win:
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            return
+
+        # The arena is scaled in fixed tiles, each on its own: the filter's
+        # steps drift across what it scales, so a tile must always be scaled
+        # from the same origin to come out the same whether it changed alone
+        # or with the whole arena. Only the tiles the areas touch are scaled.
+        (tw, th), (bw, bh), (sw, sh) = (
+            self.scale_tile,
+            self.scale_block,
+            self.scaled_block,
+        )
+        if rects is None:
+            rects = [self.arena.get_rect()]
+        tiles = set()
+        for rect in rects:
+            rect = rect.clip(self.arena.get_rect())
+            if rect.width and rect.height:
+                for x in range(rect.left // tw, (rect.right - 1) // tw + 1):
+                    for y in range(rect.top // th, (rect.bottom - 1) // th + 1):
+                        tiles.add((x, y))
+
+        updated = []
+        for x, y in tiles:
+            source = pygame.Rect(x * tw, y * th, tw, th).clip(self.arena.get_rect())
+            dest = pygame.Rect(
+                source.left // bw * sw,
+                source.top // bh * sh,
+                source.width // bw * sw,
+                source.height // bh * sh,
+            )
+            pygame.transform.smoothscale(
+                self.arena.subsurface(source), dest.size, self.win.subsurface(dest)
+            )
+            updated.append(dest)
+        pygame.display.update(updated)
+
     def center_prompt(self, title, subtitle) -> bool:
-        global hard_mode, border_wrap, CLOCK_TICKS
+        global hard_mode, CLOCK_TICKS
         resize_grid = False
 
         # Show title and subtitle
-        center_title = self.BIG_FONT.render(title, True, MESSAGE_COLOR)
+        center_title = render_text(self.BIG_FONT, title, True, MESSAGE_COLOR)
         center_title_rect = center_title.get_rect(center=(WIDTH / 2, HEIGHT * (0.3)))
         self.arena.blit(center_title, center_title_rect)
 
-        center_subtitle = self.SMALL_FONT.render(subtitle, True, MESSAGE_COLOR)
+        center_subtitle = render_text(self.SMALL_FONT, subtitle, True, MESSAGE_COLOR)
         center_subtitle_rect = center_subtitle.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.4))
         )
         self.arena.blit(center_subtitle, center_subtitle_rect)
 
-        center_subtitle = self.SMALL_FONT.render(
-            self.translator.message("configuration"), True, MESSAGE_COLOR
+        center_subtitle = render_text(
+            self.SMALL_FONT, self.translator.message("configuration"), True, MESSAGE_COLOR
         )
         center_subtitle_rect = center_subtitle.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.5))
@@ -105,8 +208,8 @@ class Game:
         self.arena.blit(center_subtitle, center_subtitle_rect)
 
         # Add hard mode prompt
-        hard_mode_text = self.SMALL_FONT.render(
-            self.translator.message("hard_mode"), True, MESSAGE_COLOR
+        hard_mode_text = render_text(
+            self.SMALL_FONT, self.translator.message("hard_mode"), True, MESSAGE_COLOR
         )
         hard_mode_text_rect = hard_mode_text.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.7))
@@ -114,15 +217,15 @@ class Game:
         self.arena.blit(hard_mode_text, hard_mode_text_rect)
 
         # Add easy mode prompt
-        easy_mode_text = self.SMALL_FONT.render(
-            self.translator.message("easy_mode"), True, MESSAGE_COLOR
+        easy_mode_text = render_text(
+            self.SMALL_FONT, self.translator.message("easy_mode"), True, MESSAGE_COLOR
         )
         easy_mode_text_rect = easy_mode_text.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.8))
         )
         self.arena.blit(easy_mode_text, easy_mode_text_rect)
 
-        pygame.display.update()
+        self.present()
 
         while ( event := pygame.event.wait() ):
             if event.type == pygame.KEYDOWN:
@@ -133,7 +236,7 @@ class Game:
                     # Show instructions
                     self.arena.fill(ARENA_COLOR)  # Fill with black background
                     self.display_instructions()
-                    pygame.display.update()
+                    self.present()
                     
                     # Wait for I to be pressed again
                     while True:
@@ -147,12 +250,12 @@ class Game:
                     # Restore game over screen
                     self.arena.fill(ARENA_COLOR)  # Fill with black background
                     self.arena.blit(old_surface, (0, 0))
-                    pygame.display.update()
+                    self.present()
                     continue
 
                 break
         # Reset game configurations before starting a new game
-        border_wrap = False
+        self.border_wrap = False
 
         if event.key == pygame.K_ESCAPE:  # 'ESC' quits game
             pygame.quit()
@@ -163,7 +266,7 @@ class Game:
             hard_mode = True
             configs[0] = 2
         if event.key == pygame.K_e:
-            border_wrap = True
+            self.border_wrap = True
 
         # Set CLOCK_TICKS back to normal if not in hard mode
         if not hard_mode:
@@ -191,7 +294,7 @@ class Game:
 
         y_offset = HEIGHT / 3
         for line in instructions:
-            text_surface = self.SMALL_FONT.render(line, True, (255, 255, 255))
+            text_surface = render_text(self.SMALL_FONT, line, True, (255, 255, 255))
             self.arena.blit(text_surface, (50, y_offset))
             y_offset += 50
 
@@ -206,35 +309,35 @@ class Game:
         return options
 
     def draw_config_line(self, title, subtitle, position, selected, translate=True):
-        center_subtitle = self.SMALL_FONT.render(self.translator.message(title), True, LINE_COLOR)
+        center_subtitle = render_text(self.SMALL_FONT, self.translator.message(title), True, LINE_COLOR)
         center_subtitle_rect = center_subtitle.get_rect(center=(WIDTH / 2, HEIGHT * (position)))
         self.arena.blit(center_subtitle, center_subtitle_rect)
 
         text_color = SELECTED_CONFIG_COLOR if selected else MESSAGE_COLOR
         text = self.translator.message(subtitle) if translate else subtitle
-        center_subtitle = self.SMALL_FONT.render(text, True, text_color)
+        center_subtitle = render_text(self.SMALL_FONT, text, True, text_color)
         center_subtitle_rect = center_subtitle.get_rect(center=(WIDTH / 2, HEIGHT * (position + 0.05)))
         self.arena.blit(center_subtitle, center_subtitle_rect)
 
     def draw_config(self, conf=[1, 1, 1, 1, 1], actualPos=0):
         # Title
         self.arena.fill(CONFIG_COLOR)
-        center_title = self.BIG_FONT.render(
-            self.translator.message("title_configuration"), True, MESSAGE_COLOR
+        center_title = render_text(
+            self.BIG_FONT, self.translator.message("title_configuration"), True, MESSAGE_COLOR
         )
         center_title_rect = center_title.get_rect(center=(WIDTH / 2, HEIGHT * (0.20)))
         self.arena.blit(center_title, center_title_rect)
 
         # Subtitle
-        center_subtitle = self.SMALL_FONT.render(
-            self.translator.message("configuration_1"), True, MESSAGE_COLOR
+        center_subtitle = render_text(
+            self.SMALL_FONT, self.translator.message("configuration_1"), True, MESSAGE_COLOR
         )
         center_subtitle_rect = center_subtitle.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.30))
         )
         self.arena.blit(center_subtitle, center_subtitle_rect)
-        center_subtitle = self.SMALL_FONT.render(
-            self.translator.message("configuration_2"), True, MESSAGE_COLOR
+        center_subtitle = render_text(
+            self.SMALL_FONT, self.translator.message("configuration_2"), True, MESSAGE_COLOR
         )
         center_subtitle_rect = center_subtitle.get_rect(
             center=(WIDTH / 2, HEIGHT * (0.35))
@@ -252,10 +355,10 @@ class Game:
                 translate = index != 4
             )
 
-        pygame.display.update()
+        self.present()
 
     def update_volume(self):
-        pygame.mixer.music.set_volume(
+        self.background_music.set_volume(
             base_volume_levels[0] * volume_multiplier[configs[3]]
         )
         self.got_apple_sound.set_volume(
@@ -268,102 +371,119 @@ class Game:
     def config_prompt(self) -> bool:
         self.draw_config()
 
-        # Wait for a keypress or a game quit event.
+        # Wait for a keypress or a game quit event, sleeping in between.
         n = 0
         stop = 0
-        while True:
-            if stop == 1:
-                break
-            for event in pygame.event.get():
-                if stop == 1:
-                    break
-                # App terminated
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                # Key pressed
-                if event.type == pygame.KEYDOWN:
-                    match event.key:
-                        case pygame.K_DOWN | pygame.K_s:
-                            n = (n + 1) % 5
-                        case pygame.K_UP | pygame.K_w:
-                            n = (n - 1) % 5
-                        case key if key in (
-                            pygame.K_RIGHT,
-                            pygame.K_d,
-                            pygame.K_LEFT,
-                            pygame.K_a,
-                        ):
-                            options = self.get_options()[n]
-                            if key in (pygame.K_RIGHT, pygame.K_d):
-                                configs[n] += 1
-                            else:
-                                configs[n] -= 1
-                            configs[n] %= len(options)
-                            if n == 3:
-                                self.update_volume()
-                            elif n == 4:
-                                self.translator.set_language(
-                                    self.translator.available_languages[configs[4]]
-                            )
-                        case pygame.K_ESCAPE:
-                            pygame.quit()
-                            sys.exit()
-                        case pygame.K_j:
-                            stop = 1
-                self.draw_config(configs, actualPos=n)
+        while not stop:
+            event = pygame.event.wait()
+            # App terminated
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            # The window was uncovered
+            if event.type == pygame.WINDOWEXPOSED:
+                self.present()
+            # Key pressed
+            if event.type == pygame.KEYDOWN:
+                match event.key:
+                    case pygame.K_DOWN | pygame.K_s:
+                        n = (n + 1) % 5
+                    case pygame.K_UP | pygame.K_w:
+                        n = (n - 1) % 5
+                    case key if key in (
+                        pygame.K_RIGHT,
+                        pygame.K_d,
+                        pygame.K_LEFT,
+                        pygame.K_a,
+                    ):
+                        options = self.get_options()[n]
+                        if key in (pygame.K_RIGHT, pygame.K_d):
+                            configs[n] += 1
+                        else:
+                            configs[n] -= 1
+                        configs[n] %= len(options)
+                        if n == 1:
+                            self.grid_surface = None
+                        elif n == 3:
+                            self.update_volume()
+                        elif n == 4:
+                            self.translator.set_language(
+                                self.translator.available_languages[configs[4]]
+                        )
+                    case pygame.K_ESCAPE:
+                        pygame.quit()
+                        sys.exit()
+                    case pygame.K_j:
+                        stop = 1
+                # Redraw only when something changed.
+                if not stop:
+                    self.draw_config(configs, actualPos=n)
         # Returns true if the grid size changed
         if (n == 1):
             return True
         return False
 
-    ## Get and save highscore from/in a file
-    def save_high_score(self, score):
-        if not os.path.exists("../data/"):
-            os.makedirs("../data/")
-
-        try:
-            with open(HIGHSCORE_FILENAME, "wb+") as file:
-                file.write(score.to_bytes(4, byteorder="big"))
-        except (FileNotFoundError, ValueError):
-            return 0
-
-    def get_high_score(self):
-        try:
-            with open(HIGHSCORE_FILENAME, "rb") as file:
-                return int.from_bytes(file.read(4), byteorder="big")
-        except (FileNotFoundError, ValueError):
-            return 0
-
     ## Display highscore
-    def display_highscore(self, score):
-        new_highscore = ""
-        if score > self.highscore:
-            # Update highscore
-            self.highscore = score
-            self.save_high_score(score)
-
-            new_highscore = "NEW "
+    def display_highscore(self, new_best=False):
+        """:param new_best: whether the game just played set the high score."""
+        new_highscore = "NEW " if new_best else ""
 
-        text = new_highscore + "Highscore: " + str(self.highscore)
+        text = new_highscore + "Highscore: " + str(self.leaderboard.best)
 
         # Display highscore value
-        center_highscore = self.SMALL_FONT.render(text, True, MESSAGE_COLOR)
+        center_highscore = render_text(self.SMALL_FONT, text, True, MESSAGE_COLOR)
         center_highscore_rect = center_highscore.get_rect(
             center=(WIDTH / 2, HEIGHT * 1 / 5)
         )
         self.arena.blit(center_highscore, center_highscore_rect)
 
-        pygame.display.update()
+        self.present()
 
     ##
     ## Draw the arena
     ##
+    def grid_background(self):
+        grid_size = size[configs[1]]
+
+        # The background never changes for a given cell size, so render it
+        # once and just blit it afterwards.
+        if self.grid_surface is None or self.grid_surface_size != grid_size:
+            self.grid_surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+            self.grid_surface.fill(ARENA_COLOR)
+            for x in range(0, WIDTH, grid_size):
+                for y in range(0, HEIGHT, grid_size):
+                    rect = pygame.Rect(x, y, grid_size, grid_size)
+                    pygame.draw.rect(self.grid_surface, GRID_COLOR, rect, 1)
+            self.grid_surface_size = grid_size
+
+        return self.grid_surface
+
     def draw_grid(self):
-        for x in range(0, WIDTH, size[configs[1]]):
-            for y in range(0, HEIGHT, size[configs[1]]):
-                rect = pygame.Rect(x, y, size[configs[1]], size[configs[1]])
-                pygame.draw.rect(self.arena, GRID_COLOR, rect, 1)
+        self.arena.blit(self.grid_background(), (0, 0))
+
+
+_instance = None
+
+
+def get_game():
+    """Return the Game, creating it (and opening the window) on first use."""
+    global _instance
+    if _instance is None:
+        _instance = Game()
+    return _instance
+
+
+class LazyGame:
+    """
+    Stand-in for the Game that creates it on first use, so that importing the
+    modules that share it opens no window (e.g. for tools and headless runs).
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_game(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_game(), name, value)
 
 
-singleton_instance = Game()
+singleton_instance = LazyGame()
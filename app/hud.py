@@ -0,0 +1,80 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+import pygame
+
+from app.config import *
+from app.energybar import EnergyBar
+from app.fonts import GlyphAtlas, render_text
+from app.game import singleton_instance as gm
+from app.translation import Translator
+
+
+##
+## Heads-up display
+##
+class Hud:
+    def __init__(self):
+        self.translator = Translator()
+        self.instructions_message = self.translator.id("instructions")
+        self.energy_bar = EnergyBar()
+        self.score_glyphs = GlyphAtlas(gm.BIG_FONT, SCORE_COLOR)
+
+        # The HUD covers the top of the arena, down to the score, and is kept
+        # on its own surface so that showing it is a single blit.
+        self.rect = pygame.Rect(
+            0, 0, WIDTH, gm.score_rect.top + gm.BIG_FONT.get_height()
+        )
+        self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self.energy_rect = self.energy_bar.rect()
+
+        # What the HUD currently shows (nothing yet).
+        self.score = None
+        self.energy = None
+        self.language = None
+        self.score_rect = pygame.Rect(gm.score_rect.topleft, (0, 0))
+
+    def update(self, score, energy):
+        """
+        Rebuild the HUD if the score, the energy or the language changed.
+        :return: the areas of the arena that look different now.
+        """
+        language = self.translator.default_language
+        changed = []
+        if language != self.language:
+            changed.append(self.rect)
+        if energy != self.energy:
+            changed.append(self.energy_rect)
+        if score != self.score:
+            score_rect = pygame.Rect(
+                gm.score_rect.topleft, self.score_glyphs.size(str(score))
+            )
+            changed.append(self.score_rect.union(score_rect))
+        if not changed:
+            return changed
+
+        self.surface.fill((0, 0, 0, 0))
+        self.energy_bar.update(energy, self.surface)
+
+        # Show score (snake length = head + tail)
+        self.score_rect = self.score_glyphs.draw(
+            self.surface, str(score), gm.score_rect.topleft
+        )
+
+        # Add the "Press (I)nstructions" text in the top-right corner
+        instruction_text = render_text(
+            gm.IN_GAME_FONT, self.translator.text(self.instructions_message), True, WHITE_COLOR
+        )
+        instruction_text_rect = instruction_text.get_rect(topright=(WIDTH - 10, 10))
+        self.surface.blit(instruction_text, instruction_text_rect)
+
+        self.score = score
+        self.energy = energy
+        self.language = language
+        return changed
+
+    def draw(self, surface):
+        surface.blit(self.surface, self.rect)
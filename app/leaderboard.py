@@ -0,0 +1,242 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Local leaderboard.
+#
+# Every game played is a row of an SQLite database (score, settings,
+# duration and date). The database is only touched by a worker thread:
+# it loads the best LEADERBOARD_SIZE scores of each combination of settings
+# when the game starts, then writes the sessions handed to it, each in its
+# own transaction, so that a crash loses at most the game being written and
+# never leaves a half-written file. The game itself only reads and updates
+# the tables kept in memory, so game over never waits for the disk. Other
+# files saved at game over (the replay) are handed to the same thread.
+
+import bisect
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from app.config import *
+
+CLOSE_TIMEOUT = 2.0  # Longest wait for the last writes on exit, in seconds.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    speed INTEGER NOT NULL,
+    grid_size INTEGER NOT NULL,
+    border_wrap INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_settings
+    ON sessions (speed, grid_size, border_wrap, score DESC);
+"""
+
+INSERT = """
+INSERT INTO sessions (score, speed, grid_size, border_wrap, duration, played)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# The best sessions of each combination of settings.
+TOP_QUERY = """
+SELECT score, speed, grid_size, border_wrap, duration, played FROM (
+    SELECT *, row_number() OVER (
+        PARTITION BY speed, grid_size, border_wrap ORDER BY score DESC, played
+    ) AS rank
+    FROM sessions
+) WHERE rank <= ?
+"""
+
+
+class Session:
+    """A game played: its score, the settings it was played with, and when."""
+
+    __slots__ = ("score", "speed", "grid_size", "border_wrap", "duration", "played")
+
+    def __init__(self, score, speed, grid_size, border_wrap, duration, played=None):
+        """
+        :param speed: index of the game speed in velocity.
+        :param grid_size: cell size in pixels.
+        :param duration: seconds played, pauses left out.
+        :param played: time.time() when the game ended (default: now).
+        """
+        self.score = score
+        self.speed = speed
+        self.grid_size = grid_size
+        self.border_wrap = bool(border_wrap)
+        self.duration = duration
+        self.played = time.time() if played is None else played
+
+    @property
+    def settings(self):
+        return self.speed, self.grid_size, self.border_wrap
+
+    @property
+    def rank_key(self):
+        # Best score first, the earliest of equal scores first.
+        return -self.score, self.played
+
+    def row(self):
+        return (
+            self.score,
+            self.speed,
+            self.grid_size,
+            int(self.border_wrap),
+            self.duration,
+            self.played,
+        )
+
+
+class Leaderboard:
+    def __init__(self, filename=LEADERBOARD_FILENAME, size=LEADERBOARD_SIZE):
+        """
+        :param filename: the SQLite database, created if it doesn't exist.
+        :param size: how many sessions to keep ranked per combination of settings.
+        """
+        self.filename = filename
+        self.size = size
+        self.tables = {}  # The best sessions by settings, best first.
+        self.best = 0  # The best score of all.
+        self.lock = threading.Lock()
+        self.writes = queue.Queue()
+        self.loaded = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Load the leaderboard and start writing sessions on a worker thread."""
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    def record(self, session):
+        """
+        Add a session to the leaderboard, saving it in the background.
+        :return: whether its score is the best of all so far.
+        """
+        # The best of all is only known once the saved sessions are loaded.
+        if self.thread is not None:
+            self.loaded.wait(CLOSE_TIMEOUT)
+        with self.lock:
+            new_best = session.score > self.best
+            self.add(session)
+        self.writes.put(session)
+        return new_best
+
+    def save_file(self, filename, data):
+        """
+        Write data to a file in the background, after the sessions recorded
+        so far. The file is replaced at once, never left half written.
+        """
+        self.writes.put((filename, data))
+
+    def top(self, speed, grid_size, border_wrap, n=None):
+        """Return the best n sessions (all that are kept by default) with the given settings."""
+        with self.lock:
+            return list(self.tables.get((speed, grid_size, bool(border_wrap)), [])[:n])
+
+    def add(self, session):
+        # With self.lock held.
+        table = self.tables.setdefault(session.settings, [])
+        keys = [entry.rank_key for entry in table]
+        table.insert(bisect.bisect(keys, session.rank_key), session)
+        del table[self.size :]
+        self.best = max(self.best, session.score)
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Wait for the sessions recorded so far to be written."""
+        if self.thread is not None:
+            self.writes.put(None)
+            self.thread.join(timeout)
+
+    ##
+    ## Worker thread
+    ##
+    def run(self):
+        try:
+            connection = self.connect()
+            self.load(connection)
+        except sqlite3.Error as error:
+            # Play on without saving rather than crash the game.
+            print(f"Leaderboard unavailable: {error}", file=sys.stderr)
+            connection = None
+        self.loaded.set()
+
+        while (write := self.writes.get()) is not None:
+            if not isinstance(write, Session):
+                self.write_file(*write)
+            elif connection is not None:
+                try:
+                    with connection:  # One transaction, committed or rolled back.
+                        connection.execute(INSERT, write.row())
+                except sqlite3.Error as error:
+                    print(f"Could not save the game: {error}", file=sys.stderr)
+        if connection is not None:
+            connection.close()
+
+    def write_file(self, filename, data):
+        try:
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            with open(filename + ".tmp", "wb") as file:
+                file.write(data)
+            os.replace(filename + ".tmp", filename)
+        except OSError as error:
+            print(f"Could not save {filename}: {error}", file=sys.stderr)
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.filename)
+        # A write-ahead log commits atomically, and readers never block it.
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        with connection:
+            new = not connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sessions'"
+            ).fetchone()
+            connection.executescript(SCHEMA)
+            if new:
+                self.import_highscore(connection)
+        return connection
+
+    def import_highscore(self, connection):
+        # Keep the high score of the versions before the leaderboard.
+        try:
+            with open(HIGHSCORE_FILENAME, "rb") as file:
+                score = int.from_bytes(file.read(4), byteorder="big")
+            played = os.path.getmtime(HIGHSCORE_FILENAME)
+        except (OSError, ValueError):
+            return
+        # Its settings weren't saved; take the defaults.
+        session = Session(score, configs[0], size[configs[1]], False, 0.0, played)
+        connection.execute(INSERT, session.row())
+
+    def load(self, connection):
+        sessions = [
+            Session(*row) for row in connection.execute(TOP_QUERY, (self.size,))
+        ]
+        # Sessions recorded while loading are already in the tables.
+        with self.lock:
+            for session in sessions:
+                self.add(session)
+
+
+if __name__ == "__main__":
+    # Print the leaderboard: python -m app.leaderboard [file]
+    leaderboard = Leaderboard(
+        sys.argv[1] if len(sys.argv) > 1 else LEADERBOARD_FILENAME
+    )
+    leaderboard.start()
+    leaderboard.loaded.wait()
+    for (speed, grid_size, border_wrap), table in sorted(leaderboard.tables.items()):
+        print(f"Speed {speed}, cell size {grid_size}, border wrap: {border_wrap}")
+        for rank, session in enumerate(table, 1):
+            played = time.strftime("%Y-%m-%d %H:%M", time.localtime(session.played))
+            print(f"  {rank:3}. {session.score:5}  {session.duration:7.1f} s  {played}")
+    leaderboard.close()
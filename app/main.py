@@ -5,191 +5,312 @@
 #
 #  This file is part of Coral, a derivative work of KobraPy.
 
+import argparse
 import sys
+import time
 
 import pygame
 
-from app.apple import Apple
+from app.arena import Arena
+from app.autopilot import Autopilot
 from app.config import *
+from app.engine import APPLE, ATE_APPLE, ATE_ORANGE, DIED, GameState, board_size
+from app.fonts import render_text
 from app.game import singleton_instance as gm
-from app.obstacles import Obstacle
-from app.orange import Orange
-from app.snake import Snake
+from app.leaderboard import Session
+from app.profiler import profiler
+from app.renderer import Renderer
+from app.replay import Recorder
+from app.scheduler import FixedTimestep
 from app.translation import Translator
 
-gm.draw_grid()
-translator = Translator()
-
-gm.center_prompt(WINDOW_TITLE, translator.message("start"))
-
-GRID_SIZE = size[configs[1]] 
-snake = Snake()  # The snake
-apple = Apple()  # An apple
-orange = Orange()  # An orange
-obstacles = [
-    Obstacle(snake, WIDTH, HEIGHT, GRID_SIZE, OBSTACLE_COLOR)
-    for _ in range(OBSTACLE_COUNT)
-]
-game_on = gm.game_on
-
-while True:
-    for event in pygame.event.get():  # Wait for events
-        # App terminated
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
-        # Key pressed
-        if event.type == pygame.KEYDOWN:
-            key = event.key
-
-            # Global actions
-            if key == pygame.K_ESCAPE:  # Quit game
-                pygame.quit()
-                sys.exit()
-            elif key == pygame.K_p and not instructions_shown:  # Pause game
-                game_on = not game_on
-            elif key == pygame.K_m:  # Mute/unmute game
-                is_muted = not is_muted
-                pygame.mixer.music.set_volume(0 if is_muted else 0.4)
-            elif key == pygame.K_i:  # Toggle instructions screen
-                instructions_shown = not instructions_shown
-                game_on = True
-            elif key == pygame.K_SPACE:  # Increase speed
-                snake.speed = 2.0
-
-            # Movement controls (only if game is not paused or showing instructions)
-            if game_on and not instructions_shown:
-                movement_keys = {
-                    pygame.K_DOWN: (0, 1),
-                    pygame.K_s: (0, 1),
-                    pygame.K_UP: (0, -1),
-                    pygame.K_w: (0, -1),
-                    pygame.K_RIGHT: (1, 0),
-                    pygame.K_d: (1, 0),
-                    pygame.K_LEFT: (-1, 0),
-                    pygame.K_a: (-1, 0),
-                }
-
-                if key in movement_keys:
-                    x_dir, y_dir = movement_keys[key]
-                    if (x_dir != 0 and snake.xmov == 0) or (
-                        y_dir != 0 and snake.ymov == 0
-                    ):
-                        snake.set_direction(x_dir, y_dir)
-
-        # Key released
-        if event.type == pygame.KEYUP:
-            if event.key == pygame.K_SPACE:  # Go back to normal speed
-                snake.speed = 1.0
-
-    # Show instructions if the flag is set
-    if instructions_shown:
-        gm.display_instructions()
-        pygame.display.update()
-        continue
-
-    # Show "Paused" and "Press P to continue" messages in the center of the grid
-    if not game_on:
-        gm.arena.fill(ARENA_COLOR)  # Clear the arena to prevent overlap
-        pause_text = gm.BIG_FONT.render(
-            translator.message("paused"), True, MESSAGE_COLOR
-        )
-        pause_text_rect = pause_text.get_rect(
-            center=(WIDTH / 2, HEIGHT / 2 - GRID_SIZE)
-        )
-        gm.arena.blit(pause_text, pause_text_rect)
 
-        continue_text = gm.SMALL_FONT.render(
-            translator.message("continue"), True, MESSAGE_COLOR
+def report_startup(launched, quit):
+    """
+    Tell how long the game took to get ready, if asked or over STARTUP_BUDGET.
+    :param launched: time.perf_counter() when the program started.
+    :param quit: whether to print the time and quit (exit status 1 if over budget).
+    """
+    elapsed = time.perf_counter() - launched
+    if quit:
+        print(f"Startup: {elapsed:.3f} s (budget: {STARTUP_BUDGET} s)")
+        pygame.quit()
+        sys.exit(elapsed > STARTUP_BUDGET)
+    if elapsed > STARTUP_BUDGET:
+        print(
+            f"Startup took {elapsed:.3f} s, over the budget of {STARTUP_BUDGET} s",
+            file=sys.stderr,
         )
-        continue_text_rect = continue_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 + 50))
-        gm.arena.blit(continue_text, continue_text_rect)
 
-        quit_text = gm.SMALL_FONT.render(
-            translator.message("quit"), True, MESSAGE_COLOR
-        )
-        quit_text_rect = quit_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 + 125))
-        gm.arena.blit(quit_text, quit_text_rect)
-
-        # Draw the pause menu and update the display
-        gm.win.blit(pygame.transform.rotozoom(gm.arena, 0, gm.win_res / WIDTH), (0, 0))
-        pygame.display.update()
-
-        # Skip the rest of the loop when paused, preventing unnecessary updates
-        continue
-
-    if game_on:
-        grid_resize = snake.update()
-        gm.arena.fill(ARENA_COLOR)
-        gm.draw_grid()
-        apple.update()
-        orange.update()
-
-
-        # Redraw fruits if the grid was resized
-        if grid_resize:
-            apple.recalc(snake)
-            orange.recalc(snake)
-            GRID_SIZE = size[configs[1]] 
-            for i in range(0, OBSTACLE_COUNT):
-                obstacles = [
-                    Obstacle(snake, WIDTH, HEIGHT, GRID_SIZE, OBSTACLE_COLOR)
-                    for _ in range(OBSTACLE_COUNT)
-                ]
-            snake = Snake()
-        # Update and draw obstacles
-        for obstacle in obstacles:
-            obstacle.update(gm.arena)
-
-        # Prevent fruits from being inside obstacles
-        restart_test = True 
-        while restart_test:
-            restart_test = False
-            for obstacle in obstacles:
-                if obstacle.x == apple.x and obstacle.y == apple.y:
-                    apple.recalc(snake)
-                    apple.update()
-                    restart_test = True
-                if obstacle.x == orange.x and obstacle.y == orange.y:
-                    orange.recalc(snake)
-                    orange.update()
-                    restart_test = True
-
-        # Check for collisions with obstacles
-        for obstacle in obstacles:
-            if snake.head.colliderect(obstacle.rect):
-                # End the game if the snake collides with an obstacle
-                snake.alive = False
-
-    # Draw snake
-    snake.draw()
-    if game_on:
-        snake.energy.update()
-
-    # Show score (snake length = head + tail)
-    score = gm.BIG_FONT.render(f"{len(snake.tail)}", True, SCORE_COLOR)
-    gm.arena.blit(score, gm.score_rect)
-
-    # If the head pass over an apple, lengthen the snake and drop another apple
-    if snake.head.x == apple.x and snake.head.y == apple.y:
-        snake.got_apple = True
-        apple = Apple(snake)
-        gm.got_apple_sound.play()
-
-    # If the head passes over an orange, lengthen the snake and drop another orange
-    if snake.head.x == orange.x and snake.head.y == orange.y:
-        snake.speed += 0.05
-        orange = Orange()
-        gm.got_apple_sound.play()
-
-    # Add the "Press (I)nstructions" text in the top-right corner
-    instruction_text = gm.IN_GAME_FONT.render(
-        translator.message("instructions"), True, WHITE_COLOR
+
+def draw_pause_screen(translator):
+    """Show "Paused" and "Press P to continue" messages in the center of the grid."""
+    GRID_SIZE = size[configs[1]]
+
+    gm.arena.fill(ARENA_COLOR)  # Clear the arena to prevent overlap
+    pause_text = render_text(
+        gm.BIG_FONT, translator.message("paused"), True, MESSAGE_COLOR
+    )
+    pause_text_rect = pause_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 - GRID_SIZE))
+    gm.arena.blit(pause_text, pause_text_rect)
+
+    continue_text = render_text(
+        gm.SMALL_FONT, translator.message("continue"), True, MESSAGE_COLOR
+    )
+    continue_text_rect = continue_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 + 50))
+    gm.arena.blit(continue_text, continue_text_rect)
+
+    quit_text = render_text(
+        gm.SMALL_FONT, translator.message("quit"), True, MESSAGE_COLOR
+    )
+    quit_text_rect = quit_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 + 125))
+    gm.arena.blit(quit_text, quit_text_rect)
+
+
+def main(launched=None):
+    """
+    Run the game.
+    :param launched: time.perf_counter() when the program started (default: now).
+    """
+    global instructions_shown, is_muted
+
+    if launched is None:
+        launched = time.perf_counter()
+
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument(
+        "--startup-time",
+        action="store_true",
+        help="print how long the game takes to start and quit",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="show the frame profiler from the start (F3 toggles it)",
+    )
+    parser.add_argument(
+        "--bots",
+        type=int,
+        default=0,
+        metavar="N",
+        help="share the arena with N bot snakes",
     )
-    instruction_text_rect = instruction_text.get_rect(topright=(WIDTH - 10, 10)) 
-    gm.arena.blit(instruction_text, instruction_text_rect)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="leave the arena to the bots (with --bots)",
+    )
+    parser.add_argument(
+        "--autopilot",
+        action="store_true",
+        help="let the game play itself",
+    )
+    args = parser.parse_args()
+    if args.watch and not args.bots:
+        parser.error("--watch needs --bots")
+    if args.autopilot and args.bots:
+        parser.error("--autopilot plays single player games only")
+
+    def new_game():
+        """Return the rules of a new game with the current settings."""
+        board = board_size(size[configs[1]])
+        if args.bots:
+            # One apple more for every other bot, so that they find some.
+            return Arena(
+                *board,
+                bots=args.bots,
+                player=not args.watch,
+                border_wrap=gm.border_wrap,
+                apples=n_apple[configs[2]] + args.bots // 2,
+            )
+        return GameState(*board, border_wrap=gm.border_wrap, apples=n_apple[configs[2]])
+
+    # The window opens here, on first use of the game.
+    gm.draw_grid()
+    translator = Translator()
+    report_startup(launched, args.startup_time)
+    if args.profile:
+        profiler.toggle()
+
+    gm.center_prompt(WINDOW_TITLE, translator.message("start"))
+
+    GRID_SIZE = size[configs[1]]
+    state = new_game()  # The rules
+    renderer = Renderer(state)  # The snakes, fruits, obstacles and scoreboard
+
+    # Inputs go through the recorder, to replay the game later (single player
+    # games only).
+    recorder = None if args.bots else Recorder(state)
+    player = recorder or state
+    autopilot = Autopilot(state) if args.autopilot else None
+    game_on = gm.game_on
+    run_speed = 1.0  # Multiplier while the space bar is held.
+    scheduler = FixedTimestep()  # Ticks at the game speed, frames at FRAME_RATE
+
+    shown_screen = None  # The pause or instructions screen on display, if any
+    started = time.perf_counter()  # When the game started, pauses left out
+
+    while True:
+        if shown_screen is None:
+            scheduler.wait()
+            pending = pygame.event.get()
+        else:
+            # Nothing moves behind the pause and instructions screens, so
+            # sleep until something happens.
+            pending = [pygame.event.wait(), *pygame.event.get()]
+        profiler.next_frame()
+
+        for event in pending:
+            # App terminated
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+            # The window was uncovered while a screen is on display
+            if event.type == pygame.WINDOWEXPOSED and shown_screen is not None:
+                gm.present()
+
+            # Key pressed
+            if event.type == pygame.KEYDOWN:
+                key = event.key
+
+                # Global actions
+                if key == pygame.K_ESCAPE:  # Quit game
+                    pygame.quit()
+                    sys.exit()
+                elif key == pygame.K_p and not instructions_shown:  # Pause game
+                    game_on = not game_on
+                elif key == pygame.K_m:  # Mute/unmute game
+                    is_muted = not is_muted
+                    gm.background_music.set_volume(0 if is_muted else 0.4)
+                elif key == pygame.K_i:  # Toggle instructions screen
+                    instructions_shown = not instructions_shown
+                    game_on = True
+                elif key == pygame.K_SPACE:  # Increase speed
+                    run_speed = 2.0
+                elif key == pygame.K_F3:  # Show/hide the frame profiler
+                    profiler.toggle()
+                    renderer.invalidate()
+
+                # Movement controls (only if game is not paused or showing instructions)
+                if game_on and not instructions_shown:
+                    movement_keys = {
+                        pygame.K_DOWN: (0, 1),
+                        pygame.K_s: (0, 1),
+                        pygame.K_UP: (0, -1),
+                        pygame.K_w: (0, -1),
+                        pygame.K_RIGHT: (1, 0),
+                        pygame.K_d: (1, 0),
+                        pygame.K_LEFT: (-1, 0),
+                        pygame.K_a: (-1, 0),
+                    }
+
+                    if key in movement_keys:
+                        player.set_direction(*movement_keys[key])
+
+            # Key released
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_SPACE:  # Go back to normal speed
+                    run_speed = 1.0
+
+        profiler.lap("events")
+
+        # Show instructions or the pause screen, drawn once when they come up
+        screen = "instructions" if instructions_shown else None if game_on else "paused"
+        if screen is not None:
+            if shown_screen is None:
+                paused = time.perf_counter()
+            if screen != shown_screen:
+                if screen == "instructions":
+                    gm.display_instructions()
+                else:
+                    draw_pause_screen(translator)
+                gm.present()
+                shown_screen = screen
+            continue
+
+        # Back to the game, which has been drawn over
+        if shown_screen is not None:
+            shown_screen = None
+            started += time.perf_counter() - paused
+            renderer.invalidate()
+            scheduler.resume()
+
+        # Move the snake as many times as due; the game state applies all the rules.
+        events = 0
+        for _ in range(scheduler.ticks(velocity[configs[0]] * state.speed * run_speed)):
+            if autopilot:
+                player.set_direction(*autopilot.move())
+            events = player.step()
+            renderer.tick()
+
+            # If the head passed over a fruit, the game state dropped another one
+            if events & (ATE_APPLE | ATE_ORANGE):
+                gm.got_apple_sound.play()
+            if events & DIED:
+                break
+        profiler.lap("tick")
+
+        # Draw the frame, gliding between ticks (only the parts that changed, with DIRTY_RECTS)
+        changed = renderer.draw(scheduler.alpha)
+
+        # The profiler overlay goes on top, over a fresh copy of what's under it.
+        if profiler.enabled:
+            shown = profiler.rect
+            renderer.redraw(shown)
+            changed += [shown, profiler.draw(gm.arena, gm.IN_GAME_FONT)]
+            profiler.lap("overlay")
+
+        # In the event of death, tell the bad news and restart.
+        if events & DIED:
+            # Play game over sound effect
+            gm.background_music.stop()
+            gm.game_over_sound.play()
+
+            # Rank the game; it's saved in the background, and so is its
+            # replay. Games against bots aren't ranked.
+            if recorder:
+                gm.leaderboard.save_file(REPLAY_FILENAME, recorder.to_bytes())
+                session = Session(
+                    state.score,
+                    configs[0],
+                    GRID_SIZE,
+                    state.border_wrap,
+                    time.perf_counter() - started,
+                )
+                gm.display_highscore(gm.leaderboard.record(session))
+            else:
+                gm.display_highscore()
+            gm.center_prompt(
+                translator.message("game_over"), translator.message("restart")
+            )
+
+            # Resurrection
+            gm.game_over_sound.stop()
+            gm.background_music.play(-1)
+            run_speed = 1.0
+
+            # Start over on a new board if the cell size or the number of
+            # apples changed in the menu (and always against bots)
+            if (
+                board_size(size[configs[1]]) != (state.cols, state.rows)
+                or args.bots
+                or state.fruit_counts[APPLE] != n_apple[configs[2]]
+            ):
+                GRID_SIZE = size[configs[1]]
+                state = new_game()
+                renderer = Renderer(state)
+                autopilot = Autopilot(state) if args.autopilot else None
+            else:
+                state.border_wrap = gm.border_wrap
+                state.reset()
+                renderer.invalidate()
+            recorder = None if args.bots else Recorder(state)
+            player = recorder or state
+            started = time.perf_counter()
+            scheduler.resume()
+            continue
 
-    # Update display and move clock.
-    pygame.display.update()
-    gm.clock.tick(velocity[configs[0]] * snake.speed)
+        # Update display.
+        gm.present(changed)
+        profiler.lap("present")
@@ -7,30 +7,20 @@
 #
 #  This file is part of Coral, a derivative work of KobraPy.
 
-from app.snake import Snake
-from random import randint as rand
 import pygame
 
 
 class Obstacle:
-    def __init__(
-        self, snake: Snake, width: int, height: int, grid_size: int, color: str
-    ) -> None:
+    def __init__(self, cell: tuple, grid_size: int, color: str) -> None:
         """
-        Initialize an obstacle with a random position within the game grid.
-        :param snake: you've guessed it.
-        :param width: Width of the game arena.
-        :param height: Height of the game arena.
+        Initialize an obstacle at a cell of the game grid.
+        :param cell: (x, y) cell of the obstacle, as placed by the game state.
         :param grid_size: Size of each grid cell.
         :param color: Color of the obstacle.
         """
         self.color = color
-        self.x = rand(0, (width // grid_size) - 1) * grid_size
-        while self.x == snake.x:
-            self.x = rand(0, (width // grid_size) - 1) * grid_size
-        self.y = rand(0, (height // grid_size) - 1) * grid_size
-        while self.y == snake.y:
-            self.y = rand(0, (height // grid_size) - 1) * grid_size
+        self.x = cell[0] * grid_size
+        self.y = cell[1] * grid_size
         self.rect = pygame.Rect(self.x, self.y, grid_size, grid_size)
 
     def update(self, arena):
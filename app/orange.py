@@ -6,12 +6,15 @@
 #  This file is part of Coral, a derivative work of KobraPy.
 
 from app.config import *
+from app.engine import ORANGE
 from app.fruits.fruitBase import BaseFruit
 
 
 class Orange(BaseFruit):
-    def __init__(self, snake=None):
-        super().__init__(ORANGE_COLOR, snake)
+    kind = ORANGE
+
+    def __init__(self, cell):
+        super().__init__(ORANGE_COLOR, cell)
         self.dropped = False
 
     def update(self):
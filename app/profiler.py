@@ -0,0 +1,214 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Frame profiler.
+#
+# The main loop marks the end of each phase of a frame (events, ticks, HUD,
+# drawing, presenting...) with profiler.lap(phase), which charges the time
+# since the previous mark to that phase. While enabled, the profiler keeps
+# the last PROFILE_WINDOW frames of each phase for the overlay, and a
+# histogram of all of them that is written to PROFILE_FILENAME on exit.
+# While disabled, a lap is a method call and a test.
+
+import atexit
+import json
+import math
+import os
+import time
+from array import array
+
+import pygame
+
+from app.config import *
+
+PROFILE_WINDOW = 240  # Frames in the rolling statistics and the graph.
+PROFILE_REFRESH = 15  # Frames between overlay refreshes.
+BUCKETS_PER_OCTAVE = 4  # Resolution of the histograms.
+MAX_BUCKET = 100  # Histogram buckets (the last one is everything above).
+
+# Time spent waiting for the next frame, which is not part of its work.
+IDLE = "wait"
+
+GRAPH_SIZE = (PROFILE_WINDOW, 60)
+OVERLAY_BACKGROUND = (0, 0, 0, 180)
+GRAPH_COLOR = (0, 200, 255)
+BUDGET_COLOR = (255, 80, 80)
+
+
+def bucket(seconds):
+    """Return the histogram bucket of a duration (bucket b holds up to 2 ** (b / 4) us)."""
+    us = seconds * 1e6
+    if us <= 1:
+        return 0
+    return min(MAX_BUCKET - 1, math.ceil(math.log2(us) * BUCKETS_PER_OCTAVE))
+
+
+class Phase:
+    """Timings of one phase of the frame."""
+
+    def __init__(self):
+        self.recent = array("d", bytes(8 * PROFILE_WINDOW))
+        self.histogram = array("Q", bytes(8 * MAX_BUCKET))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.recent[self.count % PROFILE_WINDOW] = seconds
+        self.histogram[bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self):
+        """Return the mean, 95th percentile and maximum of the recent frames."""
+        recent = sorted(self.recent[: min(self.count, PROFILE_WINDOW)])
+        if not recent:
+            return 0.0, 0.0, 0.0
+        p95 = recent[min(len(recent) - 1, math.ceil(0.95 * len(recent)) - 1)]
+        return sum(recent) / len(recent), p95, recent[-1]
+
+    def summary(self):
+        """Return the phase's totals and histogram, for the dump."""
+        return {
+            "frames": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "max_ms": self.max * 1e3,
+            "histogram": [
+                {"up_to_us": round(2 ** (b / BUCKETS_PER_OCTAVE), 1), "frames": n}
+                for b, n in enumerate(self.histogram)
+                if n
+            ],
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}  # By name, in the order they were first seen.
+        self.frame = Phase()  # The work of whole frames (all phases but IDLE).
+        self.current = {}  # Time of each phase in the frame so far.
+        self.last = time.perf_counter()
+        self.frames = 0
+
+        self.overlay = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.dump_registered = False
+
+    def toggle(self):
+        """Turn profiling (and its overlay) on or off."""
+        self.enabled = not self.enabled
+        self.current = {}
+        self.last = time.perf_counter()
+        if self.enabled and not self.dump_registered:
+            atexit.register(self.dump, PROFILE_FILENAME)
+            self.dump_registered = True
+
+    def lap(self, phase):
+        """Charge the time since the last lap to phase."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def next_frame(self):
+        """Close the frame that just ended (the time since the last lap was idle)."""
+        if not self.enabled:
+            return
+        self.lap(IDLE)
+        work = 0.0
+        for phase, seconds in self.current.items():
+            if phase not in self.phases:
+                self.phases[phase] = Phase()
+            self.phases[phase].add(seconds)
+            if phase != IDLE:
+                work += seconds
+        self.frame.add(work)
+        self.current = {}
+        self.frames += 1
+
+    ##
+    ## Overlay
+    ##
+    def draw(self, surface, font):
+        """Draw the overlay in the bottom left corner of surface and return its rect."""
+        if self.overlay is None or self.frames % PROFILE_REFRESH == 0:
+            self.overlay = self.render(font)
+            self.rect = self.overlay.get_rect(bottomleft=(0, surface.get_height()))
+        surface.blit(self.overlay, self.rect)
+        return self.rect
+
+    def render(self, font):
+        rows = [("ms", "mean", "p95", "max")]
+        for name, phase in [*self.phases.items(), ("frame", self.frame)]:
+            rows.append((name, *(f"{seconds * 1e3:.2f}" for seconds in phase.stats())))
+        cells = [[font.render(text, True, WHITE_COLOR) for text in row] for row in rows]
+
+        # A column for the phase names, then the numbers right aligned.
+        margin = 6
+        line_height = font.get_linesize()
+        widths = [
+            max(row[i].get_width() for row in cells) + 2 * margin for i in range(4)
+        ]
+        width = max(GRAPH_SIZE[0], sum(widths)) + 2 * margin
+        height = len(rows) * line_height + GRAPH_SIZE[1] + 3 * margin
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill(OVERLAY_BACKGROUND)
+
+        for y, row in enumerate(cells):
+            x = margin
+            for i, text in enumerate(row):
+                left = x if i == 0 else x + widths[i] - text.get_width()
+                overlay.blit(text, (left, margin + y * line_height))
+                x += widths[i]
+
+        # Work per frame, oldest on the left, against the frame budget (the
+        # budget line is at half height).
+        graph = pygame.Rect(margin, height - margin - GRAPH_SIZE[1], *GRAPH_SIZE)
+        budget = 1 / FRAME_RATE
+        count = min(self.frame.count, PROFILE_WINDOW)
+        first = self.frame.count - count
+        points = []
+        for i in range(count):
+            seconds = self.frame.recent[(first + i) % PROFILE_WINDOW]
+            bar = min(graph.height, seconds / budget * graph.height / 2)
+            points.append((graph.left + i, graph.bottom - bar))
+        pygame.draw.line(
+            overlay,
+            BUDGET_COLOR,
+            (graph.left, graph.centery),
+            (graph.right, graph.centery),
+        )
+        if len(points) > 1:
+            pygame.draw.lines(overlay, GRAPH_COLOR, False, points)
+        return overlay
+
+    ##
+    ## Histograms
+    ##
+    def dump(self, filename):
+        """Write the histogram of each phase, if anything was profiled."""
+        if not self.frames:
+            return
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w") as file:
+            json.dump(
+                {
+                    "frames": self.frames,
+                    "frame_rate": FRAME_RATE,
+                    "phases": {
+                        name: phase.summary()
+                        for name, phase in [*self.phases.items(), ("frame", self.frame)]
+                    },
+                },
+                file,
+                indent=2,
+            )
+
+
+# Shared by the main loop and the renderer.
+profiler = Profiler()
@@ -0,0 +1,212 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+import pygame
+
+from app.apple import Apple
+from app.config import *
+from app.engine import APPLE, ORANGE
+from app.game import singleton_instance as gm
+from app.hud import Hud
+from app.obstacles import Obstacle
+from app.orange import Orange
+from app.profiler import profiler
+from app.snake import Snake
+
+# Beyond this many changed cells in a frame (e.g. with many snakes), redrawing
+# the whole arena is cheaper than redrawing around each of them.
+MAX_DIRTY_CELLS = 64
+
+
+##
+## Renderer class
+##
+class Renderer:
+    def __init__(self, state):
+        """
+        Set up the drawing of a game.
+        :param state: the app.engine.GameState (or app.arena.Arena) to draw.
+        """
+        GRID_SIZE = size[configs[1]]
+
+        self.state = state
+        self.snakes = [
+            Snake(snake, BOT_SNAKE_COLOR if snake.bot else SNAKE_COLOR)
+            for snake in state.snakes
+        ]
+        self.moving = {}  # The snakes moving in each cell, in the last frame
+        self.cleared = set()  # Cells emptied by dead snakes since the last frame
+
+        # The fruits shown, by cell, and the fruits not in use, by kind, to
+        # be moved to where the next ones drop.
+        self.fruits = {}
+        self.fruit_pool = {APPLE: [], ORANGE: []}
+        self.fruit_version = None
+        self.fruits_changed = set()  # Cells to redraw for their fruit
+        self.sync_fruits()
+        self.obstacles = [
+            Obstacle(cell, GRID_SIZE, OBSTACLE_COLOR) for cell in state.obstacles
+        ]
+        self.hud = Hud()
+
+        # The static part of the arena: ground, grid lines and obstacles.
+        self.background = gm.grid_background().copy()
+        for obstacle in self.obstacles:
+            obstacle.update(self.background)
+
+        # The cells around the head, tail tip and fruits in the last frame
+        # (None to redraw everything next time).
+        self.shown_cells = None
+
+    def invalidate(self):
+        """Make the next frame redraw the whole arena."""
+        self.shown_cells = None
+
+    def sync_fruits(self, cells=None):
+        """
+        Catch up with the fruits eaten and dropped in the game state.
+        :param cells: the only cells that may have changed (by default, any).
+        """
+        state = self.state
+        if cells is None:
+            cells = self.fruits.keys() | state.fruits.keys()
+        for cell in cells:
+            shown = self.fruits.get(cell)
+            kind = state.fruits.get(cell)
+            if shown is not None and shown.kind == kind:
+                continue
+            if shown is not None:
+                self.fruit_pool[shown.kind].append(self.fruits.pop(cell))
+            if kind is not None:
+                pool = self.fruit_pool[kind]
+                if pool:
+                    fruit = pool.pop()
+                    fruit.recalc(cell)
+                else:
+                    fruit = Apple(cell) if kind == APPLE else Orange(cell)
+                self.fruits[cell] = fruit
+            self.fruits_changed.add(cell)
+        self.fruit_version = state.fruit_version
+
+    def tick(self):
+        """Note that the game state advanced by one tick."""
+        for snake in self.snakes:
+            snake.flick_tongue()
+        self.cleared.update(self.state.cleared)
+
+        # Only the cells of the fruits eaten or dropped in the tick, if the
+        # fruits were up to date before it.
+        changes = self.state.fruit_changes
+        if self.fruit_version + len(changes) == self.state.fruit_version:
+            self.sync_fruits(changes)
+
+    def draw(self, alpha=None):
+        """
+        Draw the current frame on the arena and return the rects that changed.
+        :param alpha: how far the game is into the next tick (0 to 1), to glide
+            the snake between cells; None to draw the game state as it is.
+        """
+        state = self.state
+
+        # The game state may have dropped new fruits.
+        if self.fruit_version != state.fruit_version:
+            self.sync_fruits()
+
+        hud_changed = self.hud.update(state.score, state.energy)
+        profiler.lap("hud")
+
+        # Snakes off the board (bots waiting for room to respawn) aren't drawn.
+        self.moving = {}
+        for i, snake in enumerate(self.snakes):
+            if snake.state.head is not None:
+                snake.prepare(alpha)
+                for cell in snake.moving_cells():
+                    self.moving.setdefault(cell, []).append(i)
+        cells = self.moving.keys() | self.fruits_changed | self.cleared
+        self.fruits_changed = set()
+        self.cleared = set()
+
+        # Death recolours the whole snake, so redraw everything.
+        if (
+            not DIRTY_RECTS
+            or self.shown_cells is None
+            or not state.alive
+            or len(cells) > MAX_DIRTY_CELLS
+        ):
+            gm.arena.blit(self.background, (0, 0))
+            self.draw_fruits(self.fruits.values())
+            for snake in self.snakes:
+                if snake.state.head is not None:
+                    snake.draw()
+            self.hud.draw(gm.arena)
+            regions = [gm.arena.get_rect()]
+        else:
+            regions = self.changed_regions(cells) + hud_changed
+            for region in regions:
+                self.redraw(region)
+
+        self.shown_cells = cells
+        profiler.lap("draw")
+        return regions
+
+    def changed_regions(self, cells):
+        GRID_SIZE = size[configs[1]]
+        arena_rect = gm.arena.get_rect()
+        regions = []
+
+        # The snakes change only around their heads and tail tips, now and in
+        # the last frame; a margin of one cell covers the parts drawn over
+        # neighbouring cells.
+        for x, y in (self.shown_cells | cells) - {None}:
+            cell = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+            regions.append(cell.inflate(2 * GRID_SIZE, 2 * GRID_SIZE).clip(arena_rect))
+        return regions
+
+    def draw_fruits(self, fruits):
+        # Always in the same order, as an apple's stem reaches into the cell above.
+        for fruit in sorted(fruits, key=lambda fruit: (fruit.kind, fruit.cell)):
+            fruit.update()
+
+    def redraw(self, region):
+        """Draw everything that overlaps region, without touching the rest."""
+        GRID_SIZE = size[configs[1]]
+        arena = gm.arena
+
+        arena.set_clip(region)
+        arena.blit(self.background, region, region)
+
+        # Cells whose contents may reach into the region.
+        cells = [
+            (x, y)
+            for x in range(
+                max(0, region.left // GRID_SIZE - 1),
+                min(self.state.cols, region.right // GRID_SIZE + 2),
+            )
+            for y in range(
+                max(0, region.top // GRID_SIZE - 1),
+                min(self.state.rows, region.bottom // GRID_SIZE + 2),
+            )
+        ]
+
+        fruits = self.fruits
+        self.draw_fruits([fruits[cell] for cell in cells if cell in fruits])
+
+        # The snakes lying on those cells or moving through them, in the
+        # order draw() draws them.
+        state = self.state
+        snakes = set()
+        for x, y in cells:
+            i = state.snake_at(x, y)
+            if i is not None:
+                snakes.add(i)
+            snakes.update(self.moving.get((x, y), ()))
+        for i in sorted(snakes):
+            self.snakes[i].draw_cells(cells)
+
+        if self.hud.rect.colliderect(region):
+            self.hud.draw(arena)
+
+        arena.set_clip(None)
@@ -0,0 +1,189 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Game recording and replay.
+#
+# A game is fully determined by its seed and the inputs given to its
+# GameState: the turns queued and the ticks run, in order, plus restarts
+# after death. A Recorder stands between the player and the game state and
+# writes those inputs down, one byte each, with runs of ticks without input
+# packed in a single byte. Every KEYFRAME_INTERVAL ticks it also saves a
+# snapshot of the game, so that a replay can start from the nearest keyframe
+# instead of the beginning. Playback needs no display and runs as fast as
+# the engine does.
+#
+# File layout (little endian):
+#   header   magic "CRPL", version (u8), tick count (u32), input length (u32),
+#            keyframe count (u32)
+#   inputs   one byte per input (see below)
+#   keyframes  tick (u32), input offset (u32), snapshot length (u32), snapshot
+
+import os
+import struct
+import sys
+import time
+
+from app.config import *
+from app.engine import DIRECTIONS, GameState
+
+MAGIC = b"CRPL"
+VERSION = 3
+KEYFRAME_INTERVAL = 1000  # Ticks between snapshots.
+
+_HEADER = struct.Struct("<4sBIII")
+_KEYFRAME = struct.Struct("<III")
+
+# Inputs: a turn (index in DIRECTIONS), a restart (with or without border
+# wrap), or a run of 1 to 127 ticks.
+RESET = 4
+RESET_WRAP = 5
+TICKS = 0x80
+MAX_RUN = 0x7F
+
+
+class Recorder:
+    def __init__(self, state):
+        """
+        Record the game played on state from now on. Give the inputs to the
+        recorder, which passes them on, instead of to the state.
+        :param state: the app.engine.GameState to record.
+        """
+        self.state = state
+        self.inputs = bytearray()
+        self.ticks = 0
+        self.run = 0  # Ticks without input not written yet.
+        self.keyframes = [(0, 0, state.snapshot())]
+
+    def flush(self):
+        while self.run:
+            ticks = min(self.run, MAX_RUN)
+            self.inputs.append(TICKS | ticks)
+            self.run -= ticks
+
+    def set_direction(self, xmov, ymov):
+        self.flush()
+        self.inputs.append(DIRECTIONS.index((xmov, ymov)))
+        self.state.set_direction(xmov, ymov)
+
+    def step(self):
+        events = self.state.step()
+        self.ticks += 1
+        self.run += 1
+        if self.ticks % KEYFRAME_INTERVAL == 0:
+            self.flush()
+            snapshot = self.state.snapshot()
+            self.keyframes.append((self.ticks, len(self.inputs), snapshot))
+        return events
+
+    def reset(self, border_wrap):
+        self.flush()
+        self.inputs.append(RESET_WRAP if border_wrap else RESET)
+        self.state.border_wrap = border_wrap
+        self.state.reset()
+
+    def to_bytes(self):
+        """Return the recording so far, ending with a keyframe of the current state."""
+        self.flush()
+        keyframes = self.keyframes
+        if keyframes[-1][0] != self.ticks or keyframes[-1][1] != len(self.inputs):
+            keyframes = keyframes + [
+                (self.ticks, len(self.inputs), self.state.snapshot())
+            ]
+
+        parts = [
+            _HEADER.pack(
+                MAGIC, VERSION, self.ticks, len(self.inputs), len(keyframes)
+            ),
+            self.inputs,
+        ]
+        for tick, offset, snapshot in keyframes:
+            parts += [_KEYFRAME.pack(tick, offset, len(snapshot)), snapshot]
+        return b"".join(parts)
+
+    def save(self, filename):
+        """Write the recording so far to a file (see to_bytes())."""
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "wb") as file:
+            file.write(self.to_bytes())
+
+
+class Replay:
+    def __init__(self, filename):
+        """Read a recording saved from a Recorder."""
+        with open(filename, "rb") as file:
+            data = file.read()
+
+        magic, version, self.ticks, length, count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a Coral replay (version {VERSION})")
+        position = _HEADER.size
+        self.inputs = data[position : position + length]
+        position += length
+
+        self.keyframes = []
+        for _ in range(count):
+            tick, offset, size = _KEYFRAME.unpack_from(data, position)
+            position += _KEYFRAME.size
+            self.keyframes.append((tick, offset, data[position : position + size]))
+            position += size
+
+    def play(self, until=None, seek=True):
+        """
+        Re-simulate the game up to tick until (the end by default), with the
+        inputs given after it and before the next tick.
+        :param seek: whether to start from the nearest keyframe rather than the beginning.
+        :return: the game state at that tick.
+        """
+        until = self.ticks if until is None else min(until, self.ticks)
+        tick, offset, snapshot = self.keyframes[0]
+        if seek:
+            tick, offset, snapshot = max(
+                (keyframe for keyframe in self.keyframes if keyframe[0] <= until),
+                key=lambda keyframe: keyframe[0],
+            )
+        state = GameState.restore(snapshot)
+
+        inputs = self.inputs
+        while offset < len(inputs):
+            code = inputs[offset]
+            if code & TICKS:
+                ticks = code & MAX_RUN
+                if tick + ticks > until:
+                    # Stop in the middle of the run.
+                    for _ in range(until - tick):
+                        state.step()
+                    return state
+                for _ in range(ticks):
+                    state.step()
+                tick += ticks
+            elif code < len(DIRECTIONS):
+                state.set_direction(*DIRECTIONS[code])
+            else:
+                state.border_wrap = code == RESET_WRAP
+                state.reset()
+            offset += 1
+        return state
+
+    def verify(self):
+        """Check that playing the whole recording from the start ends in the recorded final state."""
+        return self.play(seek=False).snapshot() == self.keyframes[-1][2]
+
+
+if __name__ == "__main__":
+    # Replay a recording as fast as possible: python -m app.replay [file [tick]]
+    filename = sys.argv[1] if len(sys.argv) > 1 else REPLAY_FILENAME
+    replay = Replay(filename)
+    until = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    started = time.perf_counter()
+    state = replay.play(until)
+    elapsed = time.perf_counter() - started
+
+    tick = replay.ticks if until is None else min(until, replay.ticks)
+    print(f"Tick {tick} of {replay.ticks}, replayed in {elapsed * 1000:.1f} ms")
+    print(f"Score {state.score}, energy {state.energy}, alive: {state.alive}")
+    if until is None and not replay.verify():
+        sys.exit("The replay does not end in the recorded state")
@@ -0,0 +1,249 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Multiprocess rollouts.
+#
+# A RolloutRunner starts a pool of worker processes, each stepping its own
+# batch of games (app.env.CoralEnv). The observations, rewards, done flags
+# and actions of all the games are arrays in one block of shared memory,
+# with a row per game: each environment plays directly in its rows, so
+# nothing is pickled on the way back to the parent, which reads them as
+# NumPy arrays. A step is a byte sent to each worker and a byte back.
+#
+# Workers are forked, so that they inherit the shared memory as it is
+# mapped in the parent (Linux and other Unix systems only).
+#
+#   python -m app.rollout [--workers 1 2 4] [--games 64] [--steps 1000]
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from app.batch import NO_ACTION
+from app.config import *
+from app.engine import DIRECTIONS, board_size
+from app.env import CoralEnv, observation_spec
+
+ALIGNMENT = 64  # Bytes; each array starts on its own cache line.
+
+# Commands to the workers.
+STEP = b"s"
+RESET = b"r"
+QUIT = b"q"
+
+
+def layout(cols, rows, games):
+    """
+    Return where each array of the rollouts of games games goes in the
+    shared memory, as {name: (offset, shape, dtype)}, and its total size.
+    """
+    arrays = {
+        name: ((games, *shape), dtype)
+        for name, (shape, dtype) in observation_spec(cols, rows).items()
+    }
+    arrays["reward"] = ((games,), np.float32)
+    arrays["terminated"] = ((games,), np.bool_)
+    arrays["truncated"] = ((games,), np.bool_)
+    arrays["score"] = ((games,), np.int32)
+    arrays["action"] = ((games,), np.int8)
+
+    places = {}
+    offset = 0
+    for name, (shape, dtype) in arrays.items():
+        places[name] = (offset, shape, dtype)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -(-size // ALIGNMENT) * ALIGNMENT
+    return places, offset
+
+
+def work(connection, arrays, cols, rows, seeds, options):
+    """
+    Step a worker's games as the parent says (runs in the worker).
+    :param arrays: the worker's rows of the shared arrays.
+    :param seeds: the seed of each game.
+    """
+    envs = [
+        CoralEnv(
+            cols,
+            rows,
+            seed=seed,
+            out={name: arrays[name][i, ...] for name in observation_spec(cols, rows)},
+            **options,
+        )
+        for i, seed in enumerate(seeds)
+    ]
+    reward = arrays["reward"]
+    terminated, truncated = arrays["terminated"], arrays["truncated"]
+    score, action = arrays["score"], arrays["action"]
+    while (command := connection.recv_bytes()) != QUIT:
+        if command == RESET:
+            for env in envs:
+                env.reset()
+            reward[:] = 0
+            terminated[:] = truncated[:] = False
+            score[:] = 0
+        else:
+            for i, env in enumerate(envs):
+                _, reward[i], terminated[i], truncated[i], info = env.step(action[i])
+                score[i] = info["score"]
+                # The next episode starts right away; the flags tell that the
+                # observation is its first.
+                if terminated[i] or truncated[i]:
+                    env.reset()
+        connection.send_bytes(b"")
+
+
+class RolloutRunner:
+    def __init__(
+        self, workers=None, games=16, cols=None, rows=None, seed=None, **options
+    ):
+        """
+        :param workers: number of worker processes (default: one per CPU).
+        :param games: number of games each worker steps.
+        :param cols, rows: the board (by default, the game's at the current cell size).
+        :param seed: seed of the games' seeds (random if None).
+        :param options: further CoralEnv arguments (border_wrap, max_steps...).
+        """
+        if cols is None or rows is None:
+            cols, rows = board_size(size[configs[1]])
+        self.workers = workers or os.cpu_count() or 1
+        self.games = games
+        self.count = self.workers * games
+
+        places, total = layout(cols, rows, self.count)
+        self.memory = SharedMemory(create=True, size=total)
+
+        # The arrays of all the games, a row per game; workers get their rows.
+        self.arrays = {
+            name: np.ndarray(shape, dtype, self.memory.buf, offset)
+            for name, (offset, shape, dtype) in places.items()
+        }
+        self.observation = {
+            name: self.arrays[name] for name in observation_spec(cols, rows)
+        }
+        self.reward = self.arrays["reward"]
+        self.terminated = self.arrays["terminated"]
+        self.truncated = self.arrays["truncated"]
+        self.score = self.arrays["score"]
+        self.actions = self.arrays["action"]
+        self.actions[:] = NO_ACTION
+
+        context = multiprocessing.get_context("fork")
+        self.connections = []
+        self.processes = []
+        for worker in range(self.workers):
+            rows_of = slice(worker * games, (worker + 1) * games)
+            arrays = {name: array[rows_of] for name, array in self.arrays.items()}
+            seeds = [
+                None if seed is None else f"{seed}/{worker}/{i}" for i in range(games)
+            ]
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=work,
+                args=(child, arrays, cols, rows, seeds, options),
+                name=f"rollout-{worker}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def command(self, command):
+        # Every worker at once, then wait for them all.
+        for connection in self.connections:
+            connection.send_bytes(command)
+        for connection in self.connections:
+            connection.recv_bytes()
+
+    def reset(self):
+        """Start a new episode in every game (before the first step) and return the observations."""
+        self.command(RESET)
+        return self.observation
+
+    def step(self, actions=None):
+        """
+        Advance every game by one tick. Games that end start over at once:
+        terminated or truncated tells that their observation is the first of
+        the next episode, and score holds the score the last one ended with.
+        :param actions: indices in DIRECTIONS (or NO_ACTION), one per game;
+            None to use the ones already written in actions.
+        :return: the observations, rewards, terminated and truncated flags,
+            all views of the shared memory, valid until the next step.
+        """
+        if actions is not None:
+            self.actions[:] = actions
+        self.command(STEP)
+        return self.observation, self.reward, self.terminated, self.truncated
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if self.memory is None:
+            return
+        for connection, process in zip(self.connections, self.processes):
+            try:
+                connection.send_bytes(QUIT)
+            except OSError:
+                pass
+            process.join()
+            connection.close()
+        # The memory stays mapped while arrays returned by step() are in use.
+        self.arrays = self.observation = None
+        self.reward = self.terminated = self.truncated = None
+        self.score = self.actions = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass
+        self.memory.unlink()
+        self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time rollouts with random moves.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, os.cpu_count() or 1],
+        help="numbers of worker processes to time (default: 1 and one per CPU)",
+    )
+    parser.add_argument("--games", type=int, default=64, help="games per worker")
+    parser.add_argument("--steps", type=int, default=1000, help="steps to time")
+    args = parser.parse_args()
+
+    single = None
+    for workers in dict.fromkeys(args.workers):
+        with RolloutRunner(workers, args.games, *board_size(size[2]), seed=0) as runner:
+            runner.reset()
+            random = np.random.default_rng(0)
+            started = time.perf_counter()
+            for _ in range(args.steps):
+                runner.step(random.integers(NO_ACTION, len(DIRECTIONS), runner.count))
+            elapsed = time.perf_counter() - started
+
+        rate = runner.count * args.steps / elapsed
+        single = single or rate / workers
+        print(
+            f"{workers:3} workers x {args.games} games: {rate:10.0f} steps/s"
+            f" ({rate / single / workers:.0%} of linear scaling)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Frame scheduling.
+#
+# The game moves at its own pace (a few ticks per second, set by the speed
+# options and the oranges), while frames are drawn and input is read at
+# FRAME_RATE. Each frame runs the ticks that are due and tells how far the
+# game is into the next one, so that the renderer can glide between cells.
+
+import time
+
+from app.config import *
+
+MAX_FRAME_TIME = 0.25  # Longest time simulated in one frame, in seconds.
+SPIN_TIME = 0.002  # Time spent polling the clock instead of sleeping, in seconds.
+
+
+class FixedTimestep:
+    def __init__(self, frame_rate=FRAME_RATE):
+        """
+        :param frame_rate: frames per second to pace the main loop at.
+        """
+        self.frame_length = 1 / frame_rate
+        self.last = time.perf_counter()
+        self.deadline = self.last
+
+        # How far the game is into the current tick (0 to 1).
+        self.alpha = 0.0
+
+    def resume(self):
+        """Skip the time since the last frame, e.g. after a pause or a prompt."""
+        self.last = time.perf_counter()
+        self.deadline = self.last
+
+    def ticks(self, tick_rate):
+        """
+        Return how many ticks are due since the last call, at tick_rate per second.
+        Progress is counted in ticks, so a change of speed takes effect smoothly.
+        """
+        now = time.perf_counter()
+        elapsed = min(now - self.last, MAX_FRAME_TIME)
+        self.last = now
+
+        progress = self.alpha + elapsed * tick_rate
+        ticks = int(progress)
+        self.alpha = progress - ticks
+        return ticks
+
+    def wait(self):
+        """Sleep until the next frame is due."""
+        self.deadline += self.frame_length
+        now = time.perf_counter()
+        if self.deadline < now:
+            # Running late: don't try to catch up with a burst of frames.
+            self.deadline = now
+            return
+
+        # Sleeping may overshoot by a millisecond or so; poll the last bit.
+        if self.deadline - now > SPIN_TIME:
+            time.sleep(self.deadline - now - SPIN_TIME)
+        while time.perf_counter() < self.deadline:
+            pass
@@ -5,356 +5,379 @@
 #
 #  This file is part of Coral, a derivative work of KobraPy.
 
+import functools
 import random
 
 import pygame
 
-from app.apple import Apple
 from app.config import *
-from app.energybar import EnergyBar
+from app.engine import DIRECTIONS, DOWN, LEFT, RIGHT, UP
+from app.fonts import display_format
 from app.game import singleton_instance as gm
 
 
+def facing(dx, dy):
+    """Return the direction (UP, DOWN, LEFT or RIGHT) of a move by (dx, dy)."""
+    if dx > 0:
+        return RIGHT
+    if dx < 0:
+        return LEFT
+    if dy > 0:
+        return DOWN
+    return UP
+
+
+##
+## Sprite atlas
+##
+class SnakeSprites:
+    """
+    Pre-rendered pieces of the snake for one cell size, so that drawing the
+    snake is a batch of blits. Head and tail tip sprites are three cells wide,
+    with their own cell in the middle, as eyes, tongue and tail reach into the
+    neighbouring cells; blit them at offset() of the cell.
+    """
+
+    def __init__(self, grid_size, color=SNAKE_COLOR):
+        self.grid_size = grid_size
+        sprite_size = (3 * grid_size, 3 * grid_size)
+        cell = pygame.Rect(grid_size, grid_size, grid_size, grid_size)
+
+        self.body = {}
+        self.heads = {}
+        self.tips = {}
+        for alive in (True, False):
+            body = pygame.Surface((grid_size, grid_size))
+            body.fill(color if alive else DEAD_SNAKE_COLOR)
+            self.body[alive] = display_format(body)
+
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                for tongue in (False, True):
+                    sprite = pygame.Surface(sprite_size, pygame.SRCALPHA)
+                    draw_head(sprite, cell, direction, alive, tongue, color)
+                    self.heads[direction, alive, tongue] = display_format(sprite)
+
+                sprite = pygame.Surface(sprite_size, pygame.SRCALPHA)
+                draw_tail(sprite, cell.topleft, grid_size, direction, alive, color)
+                self.tips[direction, alive] = display_format(sprite)
+
+    def offset(self, x, y):
+        """Return where to blit the head or tail tip sprite of cell (x, y)."""
+        return (x - 1) * self.grid_size, (y - 1) * self.grid_size
+
+
+@functools.lru_cache(maxsize=2)
+def snake_sprites(grid_size, color=SNAKE_COLOR):
+    """Return the sprite atlas of the given cell size and colour, rebuilt when it changes."""
+    return SnakeSprites(grid_size, color)
+
+
 ##
 ## Snake class
 ##
 class Snake:
     __surface = None
 
-    def __init__(self):
+    def __init__(self, state, color=SNAKE_COLOR):
         self.__surface = gm.arena
-        # Initial direction
-        # xmov :  -1 left,    0 still,   1 right
-        # ymov :  -1 up       0 still,   1 dows
-
-        # Dimension of each snake segment.
-
-        self.x, self.y, self.xmov, self.ymov = self.random_position()
+        self.color = color
 
-        # The snake has a head segement,
-        self.head = pygame.Rect(self.x, self.y, size[configs[1]], size[configs[1]])
+        # The game rules live in the headless core (app.engine), this class
+        # only draws the snake of the given game state.
+        self.state = state
 
-        # and a tail (array of segments).
-        self.tail = []
+        # Whether the tongue is out during the current tick. It flicks on its
+        # own random stream, so drawing never changes how the game plays out.
+        self.tongue = False
+        self.random = random.Random(f"{state.seed}/tongue")
+        self.prepare()
 
-        # The snake is born.
-        self.alive = True
+    def flick_tongue(self):
+        # Randomly display the tongue, once per tick
+        self.tongue = self.state.alive and self.random.randint(0, 10) > 8  # Adjust chance of appearance here
 
-        # No collected apples.
-        self.got_apple = False
-
-        # The energy is full
-        self.energy = EnergyBar(MAX_ENERGY)
-
-        # Movement queue
-        self.move_queue = []
-
-        # Multiplier based on number of collected oranges.
-        self.speed = 1.0
-
-    # Add movement to movement queuedef
-    def set_direction(self, xmov, ymov):
-        if (
-            not (xmov == -self.xmov and ymov == -self.ymov)
-            and len(self.move_queue) <= MAX_QUEUE_SIZE
-        ):
-            self.move_queue.append((xmov, ymov))
-
-    ## This function generate random positions for the snake
-    def random_position(self):
-        # Not too close to the border (minimum of 2 border squares)
-        x = (
-            int(
-                random.randint(size[configs[1]] * 2, WIDTH - size[configs[1]] * 2)
-                / size[configs[1]]
-            )
-            * size[configs[1]]
-        )
-        y = (
-            int(
-                random.randint(size[configs[1]] * 2, HEIGHT - size[configs[1]] * 2)
-                / size[configs[1]]
-            )
-            * size[configs[1]]
+    @property
+    def head(self):
+        GRID_SIZE = size[configs[1]]
+        x, y = self.state.head
+        return pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+
+    @property
+    def tail(self):
+        return self.state.tail
+
+    def glide(self, start, end, alpha):
+        """
+        Return the pixel position of a part of the snake moving from cell start
+        to the next cell end, alpha of the way (just end if it doesn't glide).
+        """
+        GRID_SIZE = size[configs[1]]
+        step = (end[0] - start[0], end[1] - start[1]) if start else None
+        if alpha is None or step not in DIRECTIONS:
+            return end[0] * GRID_SIZE, end[1] * GRID_SIZE
+        return (
+            round((start[0] + step[0] * alpha) * GRID_SIZE),
+            round((start[1] + step[1] * alpha) * GRID_SIZE),
         )
 
-        # Calculate distances to the borders
-        left_dist = x
-        right_dist = WIDTH - x
-        top_dist = y
-        bottom_dist = HEIGHT - y
-
-        # Decide movement direction (horizontal or vertical)
-        if min(left_dist, right_dist) < min(top_dist, bottom_dist):  # Move horizontally
-            if left_dist < right_dist:
-                xmov = 1
-            else:
-                xmov = -1
-            ymov = 0
-        else:  # Move vertically
-            if top_dist < bottom_dist:
-                ymov = 1
-            else:
-                ymov = -1
-            xmov = 0
-
-        return x, y, xmov, ymov
-
-    # This function is called at each loop interation.
-    def update(self) -> bool:
-        global apple, border_wrap
-        resize_grid = False
-
-        # Read and pop movement from queue.
-        if self.move_queue:
-            self.xmov, self.ymov = self.move_queue.pop(0)
-
-        # Check for border crash.
-        if self.head.x not in range(0, WIDTH) or self.head.y not in range(0, HEIGHT):
-            self.alive = False
-
-        # Check for self-bite.
-        for square in self.tail:
-            if self.head.x == square.x and self.head.y == square.y:
-                self.alive = False
-
-        # Check for not enough energy
-        if self.energy.get_energy() <= 0:
-            self.alive = False
-
-        # In the event of death, reset the game arena.
-        if not self.alive:
-            # Play game over sound effect
-            pygame.mixer.music.stop()
-            gm.game_over_sound.play()
-
-            # Tell the bad news
-
-            gm.display_highscore(len(self.tail))
-
-            self.draw()
-            resize_grid = gm.center_prompt(
-                gm.translator.message("game_over"), gm.translator.message("restart")
-            )
-
-            # Respawn the head with initial directions
-            self.x, self.y, self.xmov, self.ymov = self.random_position()
-            self.head.x = self.x
-            self.head.y = self.y
-
-            self.draw()
-
-            # Respawn the initial tail
-            self.tail = []
-
-            # Resurrection
-            gm.game_over_sound.stop()
-            self.alive = True
-            self.got_apple = False
-            self.speed = 1.0
-            self.energy.set_max_energy()
-            pygame.mixer.music.play(-1)
-
-            # Drop an apple
-            apple = Apple()
-
-        # Move the snake.
-
-        # If head hasn't moved, tail shouldn't either (otherwise, self-byte).
-        if self.xmov or self.ymov:
-            # Prepend a new segment to tail.
-            self.tail.insert(
-                0,
-                pygame.Rect(
-                    self.head.x, self.head.y, size[configs[1]], size[configs[1]]
-                ),
+    def prepare(self, alpha=None):
+        """
+        Work out where the head and the tail tip go in this frame.
+        :param alpha: how far the game is into the next tick (0 to 1), to glide
+            the head and tail tip between cells; None to draw them in their cells.
+        """
+        GRID_SIZE = size[configs[1]]
+        sprites = snake_sprites(GRID_SIZE, self.color)
+        body = sprites.body[self.state.alive]
+        alive = self.state.alive
+        tail = self.state.tail
+        head = self.state.head
+        dx, dy = self.state.xmov, self.state.ymov
+        if not alive:
+            alpha = None
+
+        def cell_rect(cell):
+            return pygame.Rect(
+                cell[0] * GRID_SIZE, cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE
             )
 
-            if self.got_apple:
-                self.got_apple = False
-                self.energy.increase_energy(
-                    random.randint(APPLE_ENERGY - 25, APPLE_ENERGY)
+        def body_part(rect):
+            return body, rect.topleft, pygame.Rect((0, 0), rect.size)
+
+        # The head glides from the cell it left, which is now the first tail
+        # segment (or the vacated cell, when there is no tail).
+        neck = tail[0] if tail else self.state.last_tip
+        x, y = self.glide(neck, head, alpha)
+        sprite = sprites.heads[facing(dx, dy), alive, self.tongue]
+        self.head_blit = (sprite, (x - GRID_SIZE, y - GRID_SIZE))
+        self.head_cells = {head, neck}
+
+        # Behind a gliding head, the first segment fills only what the head
+        # has uncovered so far (unless the snake turned there).
+        self.neck_cell = neck if len(tail) > 1 else None
+        self.neck_blit = None
+        if self.neck_cell:
+            rect = cell_rect(neck)
+            gliding = (x, y) != cell_rect(head).topleft
+            if gliding and tail[1] == (neck[0] - dx, neck[1] - dy):
+                behind = pygame.Rect(
+                    x - dx * GRID_SIZE, y - dy * GRID_SIZE, GRID_SIZE, GRID_SIZE
                 )
+                rect = rect.clip(behind)
+            self.neck_blit = body_part(rect)
+
+        self.tip_blits = []
+        self.tip_cells = set()
+        if not tail:
+            return
+
+        tip = tail[-1]
+        last = self.state.last_tip
+        ahead = tail[-2] if len(tail) > 1 else head
+        self.tip_cells = {tip, last}
+
+        x, y = self.glide(last, tip, alpha)
+        if (x, y) == cell_rect(tip).topleft:
+            # The tip points away from the segment before it (or from the head).
+            if len(tail) == 1:
+                direction = facing(dx, dy)
             else:
-                self.tail.pop()
-
-            # Move the head along current direction.
-            self.head.x += self.xmov * size[configs[1]]
-            self.head.y += self.ymov * size[configs[1]]
-
-        if border_wrap:
-            self.head.x %= WIDTH
-            self.head.y %= HEIGHT
-
-        return resize_grid
-
-    # Draw stylized head
-    def draw_head(self):
-        # Define head and rectangle dimensions
-        GRID_SIZE = size[configs[1]]
-        head_radius = GRID_SIZE // 2
-        head_center = (self.head.x + head_radius, self.head.y + head_radius)
-
-        # Select color based on snake's alive status
-        head_color = SNAKE_COLOR if self.alive else DEAD_SNAKE_COLOR
-
-        # Draw the rounded head
-        pygame.draw.circle(self.__surface, head_color, head_center, head_radius)
-
-        # Draw the rectangle body behind the head circle based on direction
-        eye_offset = head_radius // 2
-        if self.xmov == 1:  # Moving right
-            body_rect = pygame.Rect(self.head.x, self.head.y, GRID_SIZE // 2, GRID_SIZE)
-            right_eye = (eye_offset, -eye_offset)
-            left_eye = (eye_offset, eye_offset)
-            tongue_pos = (head_center[0] + head_radius, head_center[1])
-            tongue_direction = (10, 2)  # Horizontal tongue
-        elif self.xmov == -1:  # Moving left
-            body_rect = pygame.Rect(
-                self.head.x + head_radius, self.head.y, GRID_SIZE // 2, GRID_SIZE
+                direction = facing(ahead[0] - tip[0], ahead[1] - tip[1])
+            sprite = sprites.tips[direction, alive]
+            self.tip_blits.append((sprite, sprites.offset(*tip)))
+            return
+
+        tx, ty = tip[0] - last[0], tip[1] - last[1]
+        sprite = sprites.tips[facing(tx, ty), alive]
+        if ahead == (tip[0] + tx, tip[1] + ty):
+            # Going straight, the tip glides and the body fills the part of
+            # its cell that the tip hasn't reached yet.
+            ahead_of_tip = pygame.Rect(
+                x + tx * GRID_SIZE, y + ty * GRID_SIZE, GRID_SIZE, GRID_SIZE
             )
-            right_eye = (-eye_offset, -eye_offset)
-            left_eye = (-eye_offset, eye_offset)
-            tongue_pos = (head_center[0] - 3 / 2 * head_radius, head_center[1])
-            tongue_direction = (10, 2)  # Horizontal tongue
-        elif self.ymov == 1:  # Moving down
-            body_rect = pygame.Rect(self.head.x, self.head.y, GRID_SIZE, GRID_SIZE // 2)
-            right_eye = (-eye_offset, eye_offset)
-            left_eye = (eye_offset, eye_offset)
-            tongue_pos = (head_center[0], head_center[1] + head_radius)
-            tongue_direction = (2, 10)  # Vertical tongue
-        else:  # Moving up
-            body_rect = pygame.Rect(
-                self.head.x, self.head.y + head_radius, GRID_SIZE, GRID_SIZE // 2
-            )
-            right_eye = (-eye_offset, -eye_offset)
-            left_eye = (eye_offset, -eye_offset)
-            tongue_pos = (head_center[0], head_center[1] - 3 / 2 * head_radius)
-            tongue_direction = (2, 10)  # Vertical tongue
-
-        pygame.draw.rect(self.__surface, head_color, body_rect)
-
-        eye_radius = 7
-        left_eye_pos = (head_center[0] + left_eye[0], head_center[1] + left_eye[1])
-        right_eye_pos = (head_center[0] + right_eye[0], head_center[1] + right_eye[1])
-
-        # Draw eyes based on snake's alive status
-        if self.alive:
-            pupil_radius = 4
-            pygame.draw.circle(self.__surface, "#FFFFFF", left_eye_pos, eye_radius)
-            pygame.draw.circle(self.__surface, "#FFFFFF", right_eye_pos, eye_radius)
-            pygame.draw.circle(self.__surface, "#000000", left_eye_pos, pupil_radius)
-            pygame.draw.circle(self.__surface, "#000000", right_eye_pos, pupil_radius)
+            self.tip_blits.append(body_part(cell_rect(tip).clip(ahead_of_tip)))
+            self.tip_blits.append((sprite, (x - GRID_SIZE, y - GRID_SIZE)))
         else:
-            eye_line_length = 3
-            pygame.draw.circle(self.__surface, "#FFFFFF", left_eye_pos, eye_radius)
-            pygame.draw.circle(self.__surface, "#FFFFFF", right_eye_pos, eye_radius)
-            pygame.draw.line(
-                self.__surface,
-                "#000000",
-                (left_eye_pos[0] - eye_line_length, left_eye_pos[1] - eye_line_length),
-                (left_eye_pos[0] + eye_line_length, left_eye_pos[1] + eye_line_length),
-                3,
-            )
-            pygame.draw.line(
-                self.__surface,
-                "#000000",
-                (left_eye_pos[0] - eye_line_length, left_eye_pos[1] + eye_line_length),
-                (left_eye_pos[0] + eye_line_length, left_eye_pos[1] - eye_line_length),
-                3,
-            )
-            pygame.draw.line(
-                self.__surface,
-                "#000000",
-                (
-                    right_eye_pos[0] - eye_line_length,
-                    right_eye_pos[1] - eye_line_length,
-                ),
-                (
-                    right_eye_pos[0] + eye_line_length,
-                    right_eye_pos[1] + eye_line_length,
-                ),
-                3,
-            )
-            pygame.draw.line(
-                self.__surface,
-                "#000000",
-                (
-                    right_eye_pos[0] - eye_line_length,
-                    right_eye_pos[1] + eye_line_length,
-                ),
-                (
-                    right_eye_pos[0] + eye_line_length,
-                    right_eye_pos[1] - eye_line_length,
-                ),
-                3,
-            )
+            # Turning a corner, it stays behind until the tick is over.
+            self.tip_blits.append(body_part(cell_rect(tip)))
+            self.tip_blits.append((sprite, sprites.offset(*last)))
 
-        # Randomly display the tongue
-        if self.alive and random.randint(0, 10) > 8:  # Adjust chance of appearance here
-            pygame.draw.rect(
-                self.__surface, "#FF0000", pygame.Rect(tongue_pos, tongue_direction)
-            )
+    def moving_cells(self):
+        """Return the cells where the snake may look different from one frame to the next."""
+        return (self.head_cells | self.tip_cells | {self.neck_cell}) - {None}
 
-    # Draw stylized tail
-    def draw_tail(self, tail, direction):
-        # Define tail dimensions
+    def draw(self):
         GRID_SIZE = size[configs[1]]
-        tail_radius = GRID_SIZE // 3  # Smaller radius for the tail
-        big_tail_center = (tail[0] + tail_radius, tail[1] + tail_radius)
-        tail_center = (tail[0] + tail_radius, tail[1] + tail_radius)
-
-        # Determine tail shape and position based on the last segment's movement
-        if direction[0] > 0:  # Moving right
-            big_tail_center = (tail[0] + GRID_SIZE, tail[1] + GRID_SIZE // 2)
-            tail_center = (tail[0] + GRID_SIZE - tail_radius, tail[1] + GRID_SIZE // 2)
-        elif direction[0] < 0:  # Moving left
-            big_tail_center = (tail[0], tail[1] + GRID_SIZE // 2)
-            tail_center = (tail[0] + tail_radius, tail[1] + GRID_SIZE // 2)
-        elif direction[1] > 0:  # Moving down
-            big_tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + GRID_SIZE)
-            tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + 2 * tail_radius)
-        else:  # Moving up
-            big_tail_center = (tail[0] + GRID_SIZE // 2, tail[1])
-            tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + tail_radius)
-
-        # Choose color based on alive status
-        tail_color = SNAKE_COLOR if self.alive else DEAD_SNAKE_COLOR
-
-        # Draw the main part of the tail (rounded edge)
-        pygame.draw.circle(self.__surface, tail_color, tail_center, tail_radius)
-
-        # Draw the rectangular part connecting to the next segment
-        pygame.draw.circle(
-            self.__surface, tail_color, big_tail_center, 3 / 2 * tail_radius
-        )
+        body = snake_sprites(GRID_SIZE, self.color).body[self.state.alive]
+        tail = self.state.tail
+
+        # The tail, then its tip and the head over it
+        blits = [(body, (x * GRID_SIZE, y * GRID_SIZE)) for x, y in tail]
+        if self.neck_blit:
+            blits[0] = self.neck_blit
+        if tail:
+            blits.pop()
+        blits += self.tip_blits
+        blits.append(self.head_blit)
+        self.__surface.blits(blits, doreturn=False)
+
+    def draw_cells(self, cells):
+        """Draw only the parts of the snake lying on the given (x, y) cells."""
+        GRID_SIZE = size[configs[1]]
+        body = snake_sprites(GRID_SIZE, self.color).body[self.state.alive]
+        tail = self.state.tail
+        special = {self.state.head, self.neck_cell, tail[-1] if tail else None}
+
+        # Body first, then the tail tip and the head, as in draw()
+        cells = set(cells)
+        blits = [
+            (body, (x * GRID_SIZE, y * GRID_SIZE))
+            for x, y in cells
+            if (x, y) not in special and self.state.is_in_position(x, y)
+        ]
+        if self.neck_cell in cells:
+            blits.append(self.neck_blit)
+        if cells & self.tip_cells:
+            blits += self.tip_blits
+        if cells & self.head_cells:
+            blits.append(self.head_blit)
+        self.__surface.blits(blits, doreturn=False)
 
-    def is_in_position(self, x, y):
-        """Determine whether any part of the snake is in position (x, y)."""
-        """This could be optimized by always maintaining a hashmap of the positions
-        of the snake's segments, which felt unecessary by now. """
 
-        if self.head.x == x and self.head.y == y:
-            return True
-        for square in self.tail:
-            if square.x == x and square.y == y:
-                return True
-        return False
+##
+## Drawing the sprites
+##
 
-    def draw(self):
-        # Draw the tail
-        for square in self.tail:
-            if square is self.tail[-1]:
-                if len(self.tail) == 1:
-                    self.draw_tail(square, (self.xmov, self.ymov))
-                else:
-                    self.draw_tail(
-                        square,
-                        (self.tail[-2][0] - square[0], self.tail[-2][1] - square[1]),
-                    )
-            else:
-                pygame.draw.rect(
-                    gm.arena, SNAKE_COLOR if self.alive else DEAD_SNAKE_COLOR, square
-                )
-        # Draw head
-        self.draw_head()
+# Draw stylized head
+def draw_head(surface, head, direction, alive, tongue, color=SNAKE_COLOR):
+    # Define head and rectangle dimensions
+    GRID_SIZE = head.width
+    head_radius = GRID_SIZE // 2
+    head_center = (head.x + head_radius, head.y + head_radius)
+
+    # Select color based on snake's alive status
+    head_color = color if alive else DEAD_SNAKE_COLOR
+
+    # Draw the rounded head
+    pygame.draw.circle(surface, head_color, head_center, head_radius)
+
+    # Draw the rectangle body behind the head circle based on direction
+    eye_offset = head_radius // 2
+    if direction == RIGHT:  # Moving right
+        body_rect = pygame.Rect(head.x, head.y, GRID_SIZE // 2, GRID_SIZE)
+        right_eye = (eye_offset, -eye_offset)
+        left_eye = (eye_offset, eye_offset)
+        tongue_pos = (head_center[0] + head_radius, head_center[1])
+        tongue_direction = (10, 2)  # Horizontal tongue
+    elif direction == LEFT:  # Moving left
+        body_rect = pygame.Rect(head.x + head_radius, head.y, GRID_SIZE // 2, GRID_SIZE)
+        right_eye = (-eye_offset, -eye_offset)
+        left_eye = (-eye_offset, eye_offset)
+        tongue_pos = (head_center[0] - 3 / 2 * head_radius, head_center[1])
+        tongue_direction = (10, 2)  # Horizontal tongue
+    elif direction == DOWN:  # Moving down
+        body_rect = pygame.Rect(head.x, head.y, GRID_SIZE, GRID_SIZE // 2)
+        right_eye = (-eye_offset, eye_offset)
+        left_eye = (eye_offset, eye_offset)
+        tongue_pos = (head_center[0], head_center[1] + head_radius)
+        tongue_direction = (2, 10)  # Vertical tongue
+    else:  # Moving up
+        body_rect = pygame.Rect(head.x, head.y + head_radius, GRID_SIZE, GRID_SIZE // 2)
+        right_eye = (-eye_offset, -eye_offset)
+        left_eye = (eye_offset, -eye_offset)
+        tongue_pos = (head_center[0], head_center[1] - 3 / 2 * head_radius)
+        tongue_direction = (2, 10)  # Vertical tongue
+
+    pygame.draw.rect(surface, head_color, body_rect)
+
+    eye_radius = 7
+    left_eye_pos = (head_center[0] + left_eye[0], head_center[1] + left_eye[1])
+    right_eye_pos = (head_center[0] + right_eye[0], head_center[1] + right_eye[1])
+
+    # Draw eyes based on snake's alive status
+    if alive:
+        pupil_radius = 4
+        pygame.draw.circle(surface, "#FFFFFF", left_eye_pos, eye_radius)
+        pygame.draw.circle(surface, "#FFFFFF", right_eye_pos, eye_radius)
+        pygame.draw.circle(surface, "#000000", left_eye_pos, pupil_radius)
+        pygame.draw.circle(surface, "#000000", right_eye_pos, pupil_radius)
+    else:
+        eye_line_length = 3
+        pygame.draw.circle(surface, "#FFFFFF", left_eye_pos, eye_radius)
+        pygame.draw.circle(surface, "#FFFFFF", right_eye_pos, eye_radius)
+        pygame.draw.line(
+            surface,
+            "#000000",
+            (left_eye_pos[0] - eye_line_length, left_eye_pos[1] - eye_line_length),
+            (left_eye_pos[0] + eye_line_length, left_eye_pos[1] + eye_line_length),
+            3,
+        )
+        pygame.draw.line(
+            surface,
+            "#000000",
+            (left_eye_pos[0] - eye_line_length, left_eye_pos[1] + eye_line_length),
+            (left_eye_pos[0] + eye_line_length, left_eye_pos[1] - eye_line_length),
+            3,
+        )
+        pygame.draw.line(
+            surface,
+            "#000000",
+            (
+                right_eye_pos[0] - eye_line_length,
+                right_eye_pos[1] - eye_line_length,
+            ),
+            (
+                right_eye_pos[0] + eye_line_length,
+                right_eye_pos[1] + eye_line_length,
+            ),
+            3,
+        )
+        pygame.draw.line(
+            surface,
+            "#000000",
+            (
+                right_eye_pos[0] - eye_line_length,
+                right_eye_pos[1] + eye_line_length,
+            ),
+            (
+                right_eye_pos[0] + eye_line_length,
+                right_eye_pos[1] - eye_line_length,
+            ),
+            3,
+        )
+
+    # Display the tongue, if it's out
+    if tongue:
+        pygame.draw.rect(surface, "#FF0000", pygame.Rect(tongue_pos, tongue_direction))
+
+
+# Draw stylized tail
+def draw_tail(surface, tail, grid_size, direction, alive, color=SNAKE_COLOR):
+    # Define tail dimensions
+    GRID_SIZE = grid_size
+    tail_radius = GRID_SIZE // 3  # Smaller radius for the tail
+    big_tail_center = (tail[0] + tail_radius, tail[1] + tail_radius)
+    tail_center = (tail[0] + tail_radius, tail[1] + tail_radius)
+
+    # Determine tail shape and position based on the last segment's movement
+    if direction == RIGHT:  # Moving right
+        big_tail_center = (tail[0] + GRID_SIZE, tail[1] + GRID_SIZE // 2)
+        tail_center = (tail[0] + GRID_SIZE - tail_radius, tail[1] + GRID_SIZE // 2)
+    elif direction == LEFT:  # Moving left
+        big_tail_center = (tail[0], tail[1] + GRID_SIZE // 2)
+        tail_center = (tail[0] + tail_radius, tail[1] + GRID_SIZE // 2)
+    elif direction == DOWN:  # Moving down
+        big_tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + GRID_SIZE)
+        tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + 2 * tail_radius)
+    else:  # Moving up
+        big_tail_center = (tail[0] + GRID_SIZE // 2, tail[1])
+        tail_center = (tail[0] + GRID_SIZE // 2, tail[1] + tail_radius)
+
+    # Choose color based on alive status
+    tail_color = color if alive else DEAD_SNAKE_COLOR
+
+    # Draw the main part of the tail (rounded edge)
+    pygame.draw.circle(surface, tail_color, tail_center, tail_radius)
+
+    # Draw the rectangular part connecting to the next segment
+    pygame.draw.circle(surface, tail_color, big_tail_center, 3 / 2 * tail_radius)
@@ -5,57 +5,190 @@
 #
 #  This file is part of Coral, a derivative work of KobraPy.
 
+# Translations.
+#
+# The texts are written in assets/translation.json and compiled into a
+# catalog (python -m app.translation), where each message has an integer ID
+# and each language is a block of its own. The game reads the catalog's
+# index when it starts and a language's block only when it is first used.
+# Callers resolve the IDs of their messages once (Translator.id) and look
+# them up with Translator.text, which is a list index.
+#
+# Catalog layout (little endian):
+#   header    magic "CRTL", version (u8), message count (u16), language count (u8)
+#   messages  the message codes, each a length (u16) and UTF-8 bytes
+#   languages each a name (u16 length, UTF-8), offset (u32) and size (u32) of its block
+#   blocks    per language, message count + 1 offsets (u32) into the UTF-8 texts
+#             that follow, with MISSING for messages it doesn't translate
+
 import json
+import os
+import struct
+import sys
+
+from app.fonts import render_text
+
+SOURCE_FILE = "assets/translation.json"
+CATALOG_FILE = "assets/translation.cat"
+
+MAGIC = b"CRTL"
+VERSION = 1
+MISSING = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sBHB")
+_LENGTH = struct.Struct("<H")
+_BLOCK = struct.Struct("<II")
+
+
+def compile_catalog(source=SOURCE_FILE):
+    """Return the catalog of the translations in a JSON file, as bytes."""
+    try:
+        with open(source, "r", encoding="utf-8") as file:
+            translations = json.load(file)
+    except FileNotFoundError:
+        raise Exception(f"Translation file '{source}' not found.")
+    except json.JSONDecodeError:
+        raise Exception("Translation file is not a valid JSON.")
+
+    # Every message of any language, in the order they first appear.
+    codes = list(
+        dict.fromkeys(code for texts in translations.values() for code in texts)
+    )
+
+    def string(text):
+        data = text.encode("utf-8")
+        return _LENGTH.pack(len(data)) + data
+
+    blocks = []
+    for texts in translations.values():
+        offsets, data = [], bytearray()
+        for code in codes:
+            if code in texts:
+                offsets.append(len(data))
+                data += texts[code].encode("utf-8")
+            else:
+                offsets.append(MISSING)
+        offsets.append(len(data))
+        blocks.append(struct.pack(f"<{len(offsets)}I", *offsets) + data)
+
+    head = _HEADER.pack(MAGIC, VERSION, len(codes), len(translations))
+    head += b"".join(string(code) for code in codes)
+    table_size = sum(
+        _LENGTH.size + len(name.encode("utf-8")) + _BLOCK.size for name in translations
+    )
+    offset = len(head) + table_size
+    for name, block in zip(translations, blocks):
+        head += string(name) + _BLOCK.pack(offset, len(block))
+        offset += len(block)
+    return head + b"".join(blocks)
+
 
 class Translator:
     _instance = None  # Singleton instance
-    available_languages = ["english", "portuguese"]
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(Translator, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, file_path="assets/translation.json", default_language="english"):
+    def __init__(self, file_path=CATALOG_FILE, default_language="english"):
         if not hasattr(self, "initialized"):
-            self.translations = {}
-            self.default_language = default_language
-            if file_path:
-                self.load_translations(file_path)
+            self.file_path = file_path
+            self.ids = {}  # Message IDs by code
+            self.blocks = {}  # Where each language is in the catalog
+            self.languages = {}  # Texts of the languages loaded so far, by ID
+            self.default_language = None
+            self.load_catalog(file_path)
+            self.set_language(default_language)
             self.initialized = True  # Ensures __init__ runs only once
 
-    def load_translations(self, file_path):
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                self.translations = json.load(file)
-        except FileNotFoundError:
-            raise Exception(f"Translation file '{file_path}' not found.")
-        except json.JSONDecodeError:
-            raise Exception("Translation file is not a valid JSON.")
+    def load_catalog(self, file_path):
+        """Read the index of a catalog: the message IDs and where each language is."""
+        # A catalog older than the JSON it came from is compiled again, in memory.
+        if not os.path.exists(file_path) or (
+            os.path.exists(SOURCE_FILE)
+            and os.path.getmtime(SOURCE_FILE) > os.path.getmtime(file_path)
+        ):
+            self.data = compile_catalog(SOURCE_FILE)
+        else:
+            with open(file_path, "rb") as file:
+                self.data = file.read()
+
+        magic, version, count, language_count = _HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(
+                f"'{file_path}' is not a translation catalog (version {VERSION})."
+            )
+        position = _HEADER.size
+
+        def string():
+            nonlocal position
+            (length,) = _LENGTH.unpack_from(self.data, position)
+            position += _LENGTH.size + length
+            return self.data[position - length : position].decode("utf-8")
+
+        self.ids = {string(): id for id in range(count)}
+        self.codes = list(self.ids)
+        for _ in range(language_count):
+            name = string()
+            self.blocks[name] = _BLOCK.unpack_from(self.data, position)
+            position += _BLOCK.size
+        self.available_languages = list(self.blocks)
+
+    def load_language(self, language):
+        offset, size = self.blocks[language]
+        count = len(self.codes)
+        offsets = struct.unpack_from(f"<{count + 1}I", self.data, offset)
+        texts = self.data[offset + 4 * (count + 1) : offset + size]
+
+        # Where a text ends: the start of the next one that is there.
+        ends = []
+        end = offsets[count]
+        for start in reversed(offsets[:count]):
+            ends.append(end)
+            if start != MISSING:
+                end = start
+        ends.reverse()
+
+        self.languages[language] = [
+            (
+                texts[start:end].decode("utf-8")
+                if start != MISSING
+                else f"[{code}] message not found."
+            )
+            for code, start, end in zip(self.codes, offsets, ends)
+        ]
 
     def set_language(self, language):
-        if language not in self.translations:
+        if language not in self.blocks:
             raise ValueError(f"Language '{language}' not available in translations.")
+        if language not in self.languages:
+            self.load_language(language)
+        if self.default_language not in (None, language):
+            # The texts rendered in the old language won't be shown again.
+            render_text.cache_clear()
         self.default_language = language
+        self.texts = self.languages[language]
 
-    def message(self, code):
-        if self.default_language not in self.translations:
-            raise ValueError(f"Default language '{self.default_language}' not loaded.")
-        return self.translations[self.default_language].get(
-            code, f"[{code}] message not found."
-        )
+    def id(self, code):
+        """Return the ID of a message, to look it up with text()."""
+        return self.ids[code]
 
-# Example usage
-if __name__ == "__main__":
-    # First initialization
-    translator = Translator("translation.json")
-    print(translator.message("welcome_message"))  # Output: Welcome to our application!
+    def text(self, id):
+        """Return the message of the given ID in the current language."""
+        return self.texts[id]
 
-    # Second initialization (same instance will be reused)
-    another_translator = Translator()
-    another_translator.set_language("portuguese")
-    print(another_translator.message("welcome_message"))  # Output: Bem-vindo ao nosso aplicativo!
+    def message(self, code):
+        if code not in self.ids:
+            return f"[{code}] message not found."
+        return self.texts[self.ids[code]]
 
-    # Confirming that both variables refer to the same instance
-    print(translator is another_translator)  # Output: True
 
+if __name__ == "__main__":
+    # Compile the translations: python -m app.translation [source [catalog]]
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_FILE
+    catalog = sys.argv[2] if len(sys.argv) > 2 else CATALOG_FILE
+    data = compile_catalog(source)
+    with open(catalog, "wb") as file:
+        file.write(data)
+    print(f"{catalog}: {len(data)} bytes")
@@ -5,7 +5,12 @@
 #
 #  This file is part of Coral, a derivative work of KobraPy.
 
+import time
+
+# Taken before anything else is imported, to measure the whole startup.
+launched = time.perf_counter()
+
 from app.main import main
 
 if __name__ == "__main__":
-    main()
+    main(launched)
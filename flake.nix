@@ -18,7 +18,7 @@
 
       devShells.${system}.default = pkgs.mkShell {
         packages = [
-          (pkgs.python3.withPackages (python-pkgs: with python-pkgs; [ pygame pyinstaller ]))
+          (pkgs.python3.withPackages (python-pkgs: with python-pkgs; [ pygame numpy pyinstaller ]))
         ];
       };
     };
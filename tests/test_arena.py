@@ -0,0 +1,135 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Collisions between snakes, and bots coming back (app.arena).
+
+from app.arena import Arena
+from app.config import ENERGY_CONSUMPTION
+from app.engine import APPLE, ATE_APPLE, DIED, EMPTY, OBSTACLE, SNAKE
+
+
+def new_arena(bots=1):
+    """Return an arena of a player and bots with nothing else on the board."""
+    arena = Arena(10, 10, bots, obstacle_count=0, seed=0, apples=0, oranges=0)
+    for snake in arena.snakes:
+        arena.clear(snake)
+    arena.cleared.clear()
+    return arena
+
+
+def place(arena, snake, cells, direction):
+    """Put a snake on cells, head first, moving in direction."""
+    cols = arena.cols
+    for x, y in cells:
+        index = y * cols + x
+        arena.grid[index] = SNAKE
+        arena.owner[index] = snake.id
+        arena.free.remove(index)
+    snake.head = cells[0]
+    snake.tail.clear()
+    for x, y in reversed(cells[1:]):
+        snake.tail.push(y * cols + x)
+    snake.xmov, snake.ymov = direction
+    snake.alive = True
+
+
+def block(arena, cells):
+    """Put obstacles on cells."""
+    for x, y in cells:
+        arena.grid[y * arena.cols + x] = OBSTACLE
+        arena.free.remove(y * arena.cols + x)
+        arena.obstacles.append((x, y))
+
+
+def check_cells(arena):
+    """Check that the grid, the owners and the free cell index agree."""
+    cols = arena.cols
+    owned = {}
+    for snake in arena.snakes:
+        if snake.head is not None and snake.alive:
+            for x, y in [snake.head, *snake.tail]:
+                owned[y * cols + x] = snake.id
+    for index, kind in enumerate(arena.grid):
+        assert (kind == SNAKE) == (index in owned)
+        assert arena.owner[index] == owned.get(index, -1)
+        assert (kind == EMPTY) == (index in arena.free)
+
+
+def test_head_on():
+    arena = new_arena()
+    player, bot = arena.snakes
+    place(arena, player, [(4, 5), (3, 5)], (1, 0))
+    place(arena, bot, [(5, 5), (6, 5)], (-1, 0))
+    block(arena, [(5, 4), (5, 6)])  # The bot can't turn away.
+
+    # Each head moves into the other: both die.
+    assert arena.step() == DIED
+    assert not player.alive
+    assert bot.events == DIED
+
+
+def test_head_into_body():
+    arena = new_arena()
+    player, bot = arena.snakes
+    place(arena, player, [(3, 4), (2, 4)], (0, 1))
+    place(arena, bot, [(5, 5), (4, 5), (3, 5), (2, 5)], (1, 0))
+
+    assert arena.step() == DIED
+    assert not player.alive
+    assert bot.alive and bot.head == (6, 5)
+
+
+def test_head_into_the_cell_a_tail_leaves():
+    arena = new_arena()
+    player, bot = arena.snakes
+    place(arena, player, [(2, 4), (1, 4)], (0, 1))
+    place(arena, bot, [(4, 5), (3, 5), (2, 5)], (1, 0))
+
+    # The tails move first: the bot's tip leaves (2, 5) to the player.
+    assert arena.step() == 0
+    assert player.alive and player.head == (2, 5)
+    assert bot.alive and bot.head == (5, 5)
+    check_cells(arena)
+
+
+def test_two_heads_claim_one_cell():
+    arena = new_arena(bots=2)
+    player, left, right = arena.snakes
+    place(arena, player, [(5, 1), (5, 0)], (0, 1))
+    place(arena, left, [(4, 5), (3, 5)], (1, 0))
+    place(arena, right, [(6, 5), (7, 5)], (-1, 0))
+
+    # Both bots move to (5, 5), and both die; the player plays on.
+    assert arena.step() == 0
+    assert left.events == right.events == DIED
+    assert player.alive
+    check_cells(arena)
+
+
+def test_dead_bot_is_cleared_and_respawned():
+    arena = new_arena()
+    player, bot = arena.snakes
+    place(arena, player, [(1, 1)], (1, 0))
+    cells = [(5, 5), (4, 5), (3, 5)]
+    place(arena, bot, cells, (1, 0))
+    x, y = 4, 8
+    arena.grid[y * arena.cols + x] = APPLE
+    arena.fruits[x, y] = APPLE
+    arena.free.remove(y * arena.cols + x)
+    bot.energy = ENERGY_CONSUMPTION  # It starves on this tick.
+
+    assert arena.step() == 0
+    assert bot.events == DIED
+    assert set(arena.cleared) == {(6, 5), (5, 5), (4, 5)}
+    assert bot.alive and bot.score == 0
+    assert arena.owner.tolist().count(bot.id) == 1
+    assert arena.grid[y * arena.cols + x] == APPLE
+    check_cells(arena)
+
+    # It plays on from where it came back.
+    assert arena.step() == 0
+    assert bot.alive and bot.events in (0, ATE_APPLE)
+    check_cells(arena)
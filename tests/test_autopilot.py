@@ -0,0 +1,38 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# The autopilot's incremental distance field against a fresh search (app.autopilot).
+
+import random
+
+import pytest
+
+from app.autopilot import Autopilot
+from app.engine import DIED, GameState
+
+
+@pytest.mark.parametrize("border_wrap", [False, True])
+def test_field_follows_the_game_across_resets(border_wrap):
+    turns = random.Random(0)
+    deaths = 0
+    for seed in range(20):
+        state = GameState(
+            8, 8, obstacle_count=4, seed=seed, border_wrap=border_wrap
+        )
+        autopilot = Autopilot(state)
+        fresh = Autopilot(state)
+        for tick in range(300):
+            direction = autopilot.move()
+            fresh.rebuild()
+            assert autopilot.dist == fresh.dist, (seed, tick)
+            # Turn at random now and then, so that the snake dies short and
+            # often respawns next to where it died.
+            if turns.random() < 0.2:
+                direction = turns.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
+            if state.step(direction) & DIED:
+                deaths += 1
+                state.reset()
+    assert deaths > 20
@@ -0,0 +1,115 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# The batch engine against GameState, tick for tick (app.batch).
+
+import random
+
+import numpy as np
+import pytest
+
+from app.batch import NO_ACTION, BatchGame
+from app.engine import APPLE, ATE_APPLE, DIRECTIONS, ORANGE, GameState
+
+
+def mirror(state):
+    """Return a batch of one game in the same state as state."""
+    batch = BatchGame(1, state.cols, state.rows, state.border_wrap, obstacle_count=0)
+    batch.obstacles[:] = False
+    for x, y in state.obstacles:
+        batch.obstacles[0, y, x] = True
+    batch.head[0] = state.head
+    batch.direction[0] = state.xmov, state.ymov
+    batch.energy[0] = state.energy
+    sync_fruits(batch, state)
+    return batch
+
+
+def sync_fruits(batch, state):
+    # The batch draws new fruits from its own random numbers.
+    for kind, fruit in ((APPLE, batch.apple), (ORANGE, batch.orange)):
+        cells = [cell for cell, fruit_kind in state.fruits.items() if fruit_kind == kind]
+        fruit[0] = cells[0] if cells else (-1, -1)
+
+
+def check(batch, state):
+    assert tuple(batch.head[0]) == state.head
+    assert tuple(batch.direction[0]) == (state.xmov, state.ymov)
+    assert bool(batch.alive[0]) == state.alive
+    assert bool(batch.got_apple[0]) == state.got_apple
+    assert batch.score[0] == state.score
+    # Each tail cell counts the moves left before the tail leaves it.
+    body = np.zeros((state.rows, state.cols), dtype=np.int32)
+    for i, (x, y) in enumerate(state.tail):
+        body[y, x] = len(state.tail) - i
+    assert (batch.body[0] == body).all()
+
+
+def towards_apple(state):
+    """Return the action that heads for an apple, or NO_ACTION if on it."""
+    (ax, ay), *_ = [cell for cell, kind in state.fruits.items() if kind == APPLE]
+    hx, hy = state.head
+    if ax != hx:
+        return DIRECTIONS.index(((ax > hx) - (ax < hx), 0))
+    if ay != hy:
+        return DIRECTIONS.index((0, (ay > hy) - (ay < hy)))
+    return NO_ACTION
+
+
+@pytest.mark.parametrize("border_wrap", [False, True])
+def test_batch_follows_game_state(border_wrap):
+    eaten = 0
+    for seed in range(40):
+        state = GameState(12, 12, border_wrap=border_wrap, obstacle_count=6, seed=seed)
+        batch = mirror(state)
+        moves = random.Random(seed)
+        while state.alive:
+            # Random turns, or towards the apple so that the snake grows.
+            if moves.random() < 0.3:
+                action = moves.choice([NO_ACTION, *range(len(DIRECTIONS))])
+            else:
+                action = towards_apple(state)
+
+            grew = state.got_apple
+            batch.energy[0] = state.energy  # Apples give random amounts.
+            expected = state.step(None if action == NO_ACTION else DIRECTIONS[action])
+            assert batch.step(np.array([action]))[0] == expected
+            check(batch, state)
+            if not grew:
+                assert batch.energy[0] == state.energy
+            sync_fruits(batch, state)
+            eaten += bool(expected & ATE_APPLE)
+    assert eaten > 10  # The snakes grew, so growth was compared too.
+
+
+def test_respawn_on_crowded_boards():
+    batch = BatchGame(3, 8, 8, obstacle_count=0, seed=3)
+
+    # The inner cells are all obstacles in game 0, and every cell but one in
+    # game 1: the snakes spawn in the free cells left.
+    batch.obstacles[:] = False
+    batch.obstacles[0, 2:7, 2:7] = True
+    batch.obstacles[1] = True
+    batch.obstacles[1, 0, 5] = False
+    batch.apple[:2] = batch.orange[:2] = -1
+    batch.reset()
+    assert batch.alive.all()
+    assert not batch.obstacles[0, batch.head[0, 1], batch.head[0, 0]]
+    assert tuple(batch.head[1]) == (5, 0)
+
+    # No cell is free: the snake stays dead.
+    batch.obstacles[2] = True
+    batch.reset(np.arange(3) == 2)
+    assert list(batch.alive) == [True, True, False]
+
+
+def test_respawn_on_tiny_boards():
+    batch = BatchGame(4, 3, 3, obstacle_count=2, seed=4)
+    assert batch.alive.all()
+    for game in range(4):
+        x, y = batch.head[game]
+        assert not batch.obstacles[game, y, x]
+        assert (0 <= batch.head[game]).all() and (batch.head[game] < 3).all()
@@ -0,0 +1,76 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Spawning on crowded boards (app.engine).
+
+from app.engine import EMPTY, FRUITS, OBSTACLE, SNAKE, GameState
+
+
+def check_cells(state):
+    """Check that the free cell index agrees with the grid."""
+    free = {index for index, kind in enumerate(state.grid) if kind == EMPTY}
+    assert set(state.free.cells[: len(state.free)]) == free
+    assert len(state.free) == len(free)
+
+
+def test_obstacles_fill_the_cells_off_the_head_lines():
+    # 6 x 6 cells, 11 of them in the head's row and column: 25 obstacles fit.
+    state = GameState(6, 6, obstacle_count=26, seed=1, apples=0, oranges=0)
+    head_x, head_y = state.head
+    assert len(state.obstacles) == 25
+    assert all(x != head_x and y != head_y for x, y in state.obstacles)
+    assert state.grid.count(OBSTACLE) == 25
+    check_cells(state)
+
+
+def test_obstacles_on_a_full_board():
+    state = GameState(6, 6, obstacle_count=25, seed=2, apples=6, oranges=6)
+    assert len(state.free) == 0
+    assert state.place_obstacles(3) == 0
+    assert len(state.obstacles) == 25
+    assert state.random_free_cell() is None
+    # The fruits that didn't fit are missing.
+    assert sum(state.missing.values()) == 2
+    assert len(state.fruits) == 10
+
+
+def test_respawn_on_a_nearly_full_board():
+    state = GameState(6, 6, obstacle_count=25, seed=3, apples=0, oranges=0)
+    head = state.head
+    # All the cells but one taken: the snake can only respawn there.
+    for index in list(state.free.cells[: len(state.free)])[1:]:
+        state.grid[index] = OBSTACLE
+        state.free.remove(index)
+    (last,) = state.free.cells[: len(state.free)]
+    state.grid[head[1] * 6 + head[0]] = OBSTACLE  # Where it was is taken too
+    state.head = None
+    state.reset()
+    assert state.alive
+    assert state.head == (last % 6, last // 6)
+    assert state.grid[last] == SNAKE
+    check_cells(state)
+
+
+def test_respawn_on_a_full_board():
+    state = GameState(6, 6, obstacle_count=25, seed=4, apples=6, oranges=6)
+    x, y = state.head
+    state.grid[y * 6 + x] = FRUITS[0]  # Something took its cell
+    state.fruits[x, y] = FRUITS[0]
+    state.head = None
+    state.reset()
+    assert not state.alive
+    assert state.random_spawn_cell() is None
+
+
+def test_spawns_keep_the_index_in_step():
+    for seed in range(20):
+        state = GameState(8, 8, obstacle_count=12, seed=seed, apples=3, oranges=3)
+        check_cells(state)
+        for tick in range(200):
+            state.step()
+            if not state.alive:
+                state.reset()
+            check_cells(state)
@@ -0,0 +1,86 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# The training environment against the game it wraps (app.env).
+
+import random
+
+import numpy as np
+import pytest
+
+from app.batch import NO_ACTION
+from app.engine import APPLE, ATE_APPLE, DIED, DIRECTIONS, GameState
+from app.env import CoralEnv, observation_spec
+
+
+def check(observation, state):
+    assert observation["grid"].tobytes() == bytes(state.grid)
+    assert tuple(observation["head"]) == state.head
+    assert tuple(observation["direction"]) == (state.xmov, state.ymov)
+    assert observation["energy"] == state.energy
+
+
+def action(state, moves):
+    """Return a random action, or more often one towards an apple."""
+    apples = [cell for cell, kind in state.fruits.items() if kind == APPLE]
+    if not apples or moves.random() < 0.3:
+        return moves.choice([NO_ACTION, *range(len(DIRECTIONS))])
+    (ax, ay), (hx, hy) = apples[0], state.head
+    if ax != hx:
+        return DIRECTIONS.index(((ax > hx) - (ax < hx), 0))
+    if ay != hy:
+        return DIRECTIONS.index((0, (ay > hy) - (ay < hy)))
+    return NO_ACTION
+
+
+@pytest.mark.parametrize("border_wrap", [False, True])
+def test_env_follows_game_state(border_wrap):
+    env = CoralEnv(12, 12, border_wrap=border_wrap, obstacle_count=6, seed=0)
+    moves = random.Random(0)
+    rewards = 0.0
+    for episode in range(20):
+        # The same game, played next to the environment.
+        observation, info = env.reset()
+        state = GameState(12, 12, border_wrap, obstacle_count=6, seed=info["seed"])
+        check(observation, state)
+        # The game plays in the observation's grid, which is never copied.
+        grid = np.frombuffer(env.state.grid, np.uint8)
+        assert np.shares_memory(grid, observation["grid"])
+
+        terminated = False
+        while not terminated:
+            move = action(state, moves)
+            events = state.step(None if move == NO_ACTION else DIRECTIONS[move])
+            observation, reward, terminated, truncated, info = env.step(move)
+            check(observation, state)
+            assert reward == (1.0 if events & ATE_APPLE else 0.0)
+            assert terminated == bool(events & DIED)
+            assert not truncated
+            assert info["score"] == state.score
+            rewards += reward
+    assert rewards > 10
+
+
+def test_env_truncates_at_max_steps():
+    env = CoralEnv(12, 12, obstacle_count=0, max_steps=3, seed=1)
+    env.reset(seed=1)
+    truncated = [env.step(NO_ACTION)[3] for _ in range(3)]
+    assert truncated == [False, False, True]
+
+
+def test_env_writes_in_the_arrays_given():
+    out = {
+        name: np.zeros(shape, dtype)
+        for name, (shape, dtype) in observation_spec(8, 6).items()
+    }
+    env = CoralEnv(8, 6, obstacle_count=2, seed=2, out=out)
+    observation, _ = env.reset()
+    assert all(observation[name] is out[name] for name in out)
+    check(out, env.state)
+
+    out["grid"] = np.zeros((8, 6), np.uint8)  # Transposed
+    with pytest.raises(ValueError):
+        CoralEnv(8, 6, out=out)
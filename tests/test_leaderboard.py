@@ -0,0 +1,106 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# The leaderboard, on a database of its own (app.leaderboard).
+
+import os
+import time
+
+import pytest
+
+import app.leaderboard
+from app.leaderboard import Leaderboard, Session
+
+
+@pytest.fixture
+def filename(tmp_path, monkeypatch):
+    # No highscore file of an older version, unless a test writes one.
+    monkeypatch.setattr(
+        app.leaderboard, "HIGHSCORE_FILENAME", str(tmp_path / "highscore.bin")
+    )
+    return str(tmp_path / "leaderboard.sqlite3")
+
+
+def open_leaderboard(filename, size=3):
+    leaderboard = Leaderboard(filename, size)
+    leaderboard.start()
+    assert leaderboard.loaded.wait(5)
+    return leaderboard
+
+
+def test_sessions_are_ranked_and_kept_per_settings(filename):
+    leaderboard = open_leaderboard(filename)
+    for score, played in ((5, 1.0), (9, 2.0), (5, 0.5), (7, 3.0), (1, 4.0)):
+        leaderboard.record(Session(score, 1, 20, False, 10.0, played))
+    leaderboard.record(Session(2, 1, 20, True, 10.0, 5.0))
+    leaderboard.close()
+
+    # The best first, the earliest of equal scores first, size of them.
+    for board in (leaderboard, open_leaderboard(filename)):
+        top = board.top(1, 20, False)
+        assert [(entry.score, entry.played) for entry in top] == [
+            (9, 2.0),
+            (7, 3.0),
+            (5, 0.5),
+        ]
+        assert [entry.score for entry in board.top(1, 20, True)] == [2]
+        assert board.top(2, 20, False) == []
+        assert board.best == 9
+        board.close()
+
+
+def test_highscore_of_older_versions_is_imported_once(filename):
+    with open(app.leaderboard.HIGHSCORE_FILENAME, "wb") as file:
+        file.write((42).to_bytes(4, byteorder="big"))
+
+    leaderboard = open_leaderboard(filename)
+    assert leaderboard.best == 42
+    leaderboard.close()
+
+    # The database isn't new anymore: the file is not imported again.
+    with open(app.leaderboard.HIGHSCORE_FILENAME, "wb") as file:
+        file.write((99).to_bytes(4, byteorder="big"))
+    leaderboard = open_leaderboard(filename)
+    assert leaderboard.best == 42
+    assert sum(len(table) for table in leaderboard.tables.values()) == 1
+    leaderboard.close()
+
+
+def test_save_file_replaces_the_file_at_once(filename, tmp_path):
+    target = str(tmp_path / "replays" / "last_game.crpl")
+    leaderboard = open_leaderboard(filename)
+    leaderboard.save_file(target, b"first")
+    leaderboard.save_file(target, b"second")
+    leaderboard.close()
+
+    with open(target, "rb") as file:
+        assert file.read() == b"second"
+    assert os.listdir(os.path.dirname(target)) == ["last_game.crpl"]
+
+
+def test_record_during_and_after_loading(filename, monkeypatch):
+    leaderboard = open_leaderboard(filename)
+    leaderboard.record(Session(50, 1, 20, False, 10.0))
+    leaderboard.close()
+
+    # A slow disk: the game ends before the saved sessions are loaded.
+    load = Leaderboard.load
+
+    def slow_load(self, connection):
+        time.sleep(0.2)
+        load(self, connection)
+
+    monkeypatch.setattr(Leaderboard, "load", slow_load)
+    leaderboard = Leaderboard(filename, 3)
+    leaderboard.start()
+    assert not leaderboard.record(Session(10, 1, 20, False, 10.0))
+    assert leaderboard.loaded.is_set()
+
+    # After loading.
+    assert not leaderboard.record(Session(50, 1, 20, False, 10.0))
+    assert leaderboard.record(Session(51, 1, 20, False, 10.0))
+    assert [entry.score for entry in leaderboard.top(1, 20, False)] == [51, 50, 50]
+    leaderboard.close()
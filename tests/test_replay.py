@@ -0,0 +1,93 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Recording, replay and snapshots (app.replay, GameState.snapshot()).
+
+import random
+
+import pytest
+
+from app.config import *
+from app.engine import APPLE, DIED, DIRECTIONS, GameState
+from app.replay import KEYFRAME_INTERVAL, Recorder, Replay
+
+
+def record(seed, ticks, end_with_reset=False):
+    """Play a game with random inputs for ticks ticks and return its recorder."""
+    inputs = random.Random(seed)
+    state = GameState(20, 20, seed=seed, apples=2)
+    recorder = Recorder(state)
+    for _ in range(ticks):
+        if inputs.random() < 0.2:
+            recorder.set_direction(*inputs.choice(DIRECTIONS))
+        if recorder.step() & DIED:
+            recorder.reset(inputs.random() < 0.5)
+    if end_with_reset:
+        recorder.reset(False)
+    return recorder
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("end_with_reset", [False, True])
+def test_replay_ends_in_the_recorded_state(tmp_path, seed, end_with_reset):
+    recorder = record(seed, 2 * KEYFRAME_INTERVAL + 345, end_with_reset)
+    filename = tmp_path / "game.crpl"
+    recorder.save(filename)
+
+    replay = Replay(filename)
+    assert replay.ticks == recorder.ticks
+    assert replay.verify()
+    final = recorder.state.snapshot()
+    assert replay.play().snapshot() == final
+    assert replay.play(seek=False).snapshot() == final
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_seeking_matches_playing_from_the_start(tmp_path, seed):
+    recorder = record(seed, 3 * KEYFRAME_INTERVAL)
+    filename = tmp_path / "game.crpl"
+    recorder.save(filename)
+
+    replay = Replay(filename)
+    for until in (0, 1, 999, KEYFRAME_INTERVAL, 1500, 2 * KEYFRAME_INTERVAL + 1):
+        seeked = replay.play(until).snapshot()
+        assert seeked == replay.play(until, seek=False).snapshot()
+
+
+def test_snapshots_resume_the_game():
+    state = GameState(20, 20, seed=7, apples=3)
+    moves = random.Random(7)
+    for _ in range(500):
+        if state.step(moves.choice(DIRECTIONS)) & DIED:
+            state.reset()
+    restored = GameState.restore(state.snapshot())
+    assert restored.snapshot() == state.snapshot()
+    for _ in range(500):
+        direction = moves.choice(DIRECTIONS)
+        assert restored.step(direction) == state.step(direction)
+        if not state.alive:
+            state.reset()
+            restored.reset()
+        assert restored.snapshot() == state.snapshot()
+
+
+def test_snapshots_keep_a_fruit_under_a_starved_snake():
+    state = GameState(20, 20, seed=8, obstacle_count=0, apples=1, oranges=0)
+    ((x, y),) = state.fruits
+    # Starve the snake as it reaches the apple.
+    state.grid[state.head[1] * 20 + state.head[0]] = 0
+    state.free.add(state.head[1] * 20 + state.head[0])
+    state.head = (x - state.xmov, y - state.ymov)
+    state.free.remove(state.head[1] * 20 + state.head[0])
+    state.grid[state.head[1] * 20 + state.head[0]] = 1
+    state.energy = ENERGY_CONSUMPTION
+    assert state.step() & DIED
+    assert state.head == (x, y)
+
+    restored = GameState.restore(state.snapshot())
+    assert restored.fruits == {(x, y): APPLE}
+    restored.reset()
+    assert restored.grid[y * 20 + x] == APPLE
@@ -0,0 +1,68 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# Worker processes against environments stepped one after another (app.rollout).
+
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from app.batch import NO_ACTION
+from app.engine import DIRECTIONS
+from app.env import CoralEnv
+from app.rollout import RolloutRunner
+
+
+def test_workers_play_as_sequential_envs():
+    workers, games, cols, rows = 3, 4, 10, 8
+    options = {"obstacle_count": 4, "max_steps": 40}
+    runner = RolloutRunner(workers, games, cols, rows, seed=7, **options)
+    envs = [
+        CoralEnv(cols, rows, seed=f"7/{worker}/{i}", **options)
+        for worker in range(workers)
+        for i in range(games)
+    ]
+    try:
+        observation = runner.reset()
+        expected = [env.reset()[0] for env in envs]
+        for name in observation:
+            assert (observation[name] == np.stack([e[name] for e in expected])).all()
+
+        moves = np.random.default_rng(0)
+        ended = 0
+        for _ in range(150):
+            actions = moves.integers(NO_ACTION, len(DIRECTIONS), runner.count)
+            observation, reward, terminated, truncated = runner.step(actions)
+            for i, env in enumerate(envs):
+                obs, env_reward, env_terminated, env_truncated, info = env.step(
+                    actions[i]
+                )
+                assert reward[i] == env_reward
+                assert terminated[i] == env_terminated
+                assert truncated[i] == env_truncated
+                assert runner.score[i] == info["score"]
+                if env_terminated or env_truncated:
+                    obs, _ = env.reset()
+                    ended += 1
+                for name in observation:
+                    assert (observation[name][i] == obs[name]).all()
+        assert ended > runner.count
+    finally:
+        runner.close()
+
+
+def test_close_releases_the_shared_memory():
+    runner = RolloutRunner(2, 2, 6, 6, seed=0, obstacle_count=0)
+    name = runner.memory.name
+    processes = runner.processes
+    runner.reset()
+    runner.close()
+
+    assert not any(process.is_alive() for process in processes)
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name)
+    runner.close()  # A second close does nothing.
@@ -0,0 +1,95 @@
+#  SPDX-FileCopyrightText: 2024 Coral authors <git@github.com/courselab/coral>
+#   
+#  SPDX-License-Identifier: GPL-3.0-or-later
+#
+#  This file is part of Coral, a derivative work of KobraPy.
+
+# The translation catalog and its reader (app.translation).
+
+import json
+import os
+
+import pytest
+
+import app.translation
+from app.translation import CATALOG_FILE, SOURCE_FILE, Translator, compile_catalog
+
+TRANSLATIONS = {
+    "english": {"play": "Play", "quit": "Quit", "only_here": "Only in English"},
+    "portuguese": {"play": "Jogar", "quit": "Sair ção"},
+}
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """Return a JSON file of TRANSLATIONS and the catalog compiled from it."""
+    source, catalog = str(tmp_path / "t.json"), str(tmp_path / "t.cat")
+    write_json(source, TRANSLATIONS)
+    with open(catalog, "wb") as file:
+        file.write(compile_catalog(source))
+    touch(source, -10)  # The catalog is newer.
+    monkeypatch.setattr(app.translation, "SOURCE_FILE", source)
+    monkeypatch.setattr(Translator, "_instance", None)
+    return source, catalog
+
+
+def write_json(filename, translations):
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump(translations, file, ensure_ascii=False)
+
+
+def touch(filename, seconds):
+    """Move the modification time of a file by the given seconds."""
+    mtime = os.path.getmtime(filename) + seconds
+    os.utime(filename, (mtime, mtime))
+
+
+def test_committed_catalog_is_compiled_from_the_json():
+    with open(CATALOG_FILE, "rb") as file:
+        assert file.read() == compile_catalog(SOURCE_FILE)
+
+
+def test_round_trip(files):
+    _, catalog = files
+    translator = Translator(catalog)
+    assert translator.available_languages == ["english", "portuguese"]
+    assert [translator.id(code) for code in ("play", "quit", "only_here")] == [0, 1, 2]
+
+    assert translator.text(translator.id("play")) == "Play"
+    assert translator.message("only_here") == "Only in English"
+    translator.set_language("portuguese")
+    assert translator.message("quit") == "Sair ção"
+    assert translator.message("only_here") == "[only_here] message not found."
+    assert translator.message("unknown") == "[unknown] message not found."
+    with pytest.raises(ValueError):
+        translator.set_language("klingon")
+
+
+def test_languages_are_decoded_when_first_used(files):
+    _, catalog = files
+    translator = Translator(catalog)
+    assert list(translator.languages) == ["english"]
+    translator.set_language("portuguese")
+    assert list(translator.languages) == ["english", "portuguese"]
+
+
+def test_catalog_older_than_the_json_is_compiled_again(files, monkeypatch):
+    source, catalog = files
+    changed = {"english": {"play": "Start", "quit": "Quit"}}
+    write_json(source, changed)
+
+    # The catalog is newer: it is read as it is.
+    touch(source, -10)
+    assert Translator(catalog).message("play") == "Play"
+
+    # The JSON is newer: its texts win.
+    monkeypatch.setattr(Translator, "_instance", None)
+    touch(source, 20)
+    translator = Translator(catalog)
+    assert translator.message("play") == "Start"
+    assert translator.available_languages == ["english"]
+
+    # No catalog at all.
+    monkeypatch.setattr(Translator, "_instance", None)
+    os.remove(catalog)
+    assert Translator(catalog).message("play") == "Start"